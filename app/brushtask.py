@@ -1,13 +1,11 @@
-import re
-import sys
 import time
-from datetime import datetime
+from threading import Lock
 
-import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 import log
+from app.brushtask_rule import BrushRssRule, BrushRemoveRule, parse_brush_rule_str
 from app.downloader import Downloader
 from app.filter import Filter
 from app.helper import DbHelper, RssHelper
@@ -16,7 +14,6 @@ from app.message import Message
 from app.sites import Sites, SiteConf
 from app.utils import StringUtils, ExceptionUtils
 from app.utils.commons import singleton
-from app.utils.types import BrushDeleteType
 from config import BRUSH_REMOVE_TORRENTS_INTERVAL, Config
 
 
@@ -30,16 +27,27 @@ class BrushTask(object):
     rsshelper = None
     downloader = None
     _scheduler = None
+    # 刷流任务登记：任务ID -> 任务信息
     _brush_tasks = {}
+    # 任务ID -> 解析后的选种及删种规则
+    _brush_rules = {}
+    # 任务ID -> 保种体积（Byte），添加和删除种子时增量更新
+    _brush_totals = {}
+    # 任务变更时递增的版本号，与加载时的版本不一致时重新加载
+    _brush_version = 0
+    _brush_loaded_version = -1
+    _brush_lock = None
     _torrents_cache = []
     _qb_client = "qbittorrent"
     _tr_client = "transmission"
 
     def __init__(self):
+        self._brush_lock = Lock()
         self.init_config()
 
     def init_config(self):
         self.dbhelper = DbHelper()
+        self.dbhelper.init_brush_enclosure_filter()
         self.rsshelper = RssHelper()
         self.message = Message()
         self.sites = Sites()
@@ -91,25 +99,21 @@ class BrushTask(object):
 
     def load_brushtasks(self):
         """
-        从数据库加载刷流任务
+        从数据库加载刷流任务，解析规则并一次查询各任务的保种体积
         """
-        self._brush_tasks = {}
-        brushtasks = self.dbhelper.get_brushtasks()
-        if not brushtasks:
-            return
-        # 加载任务到内存
+        version = self._brush_version
+        brush_tasks = {}
+        brush_rules = {}
+        brush_totals = {}
+        brushtasks = self.dbhelper.get_brushtasks() or []
+        total_sizes = self.dbhelper.get_brushtask_totalsizes() if brushtasks else {}
         for task in brushtasks:
-            site_info = self.sites.get_sites(siteid=task.SITE)
-            if site_info:
-                site_url = StringUtils.get_base_url(site_info.get("signurl") or site_info.get("rssurl"))
-            else:
-                site_url = ""
-            downloader_info = self.downloader.get_downloader_conf(task.DOWNLOADER)
-            total_size = round(int(self.dbhelper.get_brushtask_totalsize(task.ID)) / (1024 ** 3), 1)
-            self._brush_tasks[str(task.ID)] = {
+            taskid = str(task.ID)
+            rss_rule = parse_brush_rule_str(task.RSS_RULE, task.NAME)
+            remove_rule = parse_brush_rule_str(task.REMOVE_RULE, task.NAME)
+            brush_tasks[taskid] = {
                 "id": task.ID,
                 "name": task.NAME,
-                "site": site_info.get("name"),
                 "site_id": task.SITE,
                 "interval": task.INTEVAL,
                 "label": task.LABEL,
@@ -118,36 +122,123 @@ class BrushTask(object):
                 "savepath": task.SAVEPATH,
                 "state": task.STATE,
                 "downloader": task.DOWNLOADER,
-                "downloader_name": downloader_info.get("name") if downloader_info else None,
                 "transfer": True if task.TRANSFER == "Y" else False,
                 "sendmessage": True if task.SENDMESSAGE == "Y" else False,
                 "free": task.FREELEECH,
-                "rss_rule": eval(task.RSS_RULE),
-                "remove_rule": eval(task.REMOVE_RULE),
+                "rss_rule": rss_rule,
+                "remove_rule": remove_rule,
                 "seed_size": task.SEED_SIZE,
-                "total_size": total_size,
-                "rss_url": task.RSSURL if task.RSSURL else site_info.get("rssurl"),
                 "rss_url_show": task.RSSURL,
-                "cookie": site_info.get("cookie"),
-                "ua": site_info.get("ua"),
-                "apikey": site_info.get("apikey"),
                 "download_count": task.DOWNLOAD_COUNT,
                 "remove_count": task.REMOVE_COUNT,
                 "download_size": StringUtils.str_filesize(task.DOWNLOAD_SIZE),
                 "upload_size": StringUtils.str_filesize(task.UPLOAD_SIZE),
-                "lst_mod_date": task.LST_MOD_DATE,
-                "site_url": site_url
+                "lst_mod_date": task.LST_MOD_DATE
+            }
+            brush_rules[taskid] = {
+                "rss": BrushRssRule(rss_rule, name=task.NAME),
+                "remove": BrushRemoveRule(remove_rule, name=task.NAME)
             }
+            brush_totals[taskid] = int(total_sizes.get(taskid) or 0)
+        with self._brush_lock:
+            self._brush_tasks = brush_tasks
+            self._brush_rules = brush_rules
+            self._brush_totals = brush_totals
+            self._brush_loaded_version = version
+
+    def __invalidate_brushtasks(self):
+        """
+        任务已变更，下一次读取时重新加载
+        """
+        with self._brush_lock:
+            self._brush_version += 1
+
+    def __get_task_info(self, task):
+        """
+        合并站点、下载器等实时信息及保种体积
+        """
+        site_info = self.sites.get_sites(siteid=task.get("site_id")) or {}
+        if site_info:
+            site_url = StringUtils.get_base_url(site_info.get("signurl") or site_info.get("rssurl"))
+        else:
+            site_url = ""
+        downloader_info = self.downloader.get_downloader_conf(task.get("downloader"))
+        total_size = self._brush_totals.get(str(task.get("id"))) or 0
+        return dict(task,
+                    site=site_info.get("name"),
+                    downloader_name=downloader_info.get("name") if downloader_info else None,
+                    total_size=round(total_size / (1024 ** 3), 1),
+                    rss_url=task.get("rss_url_show") or site_info.get("rssurl"),
+                    cookie=site_info.get("cookie"),
+                    ua=site_info.get("ua"),
+                    apikey=site_info.get("apikey"),
+                    site_url=site_url)
 
     def get_brushtask_info(self, taskid=None):
         """
-        读取刷流任务列表
+        读取刷流任务列表，任务有变更时才重新从数据库加载
         """
-        self.load_brushtasks()
+        if self._brush_loaded_version != self._brush_version:
+            self.load_brushtasks()
         if taskid:
-            return self._brush_tasks.get(str(taskid)) or {}
+            task = self._brush_tasks.get(str(taskid))
+            return self.__get_task_info(task) if task else {}
         else:
-            return self._brush_tasks if isinstance(self._brush_tasks, dict) else {}
+            return {tid: self.__get_task_info(task) for tid, task in self._brush_tasks.items()}
+
+    def __get_task_rules(self, taskid):
+        """
+        获取任务解析后的选种及删种规则
+        """
+        return self._brush_rules.get(str(taskid)) or {
+            "rss": BrushRssRule(),
+            "remove": BrushRemoveRule()
+        }
+
+    def __get_task_totalsize(self, taskid):
+        """
+        获取任务当前保种体积
+        """
+        return self._brush_totals.get(str(taskid)) or 0
+
+    def __add_task_torrent(self, taskid, size):
+        """
+        新增下载后更新任务的保种体积及下载数
+        """
+        with self._brush_lock:
+            taskid = str(taskid)
+            self._brush_totals[taskid] = self._brush_totals.get(taskid, 0) + self.__get_size(size)
+            task = self._brush_tasks.get(taskid)
+            if task:
+                task["download_count"] = (task.get("download_count") or 0) + 1
+                task["lst_mod_date"] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+
+    def __remove_task_torrents(self, taskid, removed_size, remove_count, sizes):
+        """
+        删除种子后更新任务的保种体积、删除数及上传下载量
+        :param removed_size: 删除种子的总大小
+        :param remove_count: 删除种子数
+        :param sizes: 更新后的上传量、下载量
+        """
+        with self._brush_lock:
+            taskid = str(taskid)
+            self._brush_totals[taskid] = max(self._brush_totals.get(taskid, 0) - removed_size, 0)
+            task = self._brush_tasks.get(taskid)
+            if task:
+                task["remove_count"] = (task.get("remove_count") or 0) + remove_count
+                if isinstance(sizes, dict):
+                    task["upload_size"] = StringUtils.str_filesize(sizes.get("upload_size"))
+                    task["download_size"] = StringUtils.str_filesize(sizes.get("download_size"))
+
+    @staticmethod
+    def __get_size(size):
+        """
+        种子大小转为整数，与数据库统计保种体积的方式一致
+        """
+        try:
+            return int(float(size or 0))
+        except (TypeError, ValueError):
+            return 0
 
     def check_task_rss(self, taskid):
         """
@@ -165,6 +256,7 @@ class BrushTask(object):
         site_id = taskinfo.get("site_id")
         rss_url = taskinfo.get("rss_url")
         rss_rule = taskinfo.get("rss_rule")
+        task_rss_rule = self.__get_task_rules(taskid).get("rss")
         cookie = taskinfo.get("cookie")
         rss_free = taskinfo.get("free")
         downloader_id = taskinfo.get("downloader")
@@ -208,16 +300,21 @@ class BrushTask(object):
                                            site_info=site_info):
             return
 
-        rss_result = self.rsshelper.parse_rssxml(url=rss_url, proxy=site_proxy)
+        # 只处理RSS中的新种子，选种规则变化时重新处理全部种子
+        feed_key = f"brush:{taskid}"
+        rss_result = self.rsshelper.parse_rssxml(url=rss_url,
+                                                 proxy=site_proxy,
+                                                 feed_key=feed_key,
+                                                 feed_version=StringUtils.md5_hash(f"{rss_rule}{rss_free}"))
         if rss_result is None:
             # RSS链接过期
             log.error(f"【Brush】{task_name} RSS链接已过期，请重新获取！")
             return
         if len(rss_result) == 0:
-            log.warn("【Brush】%s RSS未下载到数据" % site_name)
+            log.info("【Brush】%s RSS没有新数据" % site_name)
             return
         else:
-            log.info("【Brush】%s RSS获取数据：%s" % (site_name, len(rss_result)))
+            log.info("【Brush】%s RSS获取新数据：%s" % (site_name, len(rss_result)))
 
         # 同时下载数
         max_dlcount = rss_rule.get("dlcount")
@@ -231,6 +328,11 @@ class BrushTask(object):
         current_site_count = rss_rule.get("current_site_count")
         # 当前站点下载任务数
         current_site_dlcount = rss_rule.get("current_site_dlcount")
+        # 已处理完成的种子，未登记的种子下次继续处理
+        seen_enclosures = []
+        # 一次查询出已在刷流任务中的种子
+        handled_enclosures = self.dbhelper.get_brushtask_torrent_enclosures(
+            [res.get('enclosure') for res in rss_result])
 
         for res in rss_result:
             try:
@@ -247,19 +349,23 @@ class BrushTask(object):
 
                 if enclosure in self._torrents_cache:
                     log.debug("【Brush】%s 已处理过" % torrent_name)
+                    seen_enclosures.append(enclosure)
                     continue
 
                 # 检查种子是否符合选种规则
-                if not self.__check_rss_rule(rss_rule=rss_rule,
-                                             title=torrent_name,
-                                             torrent_url=page_url,
-                                             torrent_size=size,
-                                             pubdate=pubdate,
-                                             siteid=site_id,
-                                             cookie=cookie,
-                                             ua=ua,
-                                             apikey=apikey,
-                                             proxy=site_proxy):
+                rule_match, rule_retry = self.__check_rss_rule(rss_rule=task_rss_rule,
+                                                               title=torrent_name,
+                                                               torrent_url=page_url,
+                                                               torrent_size=size,
+                                                               pubdate=pubdate,
+                                                               siteid=site_id,
+                                                               cookie=cookie,
+                                                               ua=ua,
+                                                               apikey=apikey,
+                                                               proxy=site_proxy)
+                if not rule_match:
+                    if not rule_retry:
+                        seen_enclosures.append(enclosure)
                     continue
                 # 检查能否添加当前种子，判断是否超过保种体积大小
                 if not self.__is_allow_new_torrent(taskinfo=taskinfo,
@@ -270,8 +376,9 @@ class BrushTask(object):
                                                    site_info=site_info):
                     continue
                 # 检查是否已处理过
-                if self.is_torrent_handled(enclosure=enclosure):
+                if enclosure in handled_enclosures:
                     log.info("【Brush】%s 已在刷流任务中" % torrent_name)
+                    seen_enclosures.append(enclosure)
                     continue
                 # 开始下载
                 log.debug("【Brush】%s 符合条件，开始下载..." % torrent_name)
@@ -283,6 +390,8 @@ class BrushTask(object):
                                            size=size):
                     # 计数
                     success_count += 1
+                    seen_enclosures.append(enclosure)
+                    handled_enclosures.add(enclosure)
                     # 添加种子后不能超过最大下载数量
                     if max_dlcount and success_count >= new_torrent_count:
                         break
@@ -298,6 +407,7 @@ class BrushTask(object):
             except Exception as err:
                 ExceptionUtils.exception_traceback(err)
                 continue
+        self.rsshelper.mark_feed_seen(feed_key=feed_key, enclosures=seen_enclosures)
         log.info("【Brush】任务 %s 本次添加了 %s 个下载" % (task_name, success_count))
 
     def remove_tasks_torrents(self):
@@ -339,7 +449,7 @@ class BrushTask(object):
                 # 任务信息
                 task_name = taskinfo.get("name")
                 downloader_id = taskinfo.get("downloader")
-                remove_rule = taskinfo.get("remove_rule")
+                remove_rule = self.__get_task_rules(taskid).get("remove")
                 sendmessage = taskinfo.get("sendmessage")
 
                 # 当前任务种子详情
@@ -403,12 +513,11 @@ class BrushTask(object):
                     # 未活跃时间
                     iatime = torrent_info.get("iatime")
                     # 判断是否符合删除条件
-                    need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                        seeding_time=seeding_time,
-                                                                        ratio=torrent_ratio,
-                                                                        uploaded=uploaded,
-                                                                        avg_upspeed=avg_upspeed,
-                                                                        iatime=iatime)
+                    need_delete, delete_type = remove_rule.check(seeding_time=seeding_time,
+                                                                 ratio=torrent_ratio,
+                                                                 uploaded=uploaded,
+                                                                 avg_upspeed=avg_upspeed,
+                                                                 iatime=iatime)
                     if need_delete:
                         log.info(
                             "【Brush】%s 做种达到删种条件：%s，删除任务..." % (torrent_name, delete_type.value))
@@ -478,11 +587,10 @@ class BrushTask(object):
                     # 下载量
                     downloaded = torrent_info.get("downloaded")
                     # 判断是否符合删除条件
-                    need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                        ratio=ratio,
-                                                                        dltime=dltime,
-                                                                        avg_upspeed=avg_upspeed,
-                                                                        iatime=iatime)
+                    need_delete, delete_type = remove_rule.check(ratio=ratio,
+                                                                 dltime=dltime,
+                                                                 avg_upspeed=avg_upspeed,
+                                                                 iatime=iatime)
                     if need_delete:
                         log.info(
                             "【Brush】%s 达到删种条件：%s，删除下载任务..." % (torrent_name, delete_type.value))
@@ -539,10 +647,17 @@ class BrushTask(object):
                     else:
                         log.info("【Brush】任务 %s 本次检查未删除下载任务" % task_name)
                 # 更新上传下载量和删除种子数
-                self.dbhelper.add_brushtask_upload_count(brush_id=taskid,
-                                                         upload_size=total_uploaded,
-                                                         download_size=total_downloaded,
-                                                         remove_count=len(delete_ids) + len(remove_torrent_ids))
+                sizes = self.dbhelper.add_brushtask_upload_count(brush_id=taskid,
+                                                                 upload_size=total_uploaded,
+                                                                 download_size=total_downloaded,
+                                                                 remove_count=len(delete_ids) + len(remove_torrent_ids))
+                # 已删除及手工删除的种子不再计入保种体积
+                torrent_sizes = {item.DOWNLOAD_ID: item.TORRENT_SIZE for item in task_torrents}
+                self.__remove_task_torrents(taskid=taskid,
+                                            removed_size=sum(self.__get_size(torrent_sizes.get(torrent_id))
+                                                             for torrent_id in delete_ids + remove_torrent_ids),
+                                            remove_count=len(delete_ids) + len(remove_torrent_ids),
+                                            sizes=sizes)
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
 
@@ -559,7 +674,7 @@ class BrushTask(object):
         dl_limit_speed = taskinfo.get("dl_limit") or None
         downloader_id = taskinfo.get("downloader")
         downloader_name = taskinfo.get("downloader_name")
-        total_size = self.dbhelper.get_brushtask_totalsize(taskinfo.get("id"))
+        total_size = self.__get_task_totalsize(taskinfo.get("id"))
         if torrent_size and seed_size:
             if float(torrent_size) + int(total_size) >= (float(seed_size) + 5) * 1024 ** 3:
                 log.warn("【Brush】刷流任务 %s 当前保种体积 %sGB，种子大小 %sGB，不添加刷流任务"
@@ -723,6 +838,7 @@ class BrushTask(object):
                                                   size=size):
             # 更新下载次数
             self.dbhelper.add_brushtask_download_count(brush_id=taskid)
+            self.__add_task_torrent(taskid, size)
         else:
             log.info("【Brush】%s 已下载过" % title)
 
@@ -741,7 +857,7 @@ class BrushTask(object):
                          proxy):
         """
         检查种子是否符合刷流过滤条件
-        :param rss_rule: 过滤条件字典
+        :param rss_rule: 解析后的选种规则
         :param title: 种子名称
         :param torrent_url: 种子页面地址
         :param torrent_size: 种子大小
@@ -750,192 +866,37 @@ class BrushTask(object):
         :param cookie: Cookie
         :param ua: User-Agent
         :param apikey: Api-Key
-        :return: 是否命中
+        :return: 是否命中，未命中时是否需要下次重新检查（促销、做种人数等会随时间变化）
         """
-        if not rss_rule:
-            return True
-        # 检查种子大小
+        if not rss_rule or not rss_rule.rule:
+            return True, False
         try:
-            if rss_rule.get("size"):
-                rule_sizes = rss_rule.get("size").split("#")
-                if rule_sizes[0]:
-                    if len(rule_sizes) > 1 and rule_sizes[1]:
-                        min_max_size = rule_sizes[1].split(',')
-                        min_size = min_max_size[0]
-                        if len(min_max_size) > 1:
-                            max_size = min_max_size[1]
-                        else:
-                            max_size = 0
-                        if rule_sizes[0] == "gt" and float(torrent_size) < float(min_size) * 1024 ** 3:
-                            return False
-                        if rule_sizes[0] == "lt" and float(torrent_size) > float(min_size) * 1024 ** 3:
-                            return False
-                        if rule_sizes[0] == "bw" and not float(min_size) * 1024 ** 3 < float(torrent_size) < float(
-                                max_size) * 1024 ** 3:
-                            return False
-
-            # 检查包含规则
-            if rss_rule.get("include"):
-                if not re.search(r"%s" % rss_rule.get("include"), title):
-                    return False
-
-            # 检查排除规则
-            if rss_rule.get("exclude"):
-                if re.search(r"%s" % rss_rule.get("exclude"), title):
-                    return False
+            # 检查种子大小、包含及排除规则
+            if not rss_rule.match_torrent(title=title, torrent_size=torrent_size):
+                return False, False
 
             # 站点流控
             if self.sites.check_ratelimit(siteid):
-                return False
+                return False, True
 
-            torrent_attr = self.siteconf.check_torrent_attr(torrent_url=torrent_url,
-                                                            cookie=cookie,
-                                                            ua=ua,
-                                                            apikey=apikey,
-                                                            proxy=proxy)
-            torrent_peer_count = int(torrent_attr.get("peer_count"))
-            log.debug("【Brush】%s 解析详情, %s" % (title, torrent_attr))
-
-            # 检查免费状态
-            if rss_rule.get("free") == "FREE":
-                if not torrent_attr.get("free"):
-                    log.debug("【Brush】不是一个FREE资源，跳过")
-                    return False
-            elif rss_rule.get("free") == "2XFREE":
-                if not torrent_attr.get("2xfree"):
-                    log.debug("【Brush】不是一个2XFREE资源，跳过")
-                    return False
-
-            # 检查HR状态
-            if rss_rule.get("hr"):
-                if torrent_attr.get("hr"):
-                    log.debug("【Brush】这是一个H&R资源，跳过")
-                    return False
-
-            # 检查做种人数
-            if rss_rule.get("peercount"):
-                # 兼容旧版本
-                peercount_str = rss_rule.get("peercount")
-                if not peercount_str:
-                    peercount_str = "#"
-                elif "#" not in peercount_str:
-                    peercount_str = "lt#" + peercount_str
-                else:
-                    pass
-                peer_counts = peercount_str.split("#")
-                if len(peer_counts) >= 2 and peer_counts[1]:
-                    min_max_count = peer_counts[1].split(',')
-                    min_count = int(min_max_count[0])
-                    if len(min_max_count) > 1:
-                        max_count = int(min_max_count[1])
-                    else:
-                        max_count = sys.maxsize
-                    if peer_counts[0] == "gt" and torrent_peer_count <= min_count:
-                        log.debug("【Brush】%s `判断做种数, 判断条件: peer_count:%d %s threshold:%d" % (
-                            title, torrent_peer_count, peer_counts[0], min_count))
-                        return False
-                    if peer_counts[0] == "lt" and torrent_peer_count >= min_count:
-                        log.debug("【Brush】%s `判断做种数, 判断条件: peer_count:%d %s threshold:%d" % (
-                            title, torrent_peer_count, peer_counts[0], min_count))
-                        return False
-                    if peer_counts[0] == "bw" and not (min_count <= torrent_peer_count <= max_count):
-                        log.debug("【Brush】%s `判断做种数, 判断条件: left:%d %s peer_count:%d %s right:%d" % (
-                            title, min_count, peer_counts[0], torrent_peer_count, peer_counts[0], max_count))
-                        return False
+            # 检查免费状态、HR及做种人数，没有这些条件时不查询种子详情
+            if rss_rule.need_attr:
+                torrent_attr = self.siteconf.check_torrent_attr(torrent_url=torrent_url,
+                                                                cookie=cookie,
+                                                                ua=ua,
+                                                                apikey=apikey,
+                                                                proxy=proxy)
+                log.debug("【Brush】%s 解析详情, %s" % (title, torrent_attr))
+                if not rss_rule.match_attr(title=title, torrent_attr=torrent_attr):
+                    return False, True
 
             # 检查发布时间
-            if rss_rule.get("pubdate") and pubdate:
-                rule_pubdates = rss_rule.get("pubdate").split("#")
-                if len(rule_pubdates) >= 2 and rule_pubdates[1]:
-                    min_max_pubdates = rule_pubdates[1].split(',')
-                    min_pubdate = min_max_pubdates[0]
-                    max_pubdate = min_max_pubdates[1] if len(min_max_pubdates) > 1 else None
-                    localtz = pytz.timezone(Config().get_timezone())
-                    localnowtime = datetime.now().astimezone(localtz)
-                    localpubdate = pubdate.astimezone(localtz)
-                    pudate_hour = int(localnowtime.timestamp() - localpubdate.timestamp()) / 3600
-                    log.debug('【Brush】发布时间：%s，当前时间：%s，时间间隔：%f hour' % (
-                        localpubdate.isoformat(), localnowtime.isoformat(), pudate_hour))
-                    if rule_pubdates[0] == "lt" and pudate_hour >= float(min_pubdate):
-                        log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d" % (
-                            title, rule_pubdates[0], float(min_pubdate)))
-                        return False
-                    if rule_pubdates[0] == "gt" and pudate_hour <= float(min_pubdate):
-                        log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d" % (
-                            title, rule_pubdates[0], float(min_pubdate)))
-                        return False
-                    if rule_pubdates[0] == "bw" and (
-                            not max_pubdate or not (
-                            float(min_pubdate) <= pudate_hour <= float(max_pubdate))):
-                        log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d %d" % (
-                            title, rule_pubdates[0], float(min_pubdate), float(max_pubdate or 0)))
-                        return False
+            return rss_rule.match_pubdate(title=title, pubdate=pubdate)
 
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
 
-        return True
-
-    @staticmethod
-    def __check_remove_rule(remove_rule,
-                            seeding_time=None,
-                            ratio=None,
-                            uploaded=None,
-                            dltime=None,
-                            avg_upspeed=None,
-                            iatime=None):
-        """
-        检查是否符合删种规则
-        :param remove_rule: 删种规则
-        :param seeding_time: 做种时间
-        :param ratio: 分享率
-        :param uploaded: 上传量
-        :param dltime: 下载耗时
-        :param avg_upspeed: 上传平均速度
-        :param iatime: 未活动时间
-        """
-        if not remove_rule:
-            return False
-        try:
-            if remove_rule.get("time") and seeding_time:
-                rule_times = remove_rule.get("time").split("#")
-                if rule_times[0]:
-                    if len(rule_times) > 1 and rule_times[1]:
-                        if float(seeding_time) > float(rule_times[1]) * 3600:
-                            return True, BrushDeleteType.SEEDTIME
-            if remove_rule.get("ratio") and ratio:
-                rule_ratios = remove_rule.get("ratio").split("#")
-                if rule_ratios[0]:
-                    if len(rule_ratios) > 1 and rule_ratios[1]:
-                        if float(ratio) > float(rule_ratios[1]):
-                            return True, BrushDeleteType.RATIO
-            if remove_rule.get("uploadsize") and uploaded:
-                rule_uploadsizes = remove_rule.get("uploadsize").split("#")
-                if rule_uploadsizes[0]:
-                    if len(rule_uploadsizes) > 1 and rule_uploadsizes[1]:
-                        if float(uploaded) > float(rule_uploadsizes[1]) * 1024 ** 3:
-                            return True, BrushDeleteType.UPLOADSIZE
-            if remove_rule.get("dltime") and dltime:
-                rule_times = remove_rule.get("dltime").split("#")
-                if rule_times[0]:
-                    if len(rule_times) > 1 and rule_times[1]:
-                        if float(dltime) > float(rule_times[1]) * 3600:
-                            return True, BrushDeleteType.DLTIME
-            if remove_rule.get("avg_upspeed") and avg_upspeed:
-                rule_avg_upspeeds = remove_rule.get("avg_upspeed").split("#")
-                if rule_avg_upspeeds[0]:
-                    if len(rule_avg_upspeeds) > 1 and rule_avg_upspeeds[1]:
-                        if float(avg_upspeed) < float(rule_avg_upspeeds[1]) * 1024:
-                            return True, BrushDeleteType.AVGUPSPEED
-            if remove_rule.get("iatime") and iatime:
-                rule_times = remove_rule.get("iatime").split("#")
-                if rule_times[0]:
-                    if len(rule_times) > 1 and rule_times[1]:
-                        if float(iatime) > float(rule_times[1]) * 3600:
-                            return True, BrushDeleteType.IATIME
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
-        return False, BrushDeleteType.NOTDELETE
+        return True, False
 
     @staticmethod
     def __get_torrent_dict(downloader_type, torrent):
@@ -1035,6 +996,7 @@ class BrushTask(object):
         新增刷种任务
         """
         ret = self.dbhelper.update_brushtask(brushtask_id, item)
+        self.__invalidate_brushtasks()
         self.init_config()
         return ret
 
@@ -1043,6 +1005,7 @@ class BrushTask(object):
         删除刷种任务
         """
         ret = self.dbhelper.delete_brushtask(brushtask_id)
+        self.__invalidate_brushtasks()
         self.init_config()
         return ret
 
@@ -1051,6 +1014,7 @@ class BrushTask(object):
         更新刷种任务状态
         """
         ret = self.dbhelper.update_brushtask_state(tid=brushtask_id, state=state)
+        self.__invalidate_brushtasks()
         self.init_config()
         return ret
 
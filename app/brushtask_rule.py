@@ -0,0 +1,223 @@
+import ast
+import re
+import sys
+from datetime import datetime
+
+import pytz
+
+import log
+from app.utils.types import BrushDeleteType
+from config import Config
+
+
+def parse_brush_rule_str(rule_str, name=""):
+    """
+    解析数据库中保存的刷流规则字符串（字典的字面量），只接受字面量，不执行代码
+    :return: 规则字典，格式错误时返回空字典
+    """
+    if not rule_str:
+        return {}
+    try:
+        rule = ast.literal_eval(rule_str)
+    except (ValueError, SyntaxError) as err:
+        log.error(f"【Brush】刷流任务 {name} 规则格式错误：{str(err)}")
+        return {}
+    return rule if isinstance(rule, dict) else {}
+
+
+class BrushRange(object):
+    """
+    刷流规则中的比较条件，格式：操作符#值 或 操作符#最小值,最大值，操作符为 gt/lt/bw
+    """
+    __slots__ = ("op", "min", "max")
+
+    def __init__(self, op, min_value, max_value=None):
+        self.op = op
+        self.min = min_value
+        self.max = max_value
+
+    @classmethod
+    def parse(cls, value, cast=float, default_max=None):
+        """
+        解析比较条件，未设置时返回None，数值格式错误时抛出ValueError
+        """
+        if not value:
+            return None
+        values = str(value).split("#")
+        if not values[0] or len(values) < 2 or not values[1]:
+            return None
+        min_max = values[1].split(",")
+        max_value = cast(min_max[1]) if len(min_max) > 1 and min_max[1] else default_max
+        return cls(values[0], cast(min_max[0]), max_value)
+
+
+class BrushRssRule(object):
+    """
+    刷流选种规则，加载任务时解析一次，正则预编译、大小换算为Byte
+    """
+
+    def __init__(self, rule=None, name=""):
+        """
+        :param rule: 选种规则字典
+        :param name: 任务名称，用于日志
+        """
+        self.rule = rule or {}
+        self.name = name
+        self.error = None
+        self.size = self.peercount = self.pubdate = None
+        self.include = self.exclude = None
+        self.free = self.rule.get("free")
+        self.hr = bool(self.rule.get("hr"))
+        try:
+            self.size = BrushRange.parse(self.rule.get("size"), default_max=0)
+            # 兼容旧版本只有数值的做种人数
+            peercount = self.rule.get("peercount")
+            if peercount and "#" not in str(peercount):
+                peercount = f"lt#{peercount}"
+            self.peercount = BrushRange.parse(peercount, cast=int, default_max=sys.maxsize)
+            self.pubdate = BrushRange.parse(self.rule.get("pubdate"))
+            if self.rule.get("include"):
+                self.include = re.compile(r"%s" % self.rule.get("include"))
+            if self.rule.get("exclude"):
+                self.exclude = re.compile(r"%s" % self.rule.get("exclude"))
+        except (ValueError, re.error) as err:
+            self.error = str(err)
+            log.error(f"【Brush】刷流任务 {self.name} 选种规则错误：{str(err)}")
+
+    @property
+    def need_attr(self):
+        """
+        是否需要查询种子详情（促销、HR、做种人数）
+        """
+        return bool(self.free in ["FREE", "2XFREE"] or self.hr or self.peercount)
+
+    def match_torrent(self, title, torrent_size):
+        """
+        检查种子大小、包含及排除规则
+        """
+        if self.error:
+            return False
+        if self.size:
+            torrent_size = float(torrent_size or 0)
+            min_size = self.size.min * 1024 ** 3
+            max_size = self.size.max * 1024 ** 3
+            if self.size.op == "gt" and torrent_size < min_size:
+                return False
+            if self.size.op == "lt" and torrent_size > min_size:
+                return False
+            if self.size.op == "bw" and not min_size < torrent_size < max_size:
+                return False
+        if self.include and not self.include.search(title):
+            return False
+        if self.exclude and self.exclude.search(title):
+            return False
+        return True
+
+    def match_attr(self, title, torrent_attr):
+        """
+        检查促销、HR及做种人数
+        """
+        if self.free == "FREE" and not torrent_attr.get("free"):
+            log.debug("【Brush】不是一个FREE资源，跳过")
+            return False
+        if self.free == "2XFREE" and not torrent_attr.get("2xfree"):
+            log.debug("【Brush】不是一个2XFREE资源，跳过")
+            return False
+        if self.hr and torrent_attr.get("hr"):
+            log.debug("【Brush】这是一个H&R资源，跳过")
+            return False
+        if self.peercount:
+            peer_count = int(torrent_attr.get("peer_count"))
+            op, min_count, max_count = self.peercount.op, self.peercount.min, self.peercount.max
+            if (op == "gt" and peer_count <= min_count) \
+                    or (op == "lt" and peer_count >= min_count) \
+                    or (op == "bw" and not min_count <= peer_count <= max_count):
+                log.debug("【Brush】%s `判断做种数, 判断条件: peer_count:%d %s %d-%d" % (
+                    title, peer_count, op, min_count, max_count))
+                return False
+        return True
+
+    def match_pubdate(self, title, pubdate):
+        """
+        检查发布时间
+        :return: 是否命中，未命中时是否需要下次重新检查
+        """
+        if not self.pubdate or not pubdate:
+            return True, False
+        localtz = pytz.timezone(Config().get_timezone())
+        localnowtime = datetime.now().astimezone(localtz)
+        localpubdate = pubdate.astimezone(localtz)
+        pudate_hour = int(localnowtime.timestamp() - localpubdate.timestamp()) / 3600
+        log.debug('【Brush】发布时间：%s，当前时间：%s，时间间隔：%f hour' % (
+            localpubdate.isoformat(), localnowtime.isoformat(), pudate_hour))
+        op, min_pubdate, max_pubdate = self.pubdate.op, self.pubdate.min, self.pubdate.max
+        if op == "lt" and pudate_hour >= min_pubdate:
+            log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d" % (title, op, min_pubdate))
+            return False, False
+        if op == "gt" and pudate_hour <= min_pubdate:
+            log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d" % (title, op, min_pubdate))
+            return False, True
+        if op == "bw" and (not max_pubdate or not min_pubdate <= pudate_hour <= max_pubdate):
+            log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d %d" % (
+                title, op, min_pubdate, max_pubdate or 0))
+            return False, True
+        return True, False
+
+
+class BrushRemoveRule(object):
+    """
+    刷流删种规则，加载任务时解析一次，阈值换算为秒、Byte
+    """
+    # 规则KEY、删除类型、单位换算
+    CONDITIONS = [
+        ("time", BrushDeleteType.SEEDTIME, 3600),
+        ("ratio", BrushDeleteType.RATIO, 1),
+        ("uploadsize", BrushDeleteType.UPLOADSIZE, 1024 ** 3),
+        ("dltime", BrushDeleteType.DLTIME, 3600),
+        ("avg_upspeed", BrushDeleteType.AVGUPSPEED, 1024),
+        ("iatime", BrushDeleteType.IATIME, 3600)
+    ]
+
+    def __init__(self, rule=None, name=""):
+        """
+        :param rule: 删种规则字典
+        :param name: 任务名称，用于日志
+        """
+        self.rule = rule or {}
+        self.name = name
+        # 规则KEY -> 换算后的阈值
+        self.thresholds = {}
+        for key, _, unit in self.CONDITIONS:
+            try:
+                condition = BrushRange.parse(self.rule.get(key))
+            except ValueError as err:
+                log.error(f"【Brush】刷流任务 {self.name} 删种规则错误：{str(err)}")
+                continue
+            if condition:
+                self.thresholds[key] = condition.min * unit
+
+    def check(self, seeding_time=None, ratio=None, uploaded=None, dltime=None, avg_upspeed=None, iatime=None):
+        """
+        检查是否符合删种规则
+        :return: 是否删除，删除类型
+        """
+        values = {
+            "time": seeding_time,
+            "ratio": ratio,
+            "uploadsize": uploaded,
+            "dltime": dltime,
+            "avg_upspeed": avg_upspeed,
+            "iatime": iatime
+        }
+        for key, delete_type, _ in self.CONDITIONS:
+            threshold = self.thresholds.get(key)
+            value = values.get(key)
+            if threshold is None or not value:
+                continue
+            # 平均上传速度低于阈值时删除，其它条件超过阈值时删除
+            if key == "avg_upspeed":
+                if float(value) < threshold:
+                    return True, delete_type
+            elif float(value) > threshold:
+                return True, delete_type
+        return False, BrushDeleteType.NOTDELETE
@@ -12,6 +12,8 @@ class _IDownloadClient(metaclass=ABCMeta):
     client_type = ""
     # 下载器名称
     client_name = ""
+    # 批量操作时每次请求的种子数
+    batch_size = 200
 
     @abstractmethod
     def match(self, ctype):
@@ -98,6 +100,15 @@ class _IDownloadClient(metaclass=ABCMeta):
         """
         pass
 
+    def evaluate_remove_rules(self, rules):
+        """
+        计算多个删种规则，支持的下载器在同一份种子快照上一次完成
+        :param rules: 规则KEY -> RemoveRule
+        :return: 规则KEY -> {"torrents": 符合条件的种子列表, "seconds": 计算耗时}
+        """
+        return {key: {"torrents": self.get_remove_torrents(config=rule.config) or [], "seconds": 0}
+                for key, rule in rules.items()}
+
     @abstractmethod
     def add_torrent(self, **kwargs):
         """
@@ -126,6 +137,47 @@ class _IDownloadClient(metaclass=ABCMeta):
         """
         pass
 
+    def __batch_call(self, func, ids, **kwargs):
+        """
+        种子ID分批后调用下载控制方法
+        :return: 任一批次返回False时返回False
+        """
+        if not ids:
+            return False
+        if not isinstance(ids, list):
+            ids = [ids]
+        ret = True
+        for i in range(0, len(ids), self.batch_size):
+            if func(ids=ids[i:i + self.batch_size], **kwargs) is False:
+                ret = False
+        return ret
+
+    def batch_start_torrents(self, ids):
+        """
+        批量下载控制：开始
+        """
+        return self.__batch_call(self.start_torrents, ids)
+
+    def batch_stop_torrents(self, ids):
+        """
+        批量下载控制：停止
+        """
+        return self.__batch_call(self.stop_torrents, ids)
+
+    def batch_delete_torrents(self, ids, delete_file=False):
+        """
+        批量删除种子
+        """
+        return self.__batch_call(self.delete_torrents, ids, delete_file=delete_file)
+
+    def batch_set_torrents_status(self, ids, tags=None):
+        """
+        批量设置种子为已整理状态，tags为这批种子共同的原有标签
+        """
+        # 部分下载器会在传入的标签列表上追加标签，每批使用副本
+        return self.__batch_call(lambda ids: self.set_torrents_status(ids=ids, tags=list(tags) if tags else tags),
+                                 ids)
+
     @abstractmethod
     def get_download_dirs(self):
         """
@@ -0,0 +1,141 @@
+import re
+import time
+
+import log
+from app.utils import StringUtils
+
+
+class RemoveRow(object):
+    """
+    删种规则判断用的种子字段，由各下载器的种子信息统一转换而来
+    """
+    __slots__ = ("id", "name", "size", "ratio", "seeding_time", "upload_avs", "save_path", "trackers",
+                 "state", "category", "tags", "errors", "site")
+
+    def __init__(self, **kwargs):
+        for key in self.__slots__:
+            setattr(self, key, kwargs.get(key))
+
+    def to_dict(self):
+        # 未指定站点时按Tracker域名获取，只对符合条件的种子计算
+        site = self.site
+        if site is None:
+            site = StringUtils.get_url_sld(self.trackers[0]) if self.trackers else ""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "site": site,
+            "size": self.size
+        }
+
+
+class RemoveRule(object):
+    """
+    编译后的删种规则：正则只编译一次，大小、时间等阈值换算为统一单位
+    """
+
+    def __init__(self, config, name=None):
+        """
+        :param config: 删种策略，同Downloader.get_remove_torrents的config
+        :param name: 规则名称，用于日志
+        """
+        self.config = config or {}
+        self.name = name or ""
+        self.error = None
+        self.ratio = self.config.get("ratio")
+        # 做种时间 单位：秒
+        self.seeding_time = (self.config.get("seeding_time") or 0) * 3600
+        # 大小 单位：Byte
+        size = self.config.get("size")
+        self.minsize = size[0] * 1024 * 1024 * 1024 if size else 0
+        self.maxsize = size[-1] * 1024 * 1024 * 1024 if size else 0
+        self.size = bool(size)
+        # 平均上传速度 单位：Byte/s
+        self.upload_avs = (self.config.get("upload_avs") or 0) * 1024
+        self.filter_tags = self.config.get("filter_tags") or []
+        # Transmission的状态在查询种子时过滤，qBittorrent的状态在规则中判断
+        self.status = set(self.config.get("tr_state") or [])
+        self.states = set(self.config.get("qb_state") or [])
+        self.categories = set(self.config.get("qb_category") or [])
+        self.samedata = bool(self.config.get("samedata"))
+        self.savepath_re = self.tracker_re = self.error_re = None
+        try:
+            self.savepath_re = self.__compile(self.config.get("savepath_key"))
+            self.tracker_re = self.__compile(self.config.get("tracker_key"))
+            self.error_re = self.__compile(self.config.get("tr_error_key"))
+        except re.error as err:
+            self.error = str(err)
+            log.error(f"【TorrentRemover】删种规则 {self.name} 正则表达式错误：{str(err)}")
+
+    @staticmethod
+    def __compile(key):
+        return re.compile(key, re.I) if key else None
+
+    def prefilter(self, row):
+        """
+        查询种子时的标签及状态过滤，辅种也需满足
+        """
+        for tag in self.filter_tags:
+            if tag and tag not in row.tags:
+                return False
+        if self.status and row.state not in self.status:
+            return False
+        return True
+
+    def match(self, row):
+        """
+        种子是否符合删种条件
+        """
+        if self.error or not self.prefilter(row):
+            return False
+        if self.ratio and row.ratio <= self.ratio:
+            return False
+        if self.seeding_time and row.seeding_time <= self.seeding_time:
+            return False
+        if self.size and (row.size >= self.maxsize or row.size <= self.minsize):
+            return False
+        if self.upload_avs and row.upload_avs >= self.upload_avs:
+            return False
+        if self.savepath_re and not self.savepath_re.search(row.save_path or ""):
+            return False
+        if self.tracker_re and not any(self.tracker_re.search(tracker or "") for tracker in row.trackers):
+            return False
+        if self.error_re and not any(self.error_re.search(error or "") for error in row.errors):
+            return False
+        if self.states and row.state not in self.states:
+            return False
+        if self.categories and row.category not in self.categories:
+            return False
+        return True
+
+
+def evaluate_remove_rules(rows, rules):
+    """
+    在同一份种子字段列表上计算多个删种规则
+    :param rows: RemoveRow列表
+    :param rules: 规则KEY -> RemoveRule
+    :return: 规则KEY -> {"torrents": 符合条件的种子列表, "seconds": 计算耗时}
+    """
+    results = {}
+    samedata_index = None
+    for key, rule in rules.items():
+        start_time = time.perf_counter()
+        matched = [row for row in rows if rule.match(row)]
+        torrents = [row.to_dict() for row in matched]
+        if rule.samedata and matched:
+            # 名称+大小 -> 种子，所有规则共用
+            if samedata_index is None:
+                samedata_index = {}
+                for row in rows:
+                    samedata_index.setdefault((row.name, row.size), []).append(row)
+            matched_ids = {row.id for row in matched}
+            samedata = []
+            for row in matched:
+                for same_row in samedata_index.get((row.name, row.size)) or []:
+                    if same_row.id in matched_ids or not rule.prefilter(same_row):
+                        continue
+                    matched_ids.add(same_row.id)
+                    samedata.append(same_row.to_dict())
+            torrents = samedata + torrents
+        results[key] = {"torrents": torrents, "seconds": time.perf_counter() - start_time}
+    return results
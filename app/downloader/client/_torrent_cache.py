@@ -0,0 +1,178 @@
+import time
+from abc import ABCMeta, abstractmethod
+from threading import Lock
+
+import log
+
+# qBittorrent状态过滤对应的种子状态
+QB_STATUS_STATES = {
+    "downloading": {"downloading", "metaDL", "forcedMetaDL", "stalledDL", "checkingDL", "pausedDL", "stoppedDL",
+                    "queuedDL", "forcedDL"},
+    "seeding": {"uploading", "stalledUP", "checkingUP", "queuedUP", "forcedUP"},
+    "completed": {"uploading", "stalledUP", "checkingUP", "pausedUP", "stoppedUP", "queuedUP", "forcedUP"},
+    "paused": {"pausedDL", "pausedUP", "stoppedDL", "stoppedUP"},
+    "stopped": {"pausedDL", "pausedUP", "stoppedDL", "stoppedUP"},
+    "stalled": {"stalledDL", "stalledUP"},
+    "stalled_downloading": {"stalledDL"},
+    "stalled_uploading": {"stalledUP"},
+    "checking": {"checkingDL", "checkingUP", "checkingResumeData"},
+    "moving": {"moving"},
+    "errored": {"error", "missingFiles", "unknown"}
+}
+
+
+class _TorrentCache(metaclass=ABCMeta):
+    """
+    下载器种子状态缓存：各处查询共用同一份快照，快照按增量方式更新，
+    在刷新间隔内的重复查询直接读取快照，下载器上有写操作后下一次查询强制刷新
+    """
+    # 快照刷新间隔（秒）
+    REFRESH_INTERVAL = 2
+
+    def __init__(self, client_name="", name=""):
+        self._client_name = client_name
+        self._name = name
+        self._lock = Lock()
+        # 种子ID -> 种子字段
+        self._torrents = {}
+        self._refresh_time = 0
+        self._stats = {"full": 0, "delta": 0, "hit": 0}
+
+    def invalidate(self):
+        """
+        下载器上有写操作，下一次查询时刷新快照
+        """
+        self._refresh_time = 0
+
+    def reset(self):
+        """
+        清空快照，下一次查询时全量同步
+        """
+        with self._lock:
+            self._torrents = {}
+            self._refresh_time = 0
+            self._reset_sync()
+
+    def _reset_sync(self):
+        pass
+
+    @abstractmethod
+    def _sync(self):
+        """
+        同步下载器种子状态到快照，需在锁内调用
+        """
+        pass
+
+    def snapshot(self):
+        """
+        获取最新的种子状态快照
+        :return: 种子字段列表，发生错误时返回None
+        """
+        with self._lock:
+            if time.time() - self._refresh_time < self.REFRESH_INTERVAL:
+                self._stats["hit"] += 1
+            else:
+                try:
+                    self._sync()
+                    self._refresh_time = time.time()
+                except Exception as err:
+                    self._torrents = {}
+                    self._refresh_time = 0
+                    self._reset_sync()
+                    log.error(f"【{self._client_name}】{self._name} 同步种子状态出错：{str(err)}")
+                    return None
+            return list(self._torrents.values())
+
+    def get_stats(self):
+        """
+        获取同步统计：种子数、全量同步次数、增量同步次数、直接读取快照次数
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["torrents"] = len(self._torrents)
+        return stats
+
+
+class QbittorrentTorrentCache(_TorrentCache):
+    """
+    qBittorrent种子状态缓存，使用/sync/maindata按rid增量同步
+    """
+
+    def __init__(self, qbc, client_name="", name=""):
+        super().__init__(client_name=client_name, name=name)
+        self._qbc = qbc
+        self._rid = 0
+
+    def _reset_sync(self):
+        self._rid = 0
+
+    def _sync(self):
+        maindata = self._qbc.sync_maindata(rid=self._rid)
+        if maindata.get("full_update") or not self._rid:
+            self._torrents = {}
+            self._stats["full"] += 1
+        else:
+            self._stats["delta"] += 1
+        for torrent_hash, fields in (maindata.get("torrents") or {}).items():
+            torrent = self._torrents.get(torrent_hash)
+            if torrent is None:
+                torrent = {"hash": torrent_hash}
+                self._torrents[torrent_hash] = torrent
+            torrent.update(fields)
+        for torrent_hash in maindata.get("torrents_removed") or []:
+            self._torrents.pop(torrent_hash, None)
+        self._rid = maindata.get("rid") or 0
+
+    @staticmethod
+    def match(torrent, ids=None, status=None, tag=None):
+        """
+        按种子Hash、状态过滤及标签匹配种子，规则与torrents_info一致
+        """
+        if ids and torrent.get("hash") not in ids:
+            return False
+        if status and not any(torrent.get("state") in QB_STATUS_STATES.get(s, {s}) for s in status):
+            return False
+        if tag:
+            torrent_tags = torrent.get("tags") or ""
+            for t in tag:
+                if t and t not in torrent_tags:
+                    return False
+        return True
+
+
+class TransmissionTorrentCache(_TorrentCache):
+    """
+    Transmission种子状态缓存，使用recently-active增量同步，
+    Transmission只返回最近60秒内有变化的种子，距上次同步过久时改为全量同步
+    """
+    # 增量同步的最大间隔（秒）
+    DELTA_WINDOW = 50
+    # 全量同步间隔（秒），修正增量同步可能遗漏的变化
+    FULL_SYNC_INTERVAL = 600
+
+    def __init__(self, trc, arguments, client_name="", name=""):
+        super().__init__(client_name=client_name, name=name)
+        self._trc = trc
+        self._arguments = arguments
+        self._sync_time = 0
+        self._full_sync_time = 0
+
+    def _reset_sync(self):
+        self._sync_time = 0
+        self._full_sync_time = 0
+
+    def _sync(self):
+        now = time.time()
+        if now - self._sync_time > self.DELTA_WINDOW or now - self._full_sync_time > self.FULL_SYNC_INTERVAL:
+            torrents = self._trc.get_torrents(arguments=self._arguments)
+            self._torrents = {torrent.id: torrent for torrent in torrents}
+            self._full_sync_time = now
+            self._stats["full"] += 1
+        else:
+            torrents, removed = self._trc.get_recently_active_torrents(arguments=self._arguments)
+            for torrent in torrents:
+                self._torrents[torrent.id] = torrent
+            for torrent_id in removed or []:
+                self._torrents.pop(torrent_id, None)
+            self._stats["delta"] += 1
+        self._sync_time = now
@@ -1,11 +1,13 @@
 import os
-import re
 import time
-from datetime import datetime
 
 import log
 import qbittorrentapi
+from qbittorrentapi.torrents import TorrentDictionary
+
 from app.downloader.client._base import _IDownloadClient
+from app.downloader.client._remove_rule import RemoveRow, RemoveRule, evaluate_remove_rules
+from app.downloader.client._torrent_cache import QbittorrentTorrentCache
 from app.utils import ExceptionUtils, StringUtils
 from app.utils.types import DownloaderType
 
@@ -21,6 +23,7 @@ class Qbittorrent(_IDownloadClient):
     # 私有属性
     _client_config = {}
     _torrent_management = False
+    _torrent_cache = None
 
     qbc = None
     ver = None
@@ -64,6 +67,7 @@ class Qbittorrent(_IDownloadClient):
     def connect(self):
         if self.host and self.port:
             self.qbc = self.__login_qbittorrent()
+        self._torrent_cache = QbittorrentTorrentCache(self.qbc, client_name=self.client_name, name=self.name)
 
     def __login_qbittorrent(self):
         """
@@ -177,32 +181,35 @@ class Qbittorrent(_IDownloadClient):
 
     def get_torrents(self, ids=None, status=None, tag=None):
         """
-        获取种子列表
+        获取种子列表，从增量同步的种子状态快照中过滤
         return: 种子列表, 是否发生异常
         """
         if not self.qbc:
             return [], True
         try:
-            torrents = self.qbc.torrents_info(torrent_hashes=ids,
-                                              status_filter=status)
-            if tag:
-                results = []
-                if not isinstance(tag, list):
-                    tag = [tag]
-                for torrent in torrents:
-                    include_flag = True
-                    for t in tag:
-                        if t and t not in torrent.get("tags"):
-                            include_flag = False
-                            break
-                    if include_flag:
-                        results.append(torrent)
-                return results or [], False
-            return torrents or [], False
+            torrents = self._torrent_cache.snapshot()
+            if torrents is None:
+                return [], True
+            if ids and not isinstance(ids, list):
+                ids = str(ids).split("|")
+            if status and not isinstance(status, list):
+                status = [status]
+            if tag and not isinstance(tag, list):
+                tag = [tag]
+            ids = set(ids) if ids else None
+            return [TorrentDictionary(data=torrent, client=self.qbc)
+                    for torrent in torrents
+                    if QbittorrentTorrentCache.match(torrent, ids=ids, status=status, tag=tag)], False
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 获取种子列表出错：{str(err)}")
             return [], True
 
+    def get_torrent_cache_stats(self):
+        """
+        获取种子状态同步统计
+        """
+        return self._torrent_cache.get_stats()
+
     def get_completed_torrents(self, ids=None, tag=None):
         """
         获取已完成的种子
@@ -232,7 +239,9 @@ class Qbittorrent(_IDownloadClient):
         :param tag: 标签内容
         """
         try:
-            return self.qbc.torrents_delete_tags(torrent_hashes=ids, tags=tag)
+            ret = self.qbc.torrents_delete_tags(torrent_hashes=ids, tags=tag)
+            self._torrent_cache.invalidate()
+            return ret
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 移除种子tag出错：{str(err)}")
             return False
@@ -246,6 +255,7 @@ class Qbittorrent(_IDownloadClient):
         try:
             # 打标签
             self.qbc.torrents_add_tags(tags="已整理", torrent_hashes=ids)
+            self._torrent_cache.invalidate()
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 设置种子状态为已整理出错：{str(err)}")
 
@@ -303,68 +313,40 @@ class Qbittorrent(_IDownloadClient):
         """
         if not config:
             return []
-        remove_torrents = []
-        remove_torrents_ids = []
-        torrents, error_flag = self.get_torrents(tag=config.get("filter_tags"))
-        if error_flag:
-            return []
-        ratio = config.get("ratio")
-        # 做种时间 单位：小时
-        seeding_time = config.get("seeding_time")
-        # 大小 单位：GB
-        size = config.get("size")
-        minsize = size[0] * 1024 * 1024 * 1024 if size else 0
-        maxsize = size[-1] * 1024 * 1024 * 1024 if size else 0
-        # 平均上传速度 单位 KB/s
-        upload_avs = config.get("upload_avs")
-        savepath_key = config.get("savepath_key")
-        tracker_key = config.get("tracker_key")
-        qb_state = config.get("qb_state")
-        qb_category = config.get("qb_category")
+        results = self.evaluate_remove_rules({0: RemoveRule(config)})
+        return results.get(0, {}).get("torrents") or []
+
+    def evaluate_remove_rules(self, rules):
+        """
+        在同一份种子状态快照上计算多个删种规则
+        :param rules: 规则KEY -> RemoveRule
+        :return: 规则KEY -> {"torrents": 符合条件的种子列表, "seconds": 计算耗时}
+        """
+        if not self.qbc or not rules:
+            return {}
+        torrents = self._torrent_cache.snapshot()
+        if torrents is None:
+            return {}
+        date_now = int(time.time())
+        rows = []
         for torrent in torrents:
-            date_done = torrent.completion_on if torrent.completion_on > 0 else torrent.added_on
-            date_now = int(time.mktime(datetime.now().timetuple()))
-            torrent_seeding_time = date_now - date_done if date_done else 0
-            torrent_upload_avs = torrent.uploaded / torrent_seeding_time if torrent_seeding_time else 0
-            if ratio and torrent.ratio <= ratio:
-                continue
-            if seeding_time and torrent_seeding_time <= seeding_time * 3600:
-                continue
-            if size and (torrent.size >= maxsize or torrent.size <= minsize):
-                continue
-            if upload_avs and torrent_upload_avs >= upload_avs * 1024:
-                continue
-            if savepath_key and not re.findall(savepath_key, torrent.save_path, re.I):
-                continue
-            if tracker_key and not re.findall(tracker_key, torrent.tracker, re.I):
-                continue
-            if qb_state and torrent.state not in qb_state:
-                continue
-            if qb_category and torrent.category not in qb_category:
-                continue
-            remove_torrents.append({
-                "id": torrent.hash,
-                "name": torrent.name,
-                "site": StringUtils.get_url_sld(torrent.tracker),
-                "size": torrent.size
-            })
-            remove_torrents_ids.append(torrent.hash)
-        if config.get("samedata") and remove_torrents:
-            remove_torrents_plus = []
-            for remove_torrent in remove_torrents:
-                name = remove_torrent.get("name")
-                size = remove_torrent.get("size")
-                for torrent in torrents:
-                    if torrent.name == name and torrent.size == size and torrent.hash not in remove_torrents_ids:
-                        remove_torrents_plus.append({
-                            "id": torrent.hash,
-                            "name": torrent.name,
-                            "site": StringUtils.get_url_sld(torrent.tracker),
-                            "size": torrent.size
-                        })
-            remove_torrents_plus += remove_torrents
-            return remove_torrents_plus
-        return remove_torrents
+            completion_on = torrent.get("completion_on") or 0
+            date_done = completion_on if completion_on > 0 else torrent.get("added_on")
+            seeding_time = date_now - date_done if date_done else 0
+            tracker = torrent.get("tracker") or ""
+            rows.append(RemoveRow(id=torrent.get("hash"),
+                                  name=torrent.get("name"),
+                                  size=torrent.get("size") or 0,
+                                  ratio=torrent.get("ratio") or 0,
+                                  seeding_time=seeding_time,
+                                  upload_avs=(torrent.get("uploaded") or 0) / seeding_time if seeding_time else 0,
+                                  save_path=torrent.get("save_path"),
+                                  trackers=[tracker],
+                                  state=torrent.get("state"),
+                                  category=torrent.get("category"),
+                                  tags=torrent.get("tags") or "",
+                                  errors=[]))
+        return evaluate_remove_rules(rows, rules)
 
     def __get_last_add_torrentid_by_tag(self, tag, status=None):
         """
@@ -495,6 +477,7 @@ class Qbittorrent(_IDownloadClient):
                                             seeding_time_limit=seeding_time_limit,
                                             use_auto_torrent_management=is_auto,
                                             cookie=cookie)
+            self._torrent_cache.invalidate()
             return True if qbc_ret and str(qbc_ret).find("Ok") != -1 else False
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 添加种子出错：{str(err)}")
@@ -504,7 +487,9 @@ class Qbittorrent(_IDownloadClient):
         if not self.qbc:
             return False
         try:
-            return self.qbc.torrents_resume(torrent_hashes=ids)
+            ret = self.qbc.torrents_resume(torrent_hashes=ids)
+            self._torrent_cache.invalidate()
+            return ret
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 开始下载出错：{str(err)}")
             return False
@@ -513,7 +498,9 @@ class Qbittorrent(_IDownloadClient):
         if not self.qbc:
             return False
         try:
-            return self.qbc.torrents_pause(torrent_hashes=ids)
+            ret = self.qbc.torrents_pause(torrent_hashes=ids)
+            self._torrent_cache.invalidate()
+            return ret
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 停止下载出错：{str(err)}")
             return False
@@ -525,6 +512,7 @@ class Qbittorrent(_IDownloadClient):
             return False
         try:
             self.qbc.torrents_delete(delete_files=delete_file, torrent_hashes=ids)
+            self._torrent_cache.invalidate()
             return True
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 删除种子出错：{str(err)}")
@@ -651,7 +639,9 @@ class Qbittorrent(_IDownloadClient):
         if not self.qbc:
             return False
         try:
-            return self.qbc.torrents_recheck(torrent_hashes=ids)
+            ret = self.qbc.torrents_recheck(torrent_hashes=ids)
+            self._torrent_cache.invalidate()
+            return ret
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 检验种子出错：{str(err)}")
             return False
@@ -1,14 +1,15 @@
 import os.path
-import re
 import time
 from datetime import datetime
 
 import transmission_rpc
 
 import log
-from app.utils import ExceptionUtils, StringUtils
+from app.utils import StringUtils
 from app.utils.types import DownloaderType
 from app.downloader.client._base import _IDownloadClient
+from app.downloader.client._remove_rule import RemoveRow, RemoveRule, evaluate_remove_rules
+from app.downloader.client._torrent_cache import TransmissionTorrentCache
 
 
 class Transmission(_IDownloadClient):
@@ -27,6 +28,7 @@ class Transmission(_IDownloadClient):
 
     # 私有属性
     _client_config = {}
+    _torrent_cache = None
 
     trc = None
     host = None
@@ -62,6 +64,8 @@ class Transmission(_IDownloadClient):
     def connect(self):
         if self.host and self.port:
             self.trc = self.__login_transmission()
+        self._torrent_cache = TransmissionTorrentCache(self.trc, self._trarg,
+                                                       client_name=self.client_name, name=self.name)
 
     def __login_transmission(self):
         """
@@ -102,17 +106,20 @@ class Transmission(_IDownloadClient):
         if not self.trc:
             return [], True
         ids = self.__parse_ids(ids)
-        try:
-            torrents = self.trc.get_torrents(ids=ids, arguments=self._trarg)
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
+        torrents = self._torrent_cache.snapshot()
+        if torrents is None:
             return [], True
+        if ids is not None and not isinstance(ids, list):
+            ids = [ids]
         if status and not isinstance(status, list):
             status = [status]
         if tag and not isinstance(tag, list):
             tag = [tag]
+        ids = set(ids) if ids else None
         ret_torrents = []
         for torrent in torrents:
+            if ids and torrent.id not in ids and torrent.hashString not in ids:
+                continue
             if status and torrent.status not in status:
                 continue
             labels = torrent.labels if hasattr(torrent, "labels") else []
@@ -156,6 +163,12 @@ class Transmission(_IDownloadClient):
             log.error(f"【{self.client_name}】{self.name} 获取正在下载的种子列表出错：{str(err)}")
             return None
 
+    def get_torrent_cache_stats(self):
+        """
+        获取种子状态同步统计
+        """
+        return self._torrent_cache.get_stats()
+
     def set_torrents_status(self, ids, tags=None):
         """
         设置种子为已整理状态
@@ -174,6 +187,7 @@ class Transmission(_IDownloadClient):
         # 打标签
         try:
             self.trc.change_torrent(labels=tags, ids=ids)
+            self._torrent_cache.invalidate()
             log.info(f"【{self.client_name}】{self.name} 设置种子标签成功")
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 设置种子为已整理状态出错：{str(err)}")
@@ -187,6 +201,7 @@ class Transmission(_IDownloadClient):
         ids = self.__parse_ids(tid)
         try:
             self.trc.change_torrent(labels=tag, ids=ids)
+            self._torrent_cache.invalidate()
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 设置种子标签出错：{str(err)}")
 
@@ -253,6 +268,7 @@ class Transmission(_IDownloadClient):
                                     seedRatioLimit=seedRatioLimit,
                                     seedIdleMode=seedIdleMode,
                                     seedIdleLimit=seedIdleLimit)
+            self._torrent_cache.invalidate()
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 设置种子出错：{str(err)}")
 
@@ -299,82 +315,42 @@ class Transmission(_IDownloadClient):
         """
         if not config:
             return []
-        remove_torrents = []
-        remove_torrents_ids = []
-        torrents, error_flag = self.get_torrents(tag=config.get("filter_tags"),
-                                                 status=config.get("tr_state"))
-        if error_flag:
-            return []
-        ratio = config.get("ratio")
-        # 做种时间 单位：小时
-        seeding_time = config.get("seeding_time")
-        # 大小 单位：GB
-        size = config.get("size")
-        minsize = size[0] * 1024 * 1024 * 1024 if size else 0
-        maxsize = size[-1] * 1024 * 1024 * 1024 if size else 0
-        # 平均上传速度 单位 KB/s
-        upload_avs = config.get("upload_avs")
-        savepath_key = config.get("savepath_key")
-        tracker_key = config.get("tracker_key")
-        tr_error_key = config.get("tr_error_key")
+        results = self.evaluate_remove_rules({0: RemoveRule(config)})
+        return results.get(0, {}).get("torrents") or []
+
+    def evaluate_remove_rules(self, rules):
+        """
+        在同一份种子状态快照上计算多个删种规则
+        :param rules: 规则KEY -> RemoveRule
+        :return: 规则KEY -> {"torrents": 符合条件的种子列表, "seconds": 计算耗时}
+        """
+        if not self.trc or not rules:
+            return {}
+        torrents = self._torrent_cache.snapshot()
+        if torrents is None:
+            return {}
+        date_now = int(time.mktime(datetime.now().timetuple()))
+        rows = []
         for torrent in torrents:
             date_done = torrent.date_done or torrent.date_added
-            date_now = int(time.mktime(datetime.now().timetuple()))
-            torrent_seeding_time = date_now - int(time.mktime(date_done.timetuple())) if date_done else 0
-            torrent_uploaded = torrent.ratio * torrent.total_size
-            torrent_upload_avs = torrent_uploaded / torrent_seeding_time if torrent_seeding_time else 0
-            if ratio and torrent.ratio <= ratio:
-                continue
-            if seeding_time and torrent_seeding_time <= seeding_time * 3600:
-                continue
-            if size and (torrent.total_size >= maxsize or torrent.total_size <= minsize):
-                continue
-            if upload_avs and torrent_upload_avs >= upload_avs * 1024:
-                continue
-            if savepath_key and not re.findall(savepath_key, torrent.download_dir, re.I):
-                continue
-            if tracker_key:
-                if not torrent.trackers:
-                    continue
-                else:
-                    tacker_key_flag = False
-                    for tracker in torrent.trackers:
-                        if re.findall(tracker_key, tracker.get("announce", ""), re.I):
-                            tacker_key_flag = True
-                            break
-                    if not tacker_key_flag:
-                        continue
-            if tr_error_key:
-                announce_results = [x.last_announce_result for x in torrent.tracker_stats]
-                announce_results.append(torrent.error_string)
-
-                # 如果announce_results中均不匹配tr_error_key，则跳过
-                if not any([re.findall(tr_error_key, x, re.I) for x in announce_results]):
-                    continue
-
-            remove_torrents.append({
-                "id": torrent.hashString,
-                "name": torrent.name,
-                "site": torrent.trackers[0].get("sitename") if torrent.trackers else "",
-                "size": torrent.total_size
-            })
-            remove_torrents_ids.append(torrent.hashString)
-        if config.get("samedata") and remove_torrents:
-            remove_torrents_plus = []
-            for remove_torrent in remove_torrents:
-                name = remove_torrent.get("name")
-                size = remove_torrent.get("size")
-                for torrent in torrents:
-                    if torrent.name == name and torrent.total_size == size and torrent.hashString not in remove_torrents_ids:
-                        remove_torrents_plus.append({
-                            "id": torrent.hashString,
-                            "name": torrent.name,
-                            "site": torrent.trackers[0].get("sitename") if torrent.trackers else "",
-                            "size": torrent.total_size
-                        })
-            remove_torrents_plus += remove_torrents
-            return remove_torrents_plus
-        return remove_torrents
+            seeding_time = date_now - int(time.mktime(date_done.timetuple())) if date_done else 0
+            trackers = torrent.trackers or []
+            errors = [x.last_announce_result for x in torrent.tracker_stats]
+            errors.append(torrent.error_string)
+            rows.append(RemoveRow(id=torrent.hashString,
+                                  name=torrent.name,
+                                  size=torrent.total_size,
+                                  ratio=torrent.ratio,
+                                  seeding_time=seeding_time,
+                                  upload_avs=torrent.ratio * torrent.total_size / seeding_time if seeding_time else 0,
+                                  save_path=torrent.download_dir,
+                                  trackers=[tracker.get("announce", "") for tracker in trackers],
+                                  state=torrent.status,
+                                  category=None,
+                                  tags=torrent.labels if hasattr(torrent, "labels") else [],
+                                  errors=errors,
+                                  site=trackers[0].get("sitename") if trackers else ""))
+        return evaluate_remove_rules(rows, rules)
 
     def add_torrent(self, content,
                     is_paused=False,
@@ -393,6 +369,7 @@ class Transmission(_IDownloadClient):
                     self.set_uploadspeed_limit(ret.hashString, int(upload_limit))
                 if download_limit:
                     self.set_downloadspeed_limit(ret.hashString, int(download_limit))
+            self._torrent_cache.invalidate()
             return ret
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 添加种子出错：{str(err)}")
@@ -403,7 +380,9 @@ class Transmission(_IDownloadClient):
             return False
         ids = self.__parse_ids(ids)
         try:
-            return self.trc.start_torrent(ids=ids)
+            ret = self.trc.start_torrent(ids=ids)
+            self._torrent_cache.invalidate()
+            return ret
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 开始下载出错：{str(err)}")
             return False
@@ -413,7 +392,9 @@ class Transmission(_IDownloadClient):
             return False
         ids = self.__parse_ids(ids)
         try:
-            return self.trc.stop_torrent(ids=ids)
+            ret = self.trc.stop_torrent(ids=ids)
+            self._torrent_cache.invalidate()
+            return ret
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 停止下载出错：{str(err)}")
             return False
@@ -425,7 +406,9 @@ class Transmission(_IDownloadClient):
             return False
         ids = self.__parse_ids(ids)
         try:
-            return self.trc.remove_torrent(delete_data=delete_file, ids=ids)
+            ret = self.trc.remove_torrent(delete_data=delete_file, ids=ids)
+            self._torrent_cache.invalidate()
+            return ret
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 删除下载出错：{str(err)}")
             return False
@@ -566,7 +549,9 @@ class Transmission(_IDownloadClient):
             return False
         ids = self.__parse_ids(ids)
         try:
-            return self.trc.verify_torrent(ids=ids)
+            ret = self.trc.verify_torrent(ids=ids)
+            self._torrent_cache.invalidate()
+            return ret
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 校验种子出错：{str(err)}")
             return False
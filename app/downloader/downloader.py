@@ -1,4 +1,5 @@
 import os
+from concurrent.futures import as_completed
 from threading import Lock
 from enum import Enum
 import json
@@ -8,6 +9,8 @@ from apscheduler.schedulers.background import BackgroundScheduler
 import log
 from app.conf import ModuleConf
 from app.conf import SystemConfig
+from app.downloader.client._remove_rule import RemoveRule
+from app.downloader.transfer_queue import TransferQueue
 from app.filetransfer import FileTransfer
 from app.helper import DbHelper, ThreadHelper, SubmoduleHelper
 from app.media import Media
@@ -22,7 +25,6 @@ from app.utils.types import MediaType, DownloaderType, SearchType, RmtMode, Even
 from app.apis import MTeamApi
 from config import Config, PT_TAG, RMT_MEDIAEXT, PT_TRANSFER_INTERVAL
 
-lock = Lock()
 client_lock = Lock()
 
 
@@ -39,6 +41,19 @@ class Downloader:
     # 下载器ID-名称枚举类
     _DownloaderEnum = None
     _scheduler = None
+    # 下载文件转移队列
+    _transfer_queue = None
+    # 同时转移的任务总数
+    TRANSFER_WORKERS = 4
+    # 每个下载器同时转移的任务数
+    TRANSFER_DOWNLOADER_CONCURRENCY = 2
+    # 已转移的种子达到该数量时批量设置状态
+    TRANSFER_FLUSH_SIZE = 20
+    # 已转移、待批量设置状态的种子：下载器ID -> {种子ID: (原有标签, 是否删除种子)}
+    _transfer_done = {}
+    _transfer_done_lock = None
+    # 下载器ID -> 转移锁
+    _transfer_locks = {}
 
     message = None
     mediaserver = None
@@ -56,6 +71,11 @@ class Downloader:
             filter_func=lambda _, obj: hasattr(obj, 'client_id')
         )
         log.debug(f"【Downloader】加载下载器类型：{self._downloader_schema}")
+        self._transfer_queue = TransferQueue(max_workers=self.TRANSFER_WORKERS,
+                                             group_concurrency=self.TRANSFER_DOWNLOADER_CONCURRENCY)
+        self._transfer_done = {}
+        self._transfer_done_lock = Lock()
+        self._transfer_locks = {}
         self.init_config()
 
     def init_config(self):
@@ -541,44 +561,138 @@ class Downloader:
 
     def transfer(self, downloader_id=None):
         """
-        转移下载完成的文件，进行文件识别重命名到媒体库目录
+        转移下载完成的文件，进行文件识别重命名到媒体库目录，
+        各下载器的任务进入转移队列并行处理，已转移的种子按下载器分批设置状态或删除
         """
         downloader_ids = [downloader_id] if downloader_id \
             else self._monitor_downloader_ids
+        # 任务 -> 下载器ID
+        futures = {}
+        # 下载器ID -> 未完成的任务数
+        remaining = {}
         for downloader_id in downloader_ids:
-            with lock:
-                # 获取下载器配置
-                downloader_conf = self.get_downloader_conf(downloader_id)
-                name = downloader_conf.get("name")
-                only_nastool = downloader_conf.get("only_nastool")
-                match_path = downloader_conf.get("match_path")
-                rmt_mode = ModuleConf.RMT_MODES.get(downloader_conf.get("rmt_mode"))
-                # 获取下载器实例
-                _client = self.__get_client(downloader_id)
-                if not _client:
-                    continue
-                trans_tasks = _client.get_transfer_task(tag=PT_TAG if only_nastool else None, match_path=match_path)
-                if trans_tasks:
-                    log.info(f"【Downloader】下载器 {name} 开始转移下载文件...")
-                else:
+            # 获取下载器配置
+            downloader_conf = self.get_downloader_conf(downloader_id)
+            name = downloader_conf.get("name")
+            only_nastool = downloader_conf.get("only_nastool")
+            match_path = downloader_conf.get("match_path")
+            rmt_mode = ModuleConf.RMT_MODES.get(downloader_conf.get("rmt_mode"))
+            # 获取下载器实例
+            _client = self.__get_client(downloader_id)
+            if not _client:
+                continue
+            # 查询种子与读取待设置状态的种子在同一个锁内，与设置状态互斥，
+            # 避免读到设置状态前的种子列表、设置状态后的待设置列表而重复转移
+            with self.__get_transfer_lock(downloader_id):
+                trans_tasks = _client.get_transfer_task(tag=PT_TAG if only_nastool else None,
+                                                        match_path=match_path)
+                if not trans_tasks:
                     continue
+                with self._transfer_done_lock:
+                    done_ids = set(self._transfer_done.get(str(downloader_id)) or {})
+                count = 0
                 for task in trans_tasks:
-                    done_flag, done_msg = self.filetransfer.transfer_media(
-                        in_from=self._DownloaderEnum[str(downloader_id)],
-                        in_path=task.get("path"),
-                        rmt_mode=rmt_mode)
-                    if not done_flag:
-                        log.warn(f"【Downloader】下载器 {name} 任务%s 转移失败：%s" % (task.get("path"), done_msg))
-                        _client.set_torrents_status(ids=task.get("id"),
-                                                    tags=task.get("tags"))
-                    else:
-                        if rmt_mode in [RmtMode.MOVE, RmtMode.RCLONE, RmtMode.MINIO]:
-                            log.warn(f"【Downloader】下载器 {name} 移动模式下删除种子文件：%s" % task.get("id"))
-                            _client.delete_torrents(delete_file=True, ids=task.get("id"))
-                        else:
-                            _client.set_torrents_status(ids=task.get("id"),
-                                                        tags=task.get("tags"))
-                log.info(f"【Downloader】下载器 {name} 下载文件转移结束")
+                    # 已转移待设置状态的种子不重复提交
+                    if task.get("id") in done_ids:
+                        continue
+                    # 已在排队或转移中的种子不重复提交
+                    future = self._transfer_queue.submit(str(downloader_id),
+                                                         task.get("id"),
+                                                         self.__transfer_task,
+                                                         downloader_id, _client, task, rmt_mode,
+                                                         name=task.get("path"))
+                    if future:
+                        futures[future] = str(downloader_id)
+                        count += 1
+            if count:
+                remaining[str(downloader_id)] = count
+                log.info(f"【Downloader】下载器 {name} 开始转移下载文件，提交 {count} 个任务...")
+        if not futures:
+            return
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+            downloader_id = futures[future]
+            remaining[downloader_id] -= 1
+            # 下载器的任务全部完成或已转移的种子达到批量数量时设置状态，中途退出时少重复转移
+            with self._transfer_done_lock:
+                done_count = len(self._transfer_done.get(downloader_id) or {})
+            if not remaining[downloader_id] or done_count >= self.TRANSFER_FLUSH_SIZE:
+                self.__flush_transfer_done(downloader_id)
+        stats = self._transfer_queue.get_stats()
+        log.info(f"【Downloader】下载文件转移结束，排队中 {stats.get('queued')} 个，"
+                 f"平均排队 {stats.get('avg_wait')} 秒，平均耗时 {stats.get('avg_seconds')} 秒")
+
+    def __get_transfer_lock(self, downloader_id):
+        """
+        获取下载器的转移锁，查询待转移种子与设置种子状态互斥
+        """
+        with self._transfer_done_lock:
+            return self._transfer_locks.setdefault(str(downloader_id), Lock())
+
+    def __transfer_task(self, downloader_id, _client, task, rmt_mode):
+        """
+        转移单个下载完成的种子，由转移队列调用
+        :return: 转移状态
+        """
+        name = self.get_downloader_conf(downloader_id).get("name")
+        done_flag, done_msg = self.filetransfer.transfer_media(
+            in_from=self._DownloaderEnum[str(downloader_id)],
+            in_path=task.get("path"),
+            rmt_mode=rmt_mode)
+        delete = False
+        if not done_flag:
+            log.warn(f"【Downloader】下载器 {name} 任务%s 转移失败：%s" % (task.get("path"), done_msg))
+        elif rmt_mode in [RmtMode.MOVE, RmtMode.RCLONE, RmtMode.MINIO]:
+            log.warn(f"【Downloader】下载器 {name} 移动模式下删除种子文件：%s" % task.get("id"))
+            delete = True
+        # 种子状态稍后按下载器批量设置，设置前不会重复提交
+        with self._transfer_done_lock:
+            self._transfer_done.setdefault(str(downloader_id), {})[task.get("id")] = (task.get("tags"), delete)
+        return done_flag
+
+    def __flush_transfer_done(self, downloader_id):
+        """
+        下载器已转移的种子批量删除或设置为已整理状态
+        """
+        downloader_id = str(downloader_id)
+        with self.__get_transfer_lock(downloader_id):
+            with self._transfer_done_lock:
+                tasks = dict(self._transfer_done.get(downloader_id) or {})
+            if not tasks:
+                return
+            _client = self.__get_client(downloader_id)
+            if _client:
+                delete_ids = [tid for tid, (_, delete) in tasks.items() if delete]
+                if delete_ids:
+                    _client.batch_delete_torrents(ids=delete_ids, delete_file=True)
+                # Transmission设置标签时需保留原有标签，按原有标签分组
+                tags_ids = {}
+                for tid, (tags, delete) in tasks.items():
+                    if delete:
+                        continue
+                    if not isinstance(tags, list):
+                        tags = [tags] if tags else []
+                    tags_ids.setdefault(tuple(tags), []).append(tid)
+                for tags, ids in tags_ids.items():
+                    _client.batch_set_torrents_status(ids=ids, tags=list(tags))
+            # 设置状态后下载器的种子快照已失效，下一次查询可读到最新状态
+            with self._transfer_done_lock:
+                done = self._transfer_done.get(downloader_id) or {}
+                for tid in tasks:
+                    done.pop(tid, None)
+
+    def get_transfer_stats(self):
+        """
+        获取下载文件转移队列统计：排队深度、处理中数量及各任务耗时
+        """
+        stats = self._transfer_queue.get_stats()
+        for group in list(stats.get("groups")):
+            downloader_conf = self.get_downloader_conf(group)
+            stats["groups"][group]["name"] = downloader_conf.get("name") if downloader_conf else group
+        return stats
 
     def get_torrents(self, downloader_id=None, ids=None, tag=None):
         """
@@ -609,17 +723,42 @@ class Downloader:
         """
         if not config or not downloader_id:
             return []
-        _client = self.__get_client(downloader_id)
-        if not _client:
-            return []
-        config["filter_tags"] = []
+        results = self.evaluate_remove_rules(downloader_id=downloader_id,
+                                             rules={0: self.get_remove_rule(config)})
+        return results.get(0, {}).get("torrents") or []
+
+    @staticmethod
+    def get_remove_rule(config, name=None):
+        """
+        编译删种策略
+        :param config: 删种策略
+        :param name: 删种任务名称
+        :return: RemoveRule
+        """
+        config = dict(config or {})
         if config.get("onlynastool"):
-            config["filter_tags"] = config["tags"] + [PT_TAG]
+            config["filter_tags"] = (config.get("tags") or []) + [PT_TAG]
         else:
-            config["filter_tags"] = config["tags"]
-        torrents = _client.get_remove_torrents(config=config)
-        torrents.sort(key=lambda x: x.get("name"))
-        return torrents
+            config["filter_tags"] = config.get("tags") or []
+        return RemoveRule(config, name=name)
+
+    def evaluate_remove_rules(self, downloader_id, rules):
+        """
+        在同一份种子快照上计算同一下载器的多个删种策略
+        :param downloader_id: 下载器ID
+        :param rules: 规则KEY -> RemoveRule
+        :return: 规则KEY -> {"torrents": 按名称排序的种子列表, "seconds": 计算耗时}
+        """
+        rules = {key: rule for key, rule in (rules or {}).items() if rule}
+        if not rules or not downloader_id:
+            return {}
+        _client = self.__get_client(downloader_id)
+        if not _client:
+            return {}
+        results = _client.evaluate_remove_rules(rules) or {}
+        for result in results.values():
+            result.get("torrents").sort(key=lambda x: x.get("name"))
+        return results
 
     def get_downloading_torrents(self, downloader_id=None, ids=None, tag=None):
         """
@@ -681,7 +820,7 @@ class Downloader:
         _client = self.__get_client(downloader_id) if downloader_id else self.default_client
         if not _client:
             return False
-        return _client.start_torrents(ids)
+        return _client.batch_start_torrents(ids)
 
     def stop_torrents(self, downloader_id=None, ids=None):
         """
@@ -695,7 +834,7 @@ class Downloader:
         _client = self.__get_client(downloader_id) if downloader_id else self.default_client
         if not _client:
             return False
-        return _client.stop_torrents(ids)
+        return _client.batch_stop_torrents(ids)
 
     def delete_torrents(self, downloader_id=None, ids=None, delete_file=False):
         """
@@ -710,7 +849,7 @@ class Downloader:
         _client = self.__get_client(downloader_id) if downloader_id else self.default_client
         if not _client:
             return False
-        return _client.delete_torrents(delete_file=delete_file, ids=ids)
+        return _client.batch_delete_torrents(ids=ids, delete_file=delete_file)
 
     def batch_download(self,
                        in_from: SearchType,
@@ -0,0 +1,134 @@
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+
+class TransferQueue(object):
+    """
+    下载完成任务的转移队列：按分组（下载器）排队，各分组轮流取任务并行处理，
+    每个分组同时处理的任务数受限，同一任务在完成前不会重复入队
+    """
+    # 保留最近完成任务的数量
+    RECENT_SIZE = 50
+
+    def __init__(self, max_workers=4, group_concurrency=2):
+        """
+        :param max_workers: 同时处理的任务总数
+        :param group_concurrency: 每个分组同时处理的任务数
+        """
+        self.max_workers = max(int(max_workers), 1)
+        self.group_concurrency = max(int(group_concurrency), 1)
+        self._lock = Lock()
+        # 分组 -> 等待中的任务
+        self._queues = {}
+        # 分组 -> 处理中的任务数
+        self._running = {}
+        # 排队或处理中的任务KEY
+        self._keys = set()
+        self._recent = deque(maxlen=self.RECENT_SIZE)
+        self._stats = {"completed": 0, "failed": 0, "wait": 0, "seconds": 0}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="DownloaderTransfer")
+
+    def submit(self, group, key, func, *args, name=None):
+        """
+        任务入队
+        :param group: 分组，如下载器ID
+        :param key: 任务KEY，如种子ID
+        :param func: 处理函数，返回处理状态
+        :param name: 任务名称，用于统计展示
+        :return: Future，任务已在排队或处理中时返回None
+        """
+        with self._lock:
+            if (group, key) in self._keys:
+                return None
+            self._keys.add((group, key))
+            job = {
+                "group": group,
+                "key": key,
+                "name": name or key,
+                "func": func,
+                "args": args,
+                "future": Future(),
+                "queued": time.time(),
+                "start": None
+            }
+            self._queues.setdefault(group, deque()).append(job)
+            self.__dispatch()
+        return job.get("future")
+
+    def __dispatch(self):
+        """
+        按分组轮流取出任务交给线程池，需在锁内调用
+        """
+        total = sum(self._running.values())
+        started = True
+        while started and total < self.max_workers:
+            started = False
+            for group, queue in self._queues.items():
+                if total >= self.max_workers:
+                    break
+                if not queue or self._running.get(group, 0) >= self.group_concurrency:
+                    continue
+                job = queue.popleft()
+                self._running[group] = self._running.get(group, 0) + 1
+                total += 1
+                started = True
+                self._executor.submit(self.__run, job)
+
+    def __run(self, job):
+        job["start"] = time.time()
+        result, error = None, None
+        try:
+            result = job.get("func")(*job.get("args"))
+        except Exception as err:
+            error = err
+        finish = time.time()
+        wait = job["start"] - job.get("queued")
+        seconds = finish - job["start"]
+        success = bool(result) and not error
+        # 先登记完成再通知等待方，等待方拿到结果时统计已更新、任务可再次提交
+        with self._lock:
+            self._running[job.get("group")] -= 1
+            self._keys.discard((job.get("group"), job.get("key")))
+            self._stats["completed" if success else "failed"] += 1
+            self._stats["wait"] += wait
+            self._stats["seconds"] += seconds
+            self._recent.append({
+                "group": job.get("group"),
+                "name": job.get("name"),
+                "success": success,
+                "wait": round(wait, 2),
+                "seconds": round(seconds, 2),
+                "finish": finish
+            })
+            self.__dispatch()
+        if error:
+            job.get("future").set_exception(error)
+        else:
+            job.get("future").set_result(result)
+
+    def get_stats(self):
+        """
+        获取队列统计：各分组排队及处理中数量、完成/失败数、平均排队及处理耗时、最近完成的任务耗时
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            groups = {}
+            for group in set(self._queues) | set(self._running):
+                groups[group] = {
+                    "queued": len(self._queues.get(group) or []),
+                    "running": self._running.get(group, 0)
+                }
+            recent = list(self._recent)
+        done = stats["completed"] + stats["failed"]
+        return {
+            "queued": sum(group.get("queued") for group in groups.values()),
+            "running": sum(group.get("running") for group in groups.values()),
+            "groups": groups,
+            "completed": stats["completed"],
+            "failed": stats["failed"],
+            "avg_wait": round(stats["wait"] / done, 2) if done else 0,
+            "avg_seconds": round(stats["seconds"] / done, 2) if done else 0,
+            "recent": recent
+        }
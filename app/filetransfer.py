@@ -5,12 +5,11 @@ import re
 import shutil
 import traceback
 from enum import Enum
-from threading import Lock
 from time import sleep
 
 import log
 from app.conf import ModuleConf
-from app.helper import DbHelper, ProgressHelper
+from app.helper import DbHelper, ProgressHelper, TransferHelper
 from app.helper import ThreadHelper
 from app.media import Media, Category, Scraper
 from app.media.meta import MetaInfo
@@ -22,8 +21,6 @@ from app.utils.types import MediaType, SyncType, RmtMode, EventType, ProgressKey
 from config import RMT_AUDIO_TRACK_EXT, RMT_SUBEXT, RMT_MEDIAEXT, RMT_FAVTYPE, RMT_MIN_FILESIZE, DEFAULT_MOVIE_FORMAT, \
     DEFAULT_TV_FORMAT, Config
 
-lock = Lock()
-
 
 @singleton
 class FileTransfer:
@@ -154,36 +151,12 @@ class FileTransfer:
     @staticmethod
     def __transfer_command(file_item, target_file, rmt_mode):
         """
-        使用系统命令处理单个文件
+        使用系统命令处理单个文件，由转移执行器按目的设备调度，不同设备间可并行
         :param file_item: 文件路径
         :param target_file: 目标文件路径
         :param rmt_mode: RmtMode转移方式
         """
-        with lock:
-            if rmt_mode == RmtMode.LINK:
-                # 更链接
-                retcode, retmsg = SystemUtils.link(file_item, target_file)
-            elif rmt_mode == RmtMode.SOFTLINK:
-                # 软链接
-                retcode, retmsg = SystemUtils.softlink(file_item, target_file)
-            elif rmt_mode == RmtMode.MOVE:
-                # 移动
-                retcode, retmsg = SystemUtils.move(file_item, target_file)
-            elif rmt_mode == RmtMode.RCLONE:
-                # Rclone移动
-                retcode, retmsg = SystemUtils.rclone_move(file_item, target_file)
-            elif rmt_mode == RmtMode.RCLONECOPY:
-                # Rclone复制
-                retcode, retmsg = SystemUtils.rclone_copy(file_item, target_file)
-            elif rmt_mode == RmtMode.MINIO:
-                # Minio移动
-                retcode, retmsg = SystemUtils.minio_move(file_item, target_file)
-            elif rmt_mode == RmtMode.MINIOCOPY:
-                # Minio复制
-                retcode, retmsg = SystemUtils.minio_copy(file_item, target_file)
-            else:
-                # 复制
-                retcode, retmsg = SystemUtils.copy(file_item, target_file)
+        retcode, retmsg = TransferHelper().execute(file_item, target_file, rmt_mode)
         if retcode != 0:
             log.error("【Rmt】%s" % retmsg)
         return retcode
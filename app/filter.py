@@ -15,6 +15,9 @@ class Filter:
     dbhelper = None
     _groups = []
     _rules = []
+    # 编译后的规则组匹配器
+    _matchers = {}
+    _default_group = None
 
     def __init__(self):
         self.init_config()
@@ -24,6 +27,9 @@ class Filter:
         self.rg_matcher = ReleaseGroupsMatcher()
         self._groups = self.get_filter_group()
         self._rules = self.get_filter_rule()
+        # 规则变化时均会调用init_config，重新编译规则组
+        self._matchers = self.__compile_rule_groups()
+        self._default_group = self.get_rule_groups(default=True).get("id")
 
     def get_rule_groups(self, groupid=None, default=False):
         """
@@ -105,115 +111,40 @@ class Filter:
         # 为-1时不使用过滤规则
         if rulegroup and int(rulegroup) == -1:
             return True, 0, "不过滤"
-        # 过滤使用的文本
-        title = meta_info.rev_string
-        if meta_info.subtitle:
-            title = f"{title} {meta_info.subtitle}"
         # 过滤规则组
-        if not rulegroup:
-            rulegroup = self.get_rule_groups(default=True)
-            if not rulegroup:
-                return True, 0, "未配置过滤规则"
-        else:
-            rulegroup = self.get_rule_groups(groupid=rulegroup)
-        filters = self.get_rules(groupid=rulegroup.get("id"))
-        # 命中优先级
-        order_seq = 0
-        # 当前规则组是否命中
-        group_match = True
-        for filter_info in filters:
-            try:
-                # 当前规则是否命中
-                rule_match = True
-                # 命中规则的序号
-                order_seq = 100 - int(filter_info.get('pri'))
-                # 必须包括的项
-                includes = filter_info.get('include')
-                if includes and rule_match:
-                    include_flag = True
-                    for include in includes:
-                        if not include:
-                            continue
-                        if not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
-                            include_flag = False
-                            break
-                    if not include_flag:
-                        rule_match = False
-
-                # 不能包含的项
-                excludes = filter_info.get('exclude')
-                if excludes and rule_match:
-                    exclude_flag = False
-                    exclude_count = 0
-                    for exclude in excludes:
-                        if not exclude:
-                            continue
-                        exclude_count += 1
-                        if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
-                            exclude_flag = True
-                    if exclude_count > 0 and not exclude_flag:
-                        rule_match = False
-                # 大小
-                sizes = filter_info.get('size')
-                if sizes and rule_match and meta_info.size:
-                    meta_info.size = StringUtils.num_filesize(meta_info.size)
-                    if sizes.find(',') != -1:
-                        sizes = sizes.split(',')
-                        if sizes[0].isdigit():
-                            begin_size = int(sizes[0].strip())
-                        else:
-                            begin_size = 0
-                        if sizes[1].isdigit():
-                            end_size = int(sizes[1].strip())
-                        else:
-                            end_size = 0
-                    else:
-                        begin_size = 0
-                        if sizes.isdigit():
-                            end_size = int(sizes.strip())
-                        else:
-                            end_size = 0
-                    if meta_info.type == MediaType.MOVIE:
-                        if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
-                            rule_match = False
-                    else:
-                        if meta_info.total_episodes \
-                                and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size * 1024 ** 3:
-                            rule_match = False
-
-                # 促销
-                free = filter_info.get("free")
-                if free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
-                    ul_factor, dl_factor = free.split()
-                    if float(ul_factor) > meta_info.upload_volume_factor \
-                            or float(dl_factor) < meta_info.download_volume_factor:
-                        rule_match = False
-
-                if rule_match:
-                    return True, order_seq, rulegroup.get("name")
-                else:
-                    group_match = False
-            except Exception as err:
-                log.error(f"【Filter】过滤规则出现严重错误 {err}，请检查：{filter_info}")
-        if not group_match:
-            return False, 0, rulegroup.get("name")
-        return True, order_seq, rulegroup.get("name")
+        matcher = self.__get_group_matcher(rulegroup)
+        if not matcher:
+            return True, 0, "未配置过滤规则"
+        return matcher.check(meta_info)
 
     def is_rule_free(self, rulegroup=None):
         """
         判断规则中是否需要Free检测
         """
+        matcher = self.__get_group_matcher(rulegroup)
+        if not matcher:
+            return True, 0, ""
+        return matcher.has_free_rule()
+
+    def __get_group_matcher(self, rulegroup=None):
+        """
+        获取已编译的规则组，未指定时使用默认规则组，未配置默认规则组时返回None
+        """
         if not rulegroup:
-            rulegroup = self.get_rule_groups(default=True)
+            rulegroup = self._default_group
             if not rulegroup:
-                return True, 0, ""
-        else:
-            rulegroup = self.get_rule_groups(groupid=rulegroup)
-        filters = self.get_rules(groupid=rulegroup.get("id"))
-        for filter_info in filters:
-            if filter_info.get("free"):
-                return True
-        return False
+                return None
+        return self._matchers.get(str(rulegroup)) or FilterGroupMatcher(group=None, rules=[])
+
+    def __compile_rule_groups(self):
+        """
+        将所有规则组编译为匹配器
+        """
+        matchers = {}
+        for group in self.get_rule_groups():
+            matchers[str(group.get("id"))] = FilterGroupMatcher(group=group,
+                                                                rules=self.get_rules(groupid=group.get("id")))
+        return matchers
 
     @staticmethod
     def is_torrent_match_sey(media_info, s_num, e_num, year_str):
@@ -387,3 +318,153 @@ class Filter:
         根据名称获取过滤规则组ID
         """
         return self.dbhelper.get_filter_groupid_by_name(name)
+
+
+class FilterRuleMatcher:
+    """
+    编译后的单条过滤规则，预编译正则表达式并预先解析大小和促销条件
+    规则本身有错误时在检查到对应条件时抛出异常，与逐条解析时的行为一致
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        try:
+            self.order_seq = 100 - int(rule.get("pri"))
+        except Exception as err:
+            self.order_seq = err
+        self.includes = [self.__compile(include) for include in rule.get("include") or [] if include]
+        self.excludes = [self.__compile(exclude) for exclude in rule.get("exclude") or [] if exclude]
+        self.sizes = self.__parse_sizes(rule.get("size"))
+        self.free = self.__parse_free(rule.get("free"))
+
+    @staticmethod
+    def __compile(pattern):
+        try:
+            return re.compile(r'%s' % pattern.strip(), re.IGNORECASE)
+        except Exception as err:
+            return err
+
+    @staticmethod
+    def __parse_sizes(sizes):
+        """
+        解析大小范围，单位GB
+        """
+        if not sizes:
+            return None
+        if sizes.find(',') != -1:
+            sizes = sizes.split(',')
+            begin_size = int(sizes[0].strip()) if sizes[0].isdigit() else 0
+            end_size = int(sizes[1].strip()) if sizes[1].isdigit() else 0
+        else:
+            begin_size = 0
+            end_size = int(sizes.strip()) if sizes.isdigit() else 0
+        return begin_size * 1024 ** 3, end_size * 1024 ** 3
+
+    @staticmethod
+    def __parse_free(free):
+        """
+        解析促销条件：上传因子 下载因子
+        """
+        if not free:
+            return None
+        try:
+            ul_factor, dl_factor = free.split()
+            return float(ul_factor), float(dl_factor)
+        except Exception as err:
+            return err
+
+    @staticmethod
+    def __search(pattern, title):
+        if isinstance(pattern, Exception):
+            raise pattern
+        return pattern.search(title)
+
+    def match(self, meta_info, title):
+        """
+        检查种子是否命中规则
+        """
+        rule_match = self.__match_title_size(meta_info, title)
+        # 促销，规则有误时无论前面的条件是否命中均视为规则错误
+        if self.free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
+            if isinstance(self.free, Exception):
+                raise self.free
+            ul_factor, dl_factor = self.free
+            if ul_factor > meta_info.upload_volume_factor \
+                    or dl_factor < meta_info.download_volume_factor:
+                rule_match = False
+        return rule_match
+
+    def __match_title_size(self, meta_info, title):
+        """
+        检查种子名称及大小是否命中规则
+        """
+        # 必须包括的项
+        for include in self.includes:
+            if not self.__search(include, title):
+                return False
+        # 不能包含的项，全部命中时不匹配
+        if self.excludes:
+            exclude_flag = False
+            for exclude in self.excludes:
+                if not self.__search(exclude, title):
+                    exclude_flag = True
+            if not exclude_flag:
+                return False
+        # 大小
+        if self.sizes and meta_info.size:
+            if not isinstance(meta_info.size, int):
+                meta_info.size = StringUtils.num_filesize(meta_info.size)
+            begin_size, end_size = self.sizes
+            if meta_info.type == MediaType.MOVIE:
+                if not begin_size <= int(meta_info.size) <= end_size:
+                    return False
+            else:
+                if meta_info.total_episodes \
+                        and not begin_size <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size:
+                    return False
+        return True
+
+
+class FilterGroupMatcher:
+    """
+    编译后的过滤规则组，规则变化时整体重建，不会被修改
+    """
+
+    def __init__(self, group, rules):
+        self.name = group.get("name") if group else None
+        self.rules = tuple(FilterRuleMatcher(rule) for rule in rules)
+
+    def has_free_rule(self):
+        """
+        规则组中是否有促销条件
+        """
+        return any(rule.rule.get("free") for rule in self.rules)
+
+    def check(self, meta_info):
+        """
+        检查种子是否匹配规则组，命中任一规则即匹配
+        :return: 是否匹配，匹配的优先值，规则组名称
+        """
+        # 过滤使用的文本
+        title = meta_info.rev_string
+        if meta_info.subtitle:
+            title = f"{title} {meta_info.subtitle}"
+        # 命中优先级
+        order_seq = 0
+        # 当前规则组是否命中
+        group_match = True
+        for rule in self.rules:
+            try:
+                if isinstance(rule.order_seq, Exception):
+                    raise rule.order_seq
+                # 命中规则的序号
+                order_seq = rule.order_seq
+                if rule.match(meta_info, title):
+                    return True, order_seq, self.name
+                else:
+                    group_match = False
+            except Exception as err:
+                log.error(f"【Filter】过滤规则出现严重错误 {err}，请检查：{rule.rule}")
+        if not group_match:
+            return False, 0, self.name
+        return True, order_seq, self.name
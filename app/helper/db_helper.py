@@ -3,16 +3,22 @@ import os.path
 import time
 import json
 from enum import Enum
+from threading import Lock
 from sqlalchemy import cast, func, and_, case
 
 from app.db import MainDb, DbPersist
 from app.db.models import *
-from app.utils import StringUtils
+from app.utils import StringUtils, BloomFilter
 from app.utils.types import MediaType, RmtMode
 
 
 class DbHelper:
     _db = MainDb()
+    # 刷流种子链接布隆过滤器
+    _brush_enclosure_filter = None
+    _brush_filter_lock = Lock()
+    # 批量查询时单次查询的链接数，不超过SQLite参数上限
+    _QUERY_BATCH_SIZE = 500
 
     @DbPersist(_db)
     def insert_search_results(self, media_items: list, title=None, ident_flag=True):
@@ -1711,6 +1717,16 @@ class DbHelper:
         else:
             return 0
 
+    def get_brushtask_totalsizes(self):
+        """
+        一次查询所有刷流任务的总体积
+        :return: 任务ID -> 总体积
+        """
+        ret = self._db.query(SITEBRUSHTORRENTS.TASK_ID,
+                             func.sum(cast(SITEBRUSHTORRENTS.TORRENT_SIZE, Integer))).filter(
+            SITEBRUSHTORRENTS.DOWNLOAD_ID != '0').group_by(SITEBRUSHTORRENTS.TASK_ID).all()
+        return {str(task_id): total_size or 0 for task_id, total_size in ret}
+
     @DbPersist(_db)
     def update_brushtask_state(self, state, tid=None):
         """
@@ -1756,6 +1772,7 @@ class DbHelper:
     def add_brushtask_upload_count(self, brush_id, upload_size, download_size, remove_count):
         """
         更新上传下载量和删除种子数
+        :return: 更新后的上传量、下载量
         """
         if not brush_id:
             return
@@ -1777,16 +1794,23 @@ class DbHelper:
             "UPLOAD_SIZE": int(upload_size) + delete_upsize,
             "DOWNLOAD_SIZE": int(download_size) + delete_dlsize,
         })
+        return {
+            "upload_size": int(upload_size) + delete_upsize,
+            "download_size": int(download_size) + delete_dlsize
+        }
 
     @DbPersist(_db)
     def insert_brushtask_torrent(self, brush_id, title, enclosure, downloader, download_id, size):
         """
         增加刷流下载的种子信息
+        :return: 是否新增
         """
         if not brush_id:
-            return
+            return False
         if self.is_brushtask_torrent_exists(brush_id, title, enclosure):
-            return
+            return False
+        if enclosure:
+            self.__get_brush_enclosure_filter().add(enclosure)
         self._db.insert(SITEBRUSHTORRENTS(
             TASK_ID=brush_id,
             TORRENT_NAME=title,
@@ -1818,8 +1842,44 @@ class DbHelper:
         """
         if not enclosure:
             return None
+        if enclosure not in self.__get_brush_enclosure_filter():
+            return None
         return self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.ENCLOSURE == enclosure).first()
 
+    def get_brushtask_torrent_enclosures(self, enclosures):
+        """
+        批量查询已在刷流任务中的种子链接，布隆过滤器排除不存在的链接后，剩余的一次查询确认
+        :param enclosures: 种子链接列表
+        :return: 已存在的种子链接集合
+        """
+        enclosure_filter = self.__get_brush_enclosure_filter()
+        candidates = list({enclosure for enclosure in enclosures if enclosure and enclosure in enclosure_filter})
+        exists_enclosures = set()
+        for i in range(0, len(candidates), self._QUERY_BATCH_SIZE):
+            exists_enclosures.update(
+                row[0] for row in self._db.query(SITEBRUSHTORRENTS.ENCLOSURE).filter(
+                    SITEBRUSHTORRENTS.ENCLOSURE.in_(candidates[i:i + self._QUERY_BATCH_SIZE])).distinct())
+        return exists_enclosures
+
+    def init_brush_enclosure_filter(self):
+        """
+        预加载刷流种子链接布隆过滤器
+        """
+        self.__get_brush_enclosure_filter()
+
+    def __get_brush_enclosure_filter(self):
+        """
+        获取刷流种子链接布隆过滤器，首次使用时从数据库加载，超出容量时重建
+        """
+        with DbHelper._brush_filter_lock:
+            if DbHelper._brush_enclosure_filter is None or DbHelper._brush_enclosure_filter.is_full():
+                enclosures = [row[0] for row in self._db.query(SITEBRUSHTORRENTS.ENCLOSURE).all() if row[0]]
+                enclosure_filter = BloomFilter(capacity=max(len(enclosures) * 2, 100000))
+                for enclosure in enclosures:
+                    enclosure_filter.add(enclosure)
+                DbHelper._brush_enclosure_filter = enclosure_filter
+            return DbHelper._brush_enclosure_filter
+
     def is_brushtask_torrent_exists(self, brush_id, title, enclosure):
         """
         查询刷流任务种子是否已存在
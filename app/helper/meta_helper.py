@@ -1,10 +1,12 @@
 import os
 import pickle
-import random
+import sqlite3
 import time
+from collections import OrderedDict
 from enum import Enum
 from threading import RLock
 
+import log
 from app.utils import ExceptionUtils
 from app.utils.commons import singleton
 from config import Config
@@ -13,11 +15,20 @@ lock = RLock()
 
 CACHE_EXPIRE_TIMESTAMP_STR = "cache_expire_timestamp"
 EXPIRE_TIMESTAMP = 7 * 24 * 3600
+# 内存缓存默认容量
+MEMORY_CACHE_SIZE = 5000
+# 内存缓存条目存活时间，超时后从数据库重新加载
+MEMORY_CACHE_TTL = 3600
+# 未识别记录的存活时间，超时后重新查询TMDB
+UNKNOWN_CACHE_TTL = 24 * 3600
+# 读取时刷新过期时间的最小间隔，避免每次读取都写入数据库
+EXPIRE_REFRESH_INTERVAL = 24 * 3600
 
 
 @singleton
 class MetaHelper(object):
     """
+    TMDB识别缓存，存储于SQLite数据库中，按KEY单条读写，过期时间建立索引
     {
         "id": '',
         "title": '',
@@ -25,8 +36,18 @@ class MetaHelper(object):
         "type": MediaType
     }
     """
-    _meta_data = {}
+    # 内存缓存中有变更、待写入数据库的KEY
+    _dirty_keys = set()
+    # 待从数据库删除的KEY
+    _deleted_keys = set()
+    # 未识别的记录，仅保存在内存中，LRU淘汰，值为(加入时间, 缓存内容)
+    _unknown_data = OrderedDict()
+    # 数据库条目的LRU内存缓存，值为(加载时间, 缓存内容)
+    _memory_cache = OrderedDict()
+    _memory_cache_size = MEMORY_CACHE_SIZE
+    _memory_cache_stats = {}
 
+    _conn = None
     _meta_path = None
     _tmdb_cache_expire = False
 
@@ -37,15 +58,186 @@ class MetaHelper(object):
         laboratory = Config().get_config('laboratory')
         if laboratory:
             self._tmdb_cache_expire = laboratory.get("tmdb_cache_expire")
-        self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.dat')
-        self._meta_data = self.__load_meta_data(self._meta_path)
+            try:
+                self._memory_cache_size = int(laboratory.get("tmdb_cache_size") or MEMORY_CACHE_SIZE)
+            except ValueError:
+                self._memory_cache_size = MEMORY_CACHE_SIZE
+        with lock:
+            if self._conn:
+                self.__flush_pending()
+                self._conn.close()
+            self._dirty_keys = set()
+            self._deleted_keys = set()
+            self._unknown_data = OrderedDict()
+            self._memory_cache = OrderedDict()
+            self._memory_cache_stats = {"hit": 0, "miss": 0, "eviction": 0, "expired": 0}
+            self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.db')
+            self._conn = self.__init_db(self._meta_path)
+            self.__migrate_meta_data(os.path.join(Config().get_config_path(), 'tmdb.dat'))
+
+    @staticmethod
+    def __init_db(path):
+        """
+        打开缓存数据库并建表
+        """
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS META_DATA ("
+                     "KEY TEXT PRIMARY KEY NOT NULL, "
+                     "TMDBID TEXT, "
+                     "EXPIRE INTEGER, "
+                     "DATA BLOB)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_META_DATA_EXPIRE ON META_DATA (EXPIRE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_META_DATA_TMDBID ON META_DATA (TMDBID)")
+        conn.commit()
+        return conn
+
+    def __migrate_meta_data(self, path):
+        """
+        将旧版pickle缓存文件导入数据库，完成后重命名旧文件，只处理一次
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'rb') as f:
+                meta_data = pickle.load(f)
+            self.__upsert_rows(meta_data.items(), replace=False)
+            self._conn.commit()
+            os.replace(path, f"{path}.bak")
+            log.info(f"【Meta】TMDB缓存已迁移到数据库，共 {len(meta_data)} 条")
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+
+    def __upsert_rows(self, items, replace=True):
+        """
+        批量写入缓存条目
+        """
+        now = int(time.time())
+        rows = []
+        for key, info in items:
+            if not info or str(info.get("id")) == '0':
+                continue
+            expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR) or now + EXPIRE_TIMESTAMP
+            rows.append((key, str(info.get("id")), expire, pickle.dumps(info, pickle.HIGHEST_PROTOCOL)))
+        if rows:
+            self._conn.executemany("INSERT OR %s INTO META_DATA (KEY, TMDBID, EXPIRE, DATA) VALUES (?, ?, ?, ?)"
+                                   % ("REPLACE" if replace else "IGNORE"), rows)
+
+    def __flush_pending(self):
+        """
+        将内存中的变更写入数据库，调用方需持有锁
+        """
+        if not self._dirty_keys and not self._deleted_keys:
+            return
+        if self._deleted_keys:
+            self._conn.executemany("DELETE FROM META_DATA WHERE KEY = ?", [(key,) for key in self._deleted_keys])
+        self.__upsert_rows((key, self._memory_cache[key][1]) for key in self._dirty_keys if key in self._memory_cache)
+        self._conn.commit()
+        self._dirty_keys = set()
+        self._deleted_keys = set()
+
+    def __cache_put(self, key, info, dirty=False):
+        """
+        放入内存缓存，超出容量时淘汰最久未使用的条目，被淘汰的变更立即写入数据库，调用方需持有锁
+        """
+        self._memory_cache[key] = (time.time(), info)
+        self._memory_cache.move_to_end(key)
+        if dirty:
+            self._dirty_keys.add(key)
+        while len(self._memory_cache) > self._memory_cache_size:
+            evict_key, (_, evict_info) = self._memory_cache.popitem(last=False)
+            self._memory_cache_stats["eviction"] += 1
+            if evict_key in self._dirty_keys:
+                self._dirty_keys.discard(evict_key)
+                self.__upsert_rows([(evict_key, evict_info)])
+                self._conn.commit()
+
+    def __unknown_put(self, key, info):
+        """
+        记录未识别的条目，超出容量时淘汰最久未使用的条目，调用方需持有锁
+        """
+        self._unknown_data[key] = (time.time(), info)
+        self._unknown_data.move_to_end(key)
+        while len(self._unknown_data) > self._memory_cache_size:
+            self._unknown_data.popitem(last=False)
+            self._memory_cache_stats["eviction"] += 1
+
+    def __sweep_memory_cache(self):
+        """
+        清理内存缓存中超过存活时间的条目，未写入数据库的条目保留，调用方需持有锁
+        """
+        expire_time = time.time() - MEMORY_CACHE_TTL
+        for key in [key for key, (load_time, _) in self._memory_cache.items()
+                    if load_time < expire_time and key not in self._dirty_keys]:
+            self._memory_cache.pop(key)
+            self._memory_cache_stats["expired"] += 1
+        expire_time = time.time() - UNKNOWN_CACHE_TTL
+        for key in [key for key, (add_time, _) in self._unknown_data.items() if add_time < expire_time]:
+            self._unknown_data.pop(key)
+            self._memory_cache_stats["expired"] += 1
+
+    def __get_meta_data(self, key):
+        """
+        读取单条缓存，优先取内存中的记录，调用方需持有锁
+        """
+        if key in self._deleted_keys:
+            self._memory_cache_stats["hit"] += 1
+            return None
+        unknown = self._unknown_data.get(key)
+        if unknown:
+            if unknown[0] >= time.time() - UNKNOWN_CACHE_TTL:
+                self._unknown_data.move_to_end(key)
+                self._memory_cache_stats["hit"] += 1
+                return unknown[1]
+            self._unknown_data.pop(key)
+            self._memory_cache_stats["expired"] += 1
+        cache = self._memory_cache.get(key)
+        if cache:
+            if key in self._dirty_keys or cache[0] >= time.time() - MEMORY_CACHE_TTL:
+                self._memory_cache.move_to_end(key)
+                self._memory_cache_stats["hit"] += 1
+                return cache[1]
+            self._memory_cache.pop(key)
+            self._memory_cache_stats["expired"] += 1
+        self._memory_cache_stats["miss"] += 1
+        row = self._conn.execute("SELECT DATA FROM META_DATA WHERE KEY = ?", (key,)).fetchone()
+        if not row:
+            return None
+        info = pickle.loads(row[0])
+        self.__cache_put(key, info)
+        return info
+
+    def __set_meta_data(self, key, info):
+        """
+        记录单条缓存变更，调用方需持有锁
+        """
+        if info is None:
+            self._memory_cache.pop(key, None)
+            self._unknown_data.pop(key, None)
+            self._dirty_keys.discard(key)
+            self._deleted_keys.add(key)
+        elif str(info.get("id")) == '0':
+            self._memory_cache.pop(key, None)
+            self._dirty_keys.discard(key)
+            self.__unknown_put(key, info)
+        else:
+            self._unknown_data.pop(key, None)
+            self._deleted_keys.discard(key)
+            self.__cache_put(key, info, dirty=True)
 
     def clear_meta_data(self):
         """
         清空所有TMDB缓存
         """
         with lock:
-            self._meta_data = {}
+            self._dirty_keys = set()
+            self._deleted_keys = set()
+            self._unknown_data = OrderedDict()
+            self._memory_cache.clear()
+            self._conn.execute("DELETE FROM META_DATA")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
 
     def get_meta_data_path(self):
         """
@@ -58,12 +250,16 @@ class MetaHelper(object):
         根据KEY值获取缓存值
         """
         with lock:
-            info: dict = self._meta_data.get(key)
+            info = self.__get_meta_data(key)
             if info:
+                now = int(time.time())
                 expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire or int(time.time()) < expire:
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self.update_meta_data({key: info})
+                if not expire or now < expire:
+                    # 过期时间在原缓存条目上刷新，间隔内只刷新一次，下次保存时写入数据库
+                    if not expire or expire - now < EXPIRE_TIMESTAMP - EXPIRE_REFRESH_INTERVAL:
+                        info[CACHE_EXPIRE_TIMESTAMP_STR] = now + EXPIRE_TIMESTAMP
+                        if key in self._memory_cache:
+                            self._dirty_keys.add(key)
                 elif expire and self._tmdb_cache_expire:
                     self.delete_meta_data(key)
             return info or {}
@@ -81,17 +277,26 @@ class MetaHelper(object):
         else:
             begin_pos = (page - 1) * num
 
+        search = str(search or "").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        condition = "WHERE KEY LIKE ? ESCAPE '\\' AND TMDBID != '0'"
         with lock:
-            search_metas = [(k, {
+            self.__flush_pending()
+            total = self._conn.execute(f"SELECT COUNT(1) FROM META_DATA {condition}",
+                                       (f"%{search}%",)).fetchone()[0]
+            rows = self._conn.execute(f"SELECT KEY, DATA FROM META_DATA {condition} LIMIT ? OFFSET ?",
+                                      (f"%{search}%", int(num), int(begin_pos))).fetchall()
+        search_metas = []
+        for k, data in rows:
+            v = pickle.loads(data)
+            search_metas.append((k, {
                 "id": v.get("id"),
                 "title": v.get("title"),
                 "year": v.get("year"),
                 "media_type": v.get("type").value if isinstance(v.get("type"), Enum) else v.get("type"),
                 "poster_path": v.get("poster_path"),
                 "backdrop_path": v.get("backdrop_path")
-            },  str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", ""))
-                for k, v in self._meta_data.items() if search.lower() in k.lower() and v.get("id") != 0]
-            return len(search_metas), search_metas[begin_pos: begin_pos + num]
+            }, str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", "")))
+        return total, search_metas
 
     def delete_meta_data(self, key):
         """
@@ -100,25 +305,28 @@ class MetaHelper(object):
         @return: 被删除的缓存内容
         """
         with lock:
-            return self._meta_data.pop(key, None)
+            info = self.__get_meta_data(key)
+            if info is not None:
+                self.__set_meta_data(key, None)
+            return info
 
     def delete_meta_data_by_tmdbid(self, tmdbid):
         """
         清空对应TMDBID的所有缓存记录，以强制更新TMDB中最新的数据
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == str(tmdbid):
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            self.__flush_pending()
+            for key in [key for key, (_, info) in self._memory_cache.items() if str(info.get("id")) == str(tmdbid)]:
+                self._memory_cache.pop(key)
+            self._conn.execute("DELETE FROM META_DATA WHERE TMDBID = ?", (str(tmdbid),))
+            self._conn.commit()
 
     def delete_unknown_meta(self):
         """
         清除未识别的缓存记录，以便重新搜索TMDB
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == '0':
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            self._unknown_data = OrderedDict()
 
     def modify_meta_data(self, key, title):
         """
@@ -128,25 +336,12 @@ class MetaHelper(object):
         @return: 被修改后缓存内容
         """
         with lock:
-            if self._meta_data.get(key):
-                self._meta_data[key]['title'] = title
-                self._meta_data[key][CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-            return self._meta_data.get(key)
-
-    @staticmethod
-    def __load_meta_data(path):
-        """
-        从文件中加载缓存
-        """
-        try:
-            if os.path.exists(path):
-                with open(path, 'rb') as f:
-                    data = pickle.load(f)
-                return data
-            return {}
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            return {}
+            info = self.__get_meta_data(key)
+            if info:
+                info['title'] = title
+                info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                self.__set_meta_data(key, info)
+            return info
 
     def update_meta_data(self, meta_data):
         """
@@ -156,65 +351,47 @@ class MetaHelper(object):
             return
         with lock:
             for key, item in meta_data.items():
-                if not self._meta_data.get(key):
+                if not self.__get_meta_data(key):
                     item[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self._meta_data[key] = item
+                    self.__set_meta_data(key, item)
 
     def save_meta_data(self, force=False):
         """
-        保存缓存数据到文件
+        将变更写入数据库，开启缓存过期时通过索引清理过期条目
         """
-        meta_data = self.__load_meta_data(self._meta_path)
-        new_meta_data = {k: v for k, v in self._meta_data.items() if str(v.get("id")) != '0'}
-
-        if not force \
-                and not self._random_sample(new_meta_data) \
-                and meta_data.keys() == new_meta_data.keys():
-            return
-
-        with open(self._meta_path, 'wb') as f:
-            pickle.dump(new_meta_data, f, pickle.HIGHEST_PROTOCOL)
+        with lock:
+            self.__flush_pending()
+            self.__sweep_memory_cache()
+            if self._tmdb_cache_expire:
+                now = int(time.time())
+                for key in [key for key, (_, info) in self._memory_cache.items()
+                            if (info.get(CACHE_EXPIRE_TIMESTAMP_STR) or now + 1) <= now]:
+                    self._memory_cache.pop(key)
+                self._conn.execute("DELETE FROM META_DATA WHERE EXPIRE <= ?", (now,))
+                self._conn.commit()
 
-    def _random_sample(self, new_meta_data):
+    def get_cache_stats(self):
         """
-        采样分析是否需要保存
+        获取内存缓存统计信息
+        @return: 容量、当前条目数、未识别条目数、命中、未命中、淘汰、过期次数及命中率
         """
-        ret = False
-        if len(new_meta_data) < 25:
-            keys = list(new_meta_data.keys())
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-        else:
-            count = 0
-            keys = random.sample(new_meta_data.keys(), 25)
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-                        count += 1
-            if count >= 5:
-                ret |= self._random_sample(new_meta_data)
-        return ret
+        with lock:
+            stats = dict(self._memory_cache_stats)
+            stats.update({
+                "capacity": self._memory_cache_size,
+                "size": len(self._memory_cache),
+                "unknown": len(self._unknown_data),
+            })
+        total = stats.get("hit", 0) + stats.get("miss", 0)
+        stats["hit_rate"] = round(stats.get("hit", 0) * 100 / total, 2) if total else 0
+        return stats
 
     def get_cache_title(self, key):
         """
         获取缓存的标题
         """
-        cache_media_info = self._meta_data.get(key)
+        with lock:
+            cache_media_info = self.__get_meta_data(key)
         if not cache_media_info or not cache_media_info.get("id"):
             return None
         return cache_media_info.get("title")
@@ -223,7 +400,9 @@ class MetaHelper(object):
         """
         重新设置缓存标题
         """
-        cache_media_info = self._meta_data.get(key)
-        if not cache_media_info:
-            return
-        self._meta_data[key]['title'] = cn_title
+        with lock:
+            cache_media_info = self.__get_meta_data(key)
+            if not cache_media_info:
+                return
+            cache_media_info['title'] = cn_title
+            self.__set_meta_data(key, cache_media_info)
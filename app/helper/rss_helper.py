@@ -1,106 +1,273 @@
 import xml.dom.minidom
+from io import BytesIO
+from threading import Lock
+from xml.etree import ElementTree
 
 from app.db import MainDb, DbPersist
 from app.db.models import RSSTORRENTS
-from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils, DomUtils
+from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils, DomUtils, BloomFilter
 from config import Config
 
 
 class RssHelper:
     _db = MainDb()
 
+    _special_title_sites = {
+        'pt.keepfrds.com': RssTitleUtils.keepfriends_title
+    }
+
+    _rss_expired_msg = [
+        "RSS 链接已过期, 您需要获得一个新的!",
+        "RSS Link has expired, You need to get a new one!"
+    ]
+
+    # 已处理下载链接的布隆过滤器
+    _enclosure_filter = None
+    _enclosure_filter_lock = Lock()
+    # 批量查询时单次查询的链接数，不超过SQLite参数上限
+    _QUERY_BATCH_SIZE = 500
+
+    # 订阅源状态：ETag、Last-Modified、已处理的种子链接
+    _feed_states = {}
+    _feed_lock = Lock()
+
     @staticmethod
-    def parse_rssxml(url, proxy=False):
+    def parse_rssxml(url, proxy=False, timeout=None, feed_key=None, feed_version=None):
         """
         解析RSS订阅URL，获取RSS中的种子信息
         :param url: RSS地址
         :param proxy: 是否使用代理
+        :param timeout: 请求超时时间（秒）
+        :param feed_key: 订阅源标识，传入时使用条件请求并只返回未处理过的种子，处理完成后需调用mark_feed_seen
+        :param feed_version: 订阅源处理规则版本，变化时清空订阅源状态重新处理全部种子
         :return: 种子信息列表，如为None代表Rss过期
         """
-        _special_title_sites = {
-            'pt.keepfrds.com': RssTitleUtils.keepfriends_title
-        }
-
-        _rss_expired_msg = [
-            "RSS 链接已过期, 您需要获得一个新的!",
-            "RSS Link has expired, You need to get a new one!"
-        ]
-
-        # 开始处理
-        ret_array = []
         if not url:
             return []
         site_domain = StringUtils.get_url_domain(url)
+        feed_state = RssHelper.__get_feed_state(feed_key, feed_version) if feed_key else None
         try:
-            ret = RequestUtils(proxies=Config().get_proxies() if proxy else None).get_res(url)
+            headers = None
+            # 上次返回的种子都已处理完时才使用条件请求，否则未处理的种子会因304无法再次获取
+            if feed_state and not feed_state.get("pending"):
+                headers = {"User-Agent": Config().get_ua()}
+                if feed_state.get("etag"):
+                    headers["If-None-Match"] = feed_state.get("etag")
+                if feed_state.get("last_modified"):
+                    headers["If-Modified-Since"] = feed_state.get("last_modified")
+            ret = RequestUtils(headers=headers,
+                               proxies=Config().get_proxies() if proxy else None,
+                               timeout=timeout).get_res(url)
             if not ret:
                 return []
-            ret.encoding = ret.apparent_encoding
+            if ret.status_code == 304:
+                # 订阅源没有变化
+                return []
         except Exception as e2:
             ExceptionUtils.exception_traceback(e2)
             return []
-        if ret:
-            ret_xml = ret.text
+        try:
+            # 流式解析，XML按声明的编码直接解码，不需要整体探测编码
+            ret_array = list(RssHelper.iter_rssxml(ret.content, site_domain=site_domain))
+        except (ElementTree.ParseError, ValueError):
+            # 解析失败时探测编码后使用DOM重新解析，兼容多字节编码、编码声明错误的RSS及过期提示
+            ret.encoding = ret.apparent_encoding
+            ret_array = RssHelper.parse_rssxml_dom(ret.text, site_domain=site_domain)
+        if not feed_state or not ret_array:
+            return ret_array
+        with RssHelper._feed_lock:
+            feed_state["etag"] = ret.headers.get("ETag")
+            feed_state["last_modified"] = ret.headers.get("Last-Modified")
+            # 已移出订阅源的种子不会再出现，只保留当前订阅源中的链接
+            enclosures = {item.get("enclosure") for item in ret_array}
+            feed_state["seen"] &= enclosures
+            ret_array = [item for item in ret_array if item.get("enclosure") not in feed_state["seen"]]
+            feed_state["pending"] = {item.get("enclosure") for item in ret_array}
+        return ret_array
+
+    @staticmethod
+    def mark_feed_seen(feed_key, enclosures):
+        """
+        登记订阅源中已处理完成的种子，后续不再返回
+        :param feed_key: 订阅源标识
+        :param enclosures: 已处理完成的种子链接
+        """
+        if not feed_key:
+            return
+        with RssHelper._feed_lock:
+            feed_state = RssHelper._feed_states.get(feed_key)
+            if not feed_state:
+                return
+            for enclosure in enclosures:
+                feed_state["seen"].add(enclosure)
+                feed_state["pending"].discard(enclosure)
+
+    @staticmethod
+    def reset_feed_state(feed_key=None):
+        """
+        清除订阅源状态，下次重新处理全部种子
+        :param feed_key: 订阅源标识，为空时清除全部
+        """
+        with RssHelper._feed_lock:
+            if feed_key:
+                RssHelper._feed_states.pop(feed_key, None)
+            else:
+                RssHelper._feed_states.clear()
+
+    @staticmethod
+    def __get_feed_state(feed_key, feed_version):
+        """
+        获取订阅源状态，规则版本变化时重建
+        """
+        with RssHelper._feed_lock:
+            feed_state = RssHelper._feed_states.get(feed_key)
+            if not feed_state or feed_state.get("version") != feed_version:
+                feed_state = {
+                    "version": feed_version,
+                    "etag": None,
+                    "last_modified": None,
+                    "seen": set(),
+                    "pending": set()
+                }
+                RssHelper._feed_states[feed_key] = feed_state
+            return feed_state
+
+    @staticmethod
+    def iter_rssxml(content, site_domain=None):
+        """
+        流式解析RSS内容，逐条返回种子信息，已处理的节点及时释放
+        :param content: RSS内容，bytes或str
+        :param site_domain: 站点域名，用于标题特殊处理
+        :return: 种子信息生成器，XML格式错误时抛出ElementTree.ParseError，不支持的编码抛出ValueError
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        parents = []
+        for event, elem in ElementTree.iterparse(BytesIO(content), events=("start", "end")):
+            if event == "start":
+                parents.append(elem)
+                continue
+            parents.pop()
+            if RssHelper.__local_name(elem.tag) != "item":
+                continue
             try:
-                # 解析XML
-                dom_tree = xml.dom.minidom.parseString(ret_xml)
-                rootNode = dom_tree.documentElement
-                items = rootNode.getElementsByTagName("item")
-                for item in items:
-                    try:
-                        # 标题
-                        title = DomUtils.tag_value(item, "title", default="")
-                        if not title:
-                            continue
-                        # 标题特殊处理
-                        if site_domain and site_domain in _special_title_sites:
-                            title = _special_title_sites.get(site_domain)(title)
-                        # 描述
-                        description = DomUtils.tag_value(item, "description", default="")
-                        # 种子页面
-                        link = DomUtils.tag_value(item, "link", default="")
-                        # 种子链接
-                        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
-                        if not enclosure and not link:
-                            continue
-                        # 部分RSS只有link没有enclosure
-                        if not enclosure and link:
-                            enclosure = link
-                            link = None
-                        # 大小
-                        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
-                        if size and str(size).isdigit():
-                            size = int(size)
-                        else:
-                            size = 0
-                        # 发布日期
-                        pubdate = DomUtils.tag_value(item, "pubDate", default="")
-                        if pubdate:
-                            # 转换为时间
-                            pubdate = StringUtils.get_time_stamp(pubdate)
-                        # 返回对象
-                        tmp_dict = {'title': title,
-                                    'enclosure': enclosure,
-                                    'size': size,
-                                    'description': description,
-                                    'link': link,
-                                    'pubdate': pubdate}
+                tmp_dict = RssHelper.__build_rss_item(
+                    site_domain=site_domain,
+                    title=RssHelper.__tag_value(elem, "title", default=""),
+                    description=RssHelper.__tag_value(elem, "description", default=""),
+                    link=RssHelper.__tag_value(elem, "link", default=""),
+                    enclosure=RssHelper.__tag_value(elem, "enclosure", "url", default=""),
+                    size=RssHelper.__tag_value(elem, "enclosure", "length", default=0),
+                    pubdate=RssHelper.__tag_value(elem, "pubDate", default=""))
+            except Exception as e1:
+                ExceptionUtils.exception_traceback(e1)
+                tmp_dict = None
+            # 释放已处理的节点
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+            if tmp_dict:
+                yield tmp_dict
+
+    @staticmethod
+    def parse_rssxml_dom(ret_xml, site_domain=None):
+        """
+        使用minidom解析RSS内容
+        :param ret_xml: RSS内容
+        :param site_domain: 站点域名，用于标题特殊处理
+        :return: 种子信息列表，如为None代表Rss过期
+        """
+        ret_array = []
+        try:
+            # 解析XML
+            dom_tree = xml.dom.minidom.parseString(ret_xml)
+            rootNode = dom_tree.documentElement
+            items = rootNode.getElementsByTagName("item")
+            for item in items:
+                try:
+                    tmp_dict = RssHelper.__build_rss_item(
+                        site_domain=site_domain,
+                        title=DomUtils.tag_value(item, "title", default=""),
+                        description=DomUtils.tag_value(item, "description", default=""),
+                        link=DomUtils.tag_value(item, "link", default=""),
+                        enclosure=DomUtils.tag_value(item, "enclosure", "url", default=""),
+                        size=DomUtils.tag_value(item, "enclosure", "length", default=0),
+                        pubdate=DomUtils.tag_value(item, "pubDate", default=""))
+                    if tmp_dict:
                         ret_array.append(tmp_dict)
-                    except Exception as e1:
-                        ExceptionUtils.exception_traceback(e1)
-                        continue
-            except Exception as e2:
-                # RSS过期 观众RSS 链接已过期，您需要获得一个新的！  pthome RSS Link has expired, You need to get a new one!
-                if ret_xml in _rss_expired_msg:
-                    return None
-                ExceptionUtils.exception_traceback(e2)
+                except Exception as e1:
+                    ExceptionUtils.exception_traceback(e1)
+                    continue
+        except Exception as e2:
+            # RSS过期 观众RSS 链接已过期，您需要获得一个新的！  pthome RSS Link has expired, You need to get a new one!
+            if ret_xml in RssHelper._rss_expired_msg:
+                return None
+            ExceptionUtils.exception_traceback(e2)
         return ret_array
 
+    @staticmethod
+    def __local_name(tag):
+        """
+        去掉ElementTree标签的命名空间，如RSS 1.0的{http://purl.org/rss/1.0/}item
+        """
+        return tag.rsplit("}", 1)[-1]
+
+    @staticmethod
+    def __tag_value(elem, tag_name, attname="", default=None):
+        """
+        解析ElementTree节点下的标签值，与DomUtils.tag_value取值规则一致
+        """
+        tag = next((child for child in elem.iter() if RssHelper.__local_name(child.tag) == tag_name), None)
+        if tag is not None:
+            if attname:
+                attvalue = tag.get(attname)
+                if attvalue:
+                    return attvalue
+            elif tag.text:
+                return tag.text
+        return default
+
+    @staticmethod
+    def __build_rss_item(site_domain, title, description, link, enclosure, size, pubdate):
+        """
+        组装单条种子信息，无效条目返回None
+        """
+        # 标题
+        if not title:
+            return None
+        # 标题特殊处理
+        if site_domain and site_domain in RssHelper._special_title_sites:
+            title = RssHelper._special_title_sites.get(site_domain)(title)
+        # 种子链接
+        if not enclosure and not link:
+            return None
+        # 部分RSS只有link没有enclosure
+        if not enclosure and link:
+            enclosure = link
+            link = None
+        # 大小
+        if size and str(size).isdigit():
+            size = int(size)
+        else:
+            size = 0
+        # 发布日期
+        if pubdate:
+            # 转换为时间
+            pubdate = StringUtils.get_time_stamp(pubdate)
+        # 返回对象
+        return {'title': title,
+                'enclosure': enclosure,
+                'size': size,
+                'description': description,
+                'link': link,
+                'pubdate': pubdate}
+
     @DbPersist(_db)
     def insert_rss_torrents(self, media_info):
         """
         将RSS的记录插入数据库
         """
+        self.__add_enclosure_filter(media_info.enclosure)
         self._db.insert(
             RSSTORRENTS(
                 TORRENT_NAME=media_info.org_string,
@@ -118,6 +285,8 @@ class RssHelper:
         """
         if not enclosure:
             return True
+        if enclosure not in self.__get_enclosure_filter():
+            return False
         if self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0:
             return True
         else:
@@ -135,11 +304,53 @@ class RssHelper:
             ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == torrent_name).count()
         return True if ret > 0 else False
 
+    def get_rssd_enclosures(self, enclosures):
+        """
+        批量查询RSS处理过的下载链接，布隆过滤器排除未处理过的链接后，剩余的一次查询确认
+        :param enclosures: 下载链接列表
+        :return: 已处理过的下载链接集合
+        """
+        enclosure_filter = self.__get_enclosure_filter()
+        candidates = list({enclosure for enclosure in enclosures if enclosure and enclosure in enclosure_filter})
+        rssd_enclosures = set()
+        for i in range(0, len(candidates), self._QUERY_BATCH_SIZE):
+            rssd_enclosures.update(
+                row[0] for row in self._db.query(RSSTORRENTS.ENCLOSURE).filter(
+                    RSSTORRENTS.ENCLOSURE.in_(candidates[i:i + self._QUERY_BATCH_SIZE])).distinct())
+        return rssd_enclosures
+
+    def init_enclosure_filter(self):
+        """
+        预加载RSS下载链接布隆过滤器
+        """
+        self.__get_enclosure_filter()
+
+    def __get_enclosure_filter(self):
+        """
+        获取RSS下载链接布隆过滤器，首次使用时从数据库加载，超出容量时重建
+        """
+        with RssHelper._enclosure_filter_lock:
+            if RssHelper._enclosure_filter is None or RssHelper._enclosure_filter.is_full():
+                enclosures = [row[0] for row in self._db.query(RSSTORRENTS.ENCLOSURE).all() if row[0]]
+                enclosure_filter = BloomFilter(capacity=max(len(enclosures) * 2, 100000))
+                for enclosure in enclosures:
+                    enclosure_filter.add(enclosure)
+                RssHelper._enclosure_filter = enclosure_filter
+            return RssHelper._enclosure_filter
+
+    def __add_enclosure_filter(self, enclosure):
+        """
+        登记新处理的下载链接
+        """
+        if enclosure:
+            self.__get_enclosure_filter().add(enclosure)
+
     @DbPersist(_db)
     def simple_insert_rss_torrents(self, title, enclosure):
         """
         将RSS的记录插入数据库
         """
+        self.__add_enclosure_filter(enclosure)
         self._db.insert(
             RSSTORRENTS(
                 TORRENT_NAME=title,
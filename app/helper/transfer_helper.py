@@ -0,0 +1,209 @@
+import os
+import time
+from threading import Lock, BoundedSemaphore, Thread
+
+import log
+from app.helper.progress_helper import ProgressHelper
+from app.utils import SystemUtils, StringUtils
+from app.utils.commons import singleton
+from app.utils.types import RmtMode, ProgressKey
+from config import Config
+
+
+@singleton
+class TransferHelper(object):
+    """
+    文件转移执行器：不同目的设备的转移并行处理，同一设备按并发数限制排队，
+    硬链接、软链接及同设备移动只修改元数据，走快速通道不排队；
+    转移在调用线程中执行，进度由一个共享的进度线程统一刷新
+    """
+    # 每个目的设备默认同时进行的转移数
+    DEVICE_CONCURRENCY = 2
+    # 进度刷新间隔（秒）
+    PROGRESS_INTERVAL = 1
+
+    progress = None
+    _lock = None
+    _progress_thread = None
+    _device_concurrency = DEVICE_CONCURRENCY
+    _device_semaphores = {}
+    _running = {}
+    _stats = {}
+
+    def __init__(self):
+        self._lock = Lock()
+        self._running = {}
+        self._stats = {"fast": 0, "completed": 0, "failed": 0, "bytes": 0, "seconds": 0}
+        self._progress_thread = None
+        self.progress = ProgressHelper()
+        self.init_config()
+        Config().add_config_listener(self.init_config)
+
+    def init_config(self):
+        media = Config().get_config('media') or {}
+        concurrency = media.get('transfer_device_concurrency')
+        if isinstance(concurrency, str) and concurrency.isdigit():
+            concurrency = int(concurrency)
+        if not isinstance(concurrency, int) or concurrency <= 0:
+            concurrency = self.DEVICE_CONCURRENCY
+        with self._lock:
+            if concurrency != self._device_concurrency:
+                # 进行中的转移仍使用原信号量释放，新的转移按新并发数排队
+                self._device_semaphores = {}
+            self._device_concurrency = concurrency
+
+    @staticmethod
+    def __get_command(rmt_mode):
+        """
+        获取转移方式对应的处理函数
+        """
+        if rmt_mode == RmtMode.LINK:
+            return SystemUtils.link
+        elif rmt_mode == RmtMode.SOFTLINK:
+            return SystemUtils.softlink
+        elif rmt_mode == RmtMode.MOVE:
+            return SystemUtils.move
+        elif rmt_mode == RmtMode.RCLONE:
+            return SystemUtils.rclone_move
+        elif rmt_mode == RmtMode.RCLONECOPY:
+            return SystemUtils.rclone_copy
+        elif rmt_mode == RmtMode.MINIO:
+            return SystemUtils.minio_move
+        elif rmt_mode == RmtMode.MINIOCOPY:
+            return SystemUtils.minio_copy
+        return SystemUtils.copy
+
+    @staticmethod
+    def __get_device(path):
+        """
+        获取路径所在设备，路径不存在时取最近的已存在上级目录
+        """
+        path = os.path.abspath(path)
+        while path:
+            try:
+                return os.stat(path).st_dev
+            except OSError:
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+        return None
+
+    def __get_device_key(self, src, dest, rmt_mode):
+        """
+        获取限流KEY，返回None时走快速通道
+        """
+        if rmt_mode in [RmtMode.LINK, RmtMode.SOFTLINK]:
+            return None
+        # 远程存储按转移方式限流
+        if rmt_mode in [RmtMode.RCLONE, RmtMode.RCLONECOPY, RmtMode.MINIO, RmtMode.MINIOCOPY]:
+            return rmt_mode.name
+        dest_device = self.__get_device(os.path.dirname(dest))
+        # 同设备移动只是重命名
+        if rmt_mode == RmtMode.MOVE and dest_device is not None and dest_device == self.__get_device(src):
+            return None
+        return dest_device
+
+    def __get_device_semaphore(self, key):
+        with self._lock:
+            semaphore = self._device_semaphores.get(key)
+            if not semaphore:
+                semaphore = BoundedSemaphore(self._device_concurrency)
+                self._device_semaphores[key] = semaphore
+            return semaphore
+
+    def execute(self, src, dest, rmt_mode):
+        """
+        转移单个文件，等待完成后返回
+        :param src: 源文件路径
+        :param dest: 目的文件路径
+        :param rmt_mode: RmtMode转移方式
+        :return: 错误码，错误信息
+        """
+        command = self.__get_command(rmt_mode)
+        key = self.__get_device_key(src, dest, rmt_mode)
+        if key is None:
+            with self._lock:
+                self._stats["fast"] += 1
+            return command(src, dest)
+        task = {
+            "src": src,
+            "dest": dest,
+            "mode": rmt_mode,
+            "size": os.path.getsize(src) if os.path.isfile(src) else 0,
+            "start": None
+        }
+        retcode, retmsg = -1, ""
+        with self.__get_device_semaphore(key):
+            task["start"] = time.time()
+            with self._lock:
+                self._running[id(task)] = task
+                # 有转移进行中时才启动进度线程，全部完成后线程自行退出
+                if not self._progress_thread:
+                    self._progress_thread = Thread(target=self.__progress_loop,
+                                                   name="FileTransferProgress",
+                                                   daemon=True)
+                    self._progress_thread.start()
+            try:
+                retcode, retmsg = command(src, dest)
+            finally:
+                seconds = time.time() - task["start"]
+                with self._lock:
+                    self._running.pop(id(task), None)
+                    if retcode == 0:
+                        self._stats["completed"] += 1
+                        self._stats["bytes"] += task["size"]
+                        self._stats["seconds"] += seconds
+                    else:
+                        self._stats["failed"] += 1
+        if retcode == 0 and task["size"]:
+            log.debug("【Rmt】%s %s 完成，耗时 %.1f 秒，速度 %s/s" % (
+                os.path.basename(src),
+                StringUtils.str_filesize(task["size"]),
+                seconds,
+                StringUtils.str_filesize(task["size"] / max(seconds, 0.001))))
+        return retcode, retmsg
+
+    def __progress_loop(self):
+        """
+        定时刷新最近开始的转移的进度，没有进行中的转移时退出
+        """
+        while True:
+            time.sleep(self.PROGRESS_INTERVAL)
+            with self._lock:
+                if not self._running:
+                    self._progress_thread = None
+                    return
+                task = list(self._running.values())[-1]
+                running = len(self._running)
+            self.__report_progress(task, running)
+
+    def __report_progress(self, task, running):
+        """
+        按目的文件大小计算进度及速度，更新到转移进度
+        """
+        try:
+            done = os.path.getsize(task["dest"]) if os.path.exists(task["dest"]) else 0
+        except OSError:
+            done = 0
+        seconds = max(time.time() - task["start"], 0.001)
+        text = "正在%s：%s" % (task["mode"].value, os.path.basename(task["src"]))
+        if task["size"] and done:
+            text = "%s %s/%s，%s/s" % (text,
+                                      StringUtils.str_filesize(done),
+                                      StringUtils.str_filesize(task["size"]),
+                                      StringUtils.str_filesize(done / seconds))
+        if running > 1:
+            text = "%s（%s 个转移进行中）" % (text, running)
+        self.progress.update(ptype=ProgressKey.FileTransfer, text=text)
+
+    def get_stats(self):
+        """
+        获取转移统计：进行中数量、快速通道次数、完成/失败次数、转移字节数、平均速度及各复制方式的统计
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["running"] = len(self._running)
+        stats["throughput"] = round(stats["bytes"] / stats["seconds"]) if stats["seconds"] else 0
+        stats["copy"] = SystemUtils.get_copy_stats()
+        return stats
@@ -11,6 +11,10 @@ class WordsHelper:
     dbhelper = None
     # 识别词
     words_info = []
+    # 编译后的识别词处理流程
+    _pipeline = None
+    # 识别词版本，每次重新加载后递增
+    version = 0
 
     def __init__(self):
         self.init_config()
@@ -18,148 +22,23 @@ class WordsHelper:
     def init_config(self):
         self.dbhelper = DbHelper()
         self.words_info = self.dbhelper.get_custom_words(enabled=1)
+        self._pipeline = CustomWordsPipeline(self.words_info)
+        self.version += 1
 
     def process(self, title):
-        # 错误信息
-        msg = []
-        # 应用屏蔽
-        used_ignored_words = []
-        # 应用替换
-        used_replaced_words = []
-        # 应用集偏移
-        used_offset_words = []
-        # 应用识别词
-        for word_info in self.words_info:
-            match word_info.TYPE:
-                case 1:
-                    # 屏蔽
-                    ignored = word_info.REPLACED
-                    ignored_word = ignored
-                    title, ignore_msg, ignore_flag = self.replace_regex(title, ignored, "") \
-                        if word_info.REGEX else self.replace_noregex(title, ignored, "")
-                    if ignore_flag:
-                        used_ignored_words.append(ignored_word)
-                    elif ignore_msg:
-                        msg.append(f"自定义屏蔽词 {ignored_word} 设置有误：{ignore_msg}")
-                case 2:
-                    # 替换
-                    replaced, replace = word_info.REPLACED, word_info.REPLACE
-                    replaced_word = f"{replaced} ⇒ {replace}"
-                    title, replace_msg, replace_flag = self.replace_regex(title, replaced, replace) \
-                        if word_info.REGEX else self.replace_noregex(title, replaced, replace)
-                    if replace_flag:
-                        used_replaced_words.append(replaced_word)
-                    elif replace_msg:
-                        msg.append(f"自定义替换词 {replaced_word} 格式有误：{replace_msg}")
-
-                case 3:
-                    # 替换+集偏移
-                    replaced, replace, front, back, offset = \
-                        word_info.REPLACED, word_info.REPLACE, word_info.FRONT, word_info.BACK, word_info.OFFSET
-                    replaced_word = f"{replaced} ⇒ {replace}"
-                    offset_word = f"{front} + {back} >> {offset}"
-                    replaced_offset_word = f"{replaced_word} @@@ {offset_word}"
-                    # 记录替换前title
-                    title_cache = title
-                    # 替换
-                    title, replace_msg, replace_flag = self.replace_regex(title, replaced, replace)
-                    # 替换应用成功进行集数偏移
-                    if replace_flag:
-                        title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset)
-                        # 集数偏移应用成功
-                        if offset_flag:
-                            used_replaced_words.append(replaced_word)
-                            used_offset_words.append(offset_word)
-                        elif offset_msg:
-                            # 还原title
-                            title = title_cache
-                            msg.append(
-                                f"自定义替换+集偏移词 {replaced_offset_word} 集偏移部分格式有误：{offset_msg}")
-                    elif replace_msg:
-                        msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 替换部分格式有误：{replace_msg}")
-                case 4:
-                    # 集数偏移
-                    front, back, offset = word_info.FRONT, word_info.BACK, word_info.OFFSET
-                    offset_word = f"{front} + {back} >> {offset}"
-                    title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset)
-                    if offset_flag:
-                        used_offset_words.append(offset_word)
-                    elif offset_msg:
-                        msg.append(f"自定义集偏移词 {offset_word} 格式有误：{offset_msg}")
-                case _:
-                    pass
-        return title, msg, {"ignored": used_ignored_words, "replaced": used_replaced_words, "offset": used_offset_words}
+        return self._pipeline.process(title)
 
     @staticmethod
     def replace_regex(title, replaced, replace) -> (str, str, bool):
-        try:
-            if not re.findall(r'%s' % replaced, title):
-                return title, "", False
-            else:
-                return re.sub(r'%s' % replaced, r'%s' % replace, title), "", True
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
-            return title, str(err), False
+        return CustomWordsPipeline.replace_regex(title, replaced, replace)
 
     @staticmethod
     def replace_noregex(title, replaced, replace) -> (str, str, bool):
-        try:
-            if title.find(replaced) == -1:
-                return title, "", False
-            else:
-                return title.replace(replaced, replace), "", True
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
-            return title, str(err), False
+        return CustomWordsPipeline.replace_noregex(title, replaced, replace)
 
     @staticmethod
     def episode_offset(title, front, back, offset) -> (str, str, bool):
-        try:
-            if back and not re.findall(r'%s' % back, title):
-                return title, "", False
-            if front and not re.findall(r'%s' % front, title):
-                return title, "", False
-            offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
-            episode_nums_str = re.findall(offset_word_info_re, title)
-            if not episode_nums_str:
-                return title, "", False
-            episode_nums_offset_str = []
-            offset_order_flag = False
-            for episode_num_str in episode_nums_str:
-                episode_num_int = int(cn2an.cn2an(episode_num_str, "smart"))
-                offset_caculate = offset.replace("EP", str(episode_num_int))
-                episode_num_offset_int = int(eval(offset_caculate))
-                # 向前偏移
-                if episode_num_int > episode_num_offset_int:
-                    offset_order_flag = True
-                # 向后偏移
-                elif episode_num_int < episode_num_offset_int:
-                    offset_order_flag = False
-                # 原值是中文数字，转换回中文数字，阿拉伯数字则还原0的填充
-                if not episode_num_str.isdigit():
-                    episode_num_offset_str = cn2an.an2cn(episode_num_offset_int, "low")
-                else:
-                    count_0 = re.findall(r"^0+", episode_num_str)
-                    if count_0:
-                        episode_num_offset_str = f"{count_0[0]}{episode_num_offset_int}"
-                    else:
-                        episode_num_offset_str = str(episode_num_offset_int)
-                episode_nums_offset_str.append(episode_num_offset_str)
-            episode_nums_dict = dict(zip(episode_nums_str, episode_nums_offset_str))
-            # 集数向前偏移，集数按升序处理
-            if offset_order_flag:
-                episode_nums_list = sorted(episode_nums_dict.items(), key=lambda x: x[1])
-            # 集数向后偏移，集数按降序处理
-            else:
-                episode_nums_list = sorted(episode_nums_dict.items(), key=lambda x: x[1], reverse=True)
-            for episode_num in episode_nums_list:
-                episode_offset_re = re.compile(
-                    r'(?<=%s.*?)%s(?=.*?%s)' % (front, episode_num[0], back))
-                title = re.sub(episode_offset_re, r'%s' % episode_num[1], title)
-            return title, "", True
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
-            return title, str(err), False
+        return CustomWordsPipeline.episode_offset(title, front, back, offset)
 
     def is_custom_words_existed(self, replaced=None, front=None, back=None):
         """
@@ -243,3 +122,286 @@ class WordsHelper:
         ret = self.dbhelper.check_custom_word(wid=wid, enabled=enabled)
         self.init_config()
         return ret
+
+
+class CustomWordsPipeline:
+    """
+    编译后的识别词处理流程，识别词变化时整体重建
+    正则预先编译，连续的非正则屏蔽/替换词合并为一次预检查，都不包含时整段跳过
+    """
+    # 识别词类型：屏蔽、替换、替换+集偏移、集偏移
+    IGNORE, REPLACE, REPLACE_OFFSET, OFFSET = 1, 2, 3, 4
+
+    def __init__(self, words_info):
+        self.steps = []
+        plain_words = []
+        for word_info in words_info:
+            word = self.__compile_word(word_info)
+            if not word:
+                continue
+            # 非正则的屏蔽词和替换词，合并预检查
+            if word.get("plain"):
+                plain_words.append(word)
+                continue
+            self.__add_plain_words(plain_words)
+            plain_words = []
+            self.steps.append(word)
+        self.__add_plain_words(plain_words)
+
+    def __add_plain_words(self, plain_words):
+        if not plain_words:
+            return
+        if len(plain_words) == 1:
+            self.steps.append(plain_words[0])
+            return
+        # 使用命名列表一次匹配所有词，任一词出现在标题中时才逐个处理
+        self.steps.append({
+            "type": None,
+            "precheck": re.compile(r"\L<words>", words=[word.get("replaced") for word in plain_words]),
+            "words": plain_words
+        })
+
+    @staticmethod
+    def compile(pattern):
+        """
+        编译正则，编译失败时返回异常，在使用时再抛出
+        """
+        try:
+            return re.compile(r'%s' % pattern)
+        except Exception as err:
+            return err
+
+    @staticmethod
+    def compile_offset(front, back):
+        """
+        编译集偏移中集数的正则
+        """
+        try:
+            return re.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
+        except Exception as err:
+            return err
+
+    @staticmethod
+    def __check(pattern):
+        if isinstance(pattern, Exception):
+            raise pattern
+        return pattern
+
+    def __compile_word(self, word_info):
+        """
+        编译单个识别词
+        """
+        wtype = word_info.TYPE
+        if wtype == self.IGNORE:
+            return {
+                "type": wtype,
+                "regex": word_info.REGEX,
+                "replaced": word_info.REPLACED,
+                "replace": "",
+                "pattern": self.compile(word_info.REPLACED) if word_info.REGEX else None,
+                "plain": not word_info.REGEX and isinstance(word_info.REPLACED, str) and word_info.REPLACED,
+                "word": word_info.REPLACED
+            }
+        elif wtype == self.REPLACE:
+            return {
+                "type": wtype,
+                "regex": word_info.REGEX,
+                "replaced": word_info.REPLACED,
+                "replace": word_info.REPLACE,
+                "pattern": self.compile(word_info.REPLACED) if word_info.REGEX else None,
+                "plain": not word_info.REGEX and isinstance(word_info.REPLACED, str) and word_info.REPLACED
+                         and isinstance(word_info.REPLACE, str),
+                "word": f"{word_info.REPLACED} ⇒ {word_info.REPLACE}"
+            }
+        elif wtype in [self.REPLACE_OFFSET, self.OFFSET]:
+            front, back, offset = word_info.FRONT, word_info.BACK, word_info.OFFSET
+            return {
+                "type": wtype,
+                "replaced": word_info.REPLACED,
+                "replace": word_info.REPLACE,
+                "pattern": self.compile(word_info.REPLACED) if wtype == self.REPLACE_OFFSET else None,
+                "front": front,
+                "back": back,
+                "offset": offset,
+                "front_re": self.compile(front) if front else None,
+                "back_re": self.compile(back) if back else None,
+                "offset_re": self.compile_offset(front, back),
+                "word": f"{word_info.REPLACED} ⇒ {word_info.REPLACE}",
+                "offset_word": f"{front} + {back} >> {offset}"
+            }
+        return None
+
+    def __replace(self, title, word):
+        """
+        应用屏蔽词/替换词
+        """
+        if not word.get("pattern"):
+            return self.replace_noregex(title, word.get("replaced"), word.get("replace"))
+        try:
+            title_new, count = self.__check(word.get("pattern")).subn(r'%s' % word.get("replace"), title)
+            if not count:
+                return title, "", False
+            return title_new, "", True
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return title, str(err), False
+
+    def process(self, title):
+        # 错误信息
+        msg = []
+        # 应用屏蔽
+        used_ignored_words = []
+        # 应用替换
+        used_replaced_words = []
+        # 应用集偏移
+        used_offset_words = []
+        # 应用识别词
+        for step in self.steps:
+            if step.get("type") is None:
+                # 合并的非正则词，都不包含时跳过，否则只处理标题中包含的词
+                if not step.get("precheck").search(title):
+                    continue
+                words = step.get("words")
+            else:
+                words = [step]
+            for word in words:
+                if word.get("plain") and word.get("replaced") not in title:
+                    continue
+                match word.get("type"):
+                    case self.IGNORE:
+                        # 屏蔽
+                        title, ignore_msg, ignore_flag = self.__replace(title, word)
+                        if ignore_flag:
+                            used_ignored_words.append(word.get("word"))
+                        elif ignore_msg:
+                            msg.append(f"自定义屏蔽词 {word.get('word')} 设置有误：{ignore_msg}")
+                    case self.REPLACE:
+                        # 替换
+                        title, replace_msg, replace_flag = self.__replace(title, word)
+                        if replace_flag:
+                            used_replaced_words.append(word.get("word"))
+                        elif replace_msg:
+                            msg.append(f"自定义替换词 {word.get('word')} 格式有误：{replace_msg}")
+                    case self.REPLACE_OFFSET:
+                        # 替换+集偏移
+                        replaced_offset_word = f"{word.get('word')} @@@ {word.get('offset_word')}"
+                        # 记录替换前title
+                        title_cache = title
+                        # 替换
+                        title, replace_msg, replace_flag = self.__replace(title, word)
+                        # 替换应用成功进行集数偏移
+                        if replace_flag:
+                            title, offset_msg, offset_flag = self.__episode_offset(title, word)
+                            # 集数偏移应用成功
+                            if offset_flag:
+                                used_replaced_words.append(word.get("word"))
+                                used_offset_words.append(word.get("offset_word"))
+                            elif offset_msg:
+                                # 还原title
+                                title = title_cache
+                                msg.append(
+                                    f"自定义替换+集偏移词 {replaced_offset_word} 集偏移部分格式有误：{offset_msg}")
+                        elif replace_msg:
+                            msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 替换部分格式有误：{replace_msg}")
+                    case self.OFFSET:
+                        # 集数偏移
+                        title, offset_msg, offset_flag = self.__episode_offset(title, word)
+                        if offset_flag:
+                            used_offset_words.append(word.get("offset_word"))
+                        elif offset_msg:
+                            msg.append(f"自定义集偏移词 {word.get('offset_word')} 格式有误：{offset_msg}")
+                    case _:
+                        pass
+        return title, msg, {"ignored": used_ignored_words, "replaced": used_replaced_words, "offset": used_offset_words}
+
+    @staticmethod
+    def replace_regex(title, replaced, replace) -> (str, str, bool):
+        try:
+            if not re.findall(r'%s' % replaced, title):
+                return title, "", False
+            else:
+                return re.sub(r'%s' % replaced, r'%s' % replace, title), "", True
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return title, str(err), False
+
+    @staticmethod
+    def replace_noregex(title, replaced, replace) -> (str, str, bool):
+        try:
+            if title.find(replaced) == -1:
+                return title, "", False
+            else:
+                return title.replace(replaced, replace), "", True
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return title, str(err), False
+
+    @staticmethod
+    def episode_offset(title, front, back, offset) -> (str, str, bool):
+        return CustomWordsPipeline.apply_episode_offset(title=title,
+                                                        front=front,
+                                                        back=back,
+                                                        offset=offset,
+                                                        front_re=CustomWordsPipeline.compile(front),
+                                                        back_re=CustomWordsPipeline.compile(back),
+                                                        offset_re=CustomWordsPipeline.compile_offset(front, back))
+
+    def __episode_offset(self, title, word):
+        return self.apply_episode_offset(title=title,
+                                         front=word.get("front"),
+                                         back=word.get("back"),
+                                         offset=word.get("offset"),
+                                         front_re=word.get("front_re"),
+                                         back_re=word.get("back_re"),
+                                         offset_re=word.get("offset_re"))
+
+    @staticmethod
+    def apply_episode_offset(title, front, back, offset, front_re, back_re, offset_re) -> (str, str, bool):
+        """
+        集数偏移，使用预编译的前后定位词及集数正则
+        """
+        try:
+            if back and not CustomWordsPipeline.__check(back_re).search(title):
+                return title, "", False
+            if front and not CustomWordsPipeline.__check(front_re).search(title):
+                return title, "", False
+            episode_nums_str = CustomWordsPipeline.__check(offset_re).findall(title)
+            if not episode_nums_str:
+                return title, "", False
+            episode_nums_offset_str = []
+            offset_order_flag = False
+            for episode_num_str in episode_nums_str:
+                episode_num_int = int(cn2an.cn2an(episode_num_str, "smart"))
+                offset_caculate = offset.replace("EP", str(episode_num_int))
+                episode_num_offset_int = int(eval(offset_caculate))
+                # 向前偏移
+                if episode_num_int > episode_num_offset_int:
+                    offset_order_flag = True
+                # 向后偏移
+                elif episode_num_int < episode_num_offset_int:
+                    offset_order_flag = False
+                # 原值是中文数字，转换回中文数字，阿拉伯数字则还原0的填充
+                if not episode_num_str.isdigit():
+                    episode_num_offset_str = cn2an.an2cn(episode_num_offset_int, "low")
+                else:
+                    count_0 = re.findall(r"^0+", episode_num_str)
+                    if count_0:
+                        episode_num_offset_str = f"{count_0[0]}{episode_num_offset_int}"
+                    else:
+                        episode_num_offset_str = str(episode_num_offset_int)
+                episode_nums_offset_str.append(episode_num_offset_str)
+            episode_nums_dict = dict(zip(episode_nums_str, episode_nums_offset_str))
+            # 集数向前偏移，集数按升序处理
+            if offset_order_flag:
+                episode_nums_list = sorted(episode_nums_dict.items(), key=lambda x: x[1])
+            # 集数向后偏移，集数按降序处理
+            else:
+                episode_nums_list = sorted(episode_nums_dict.items(), key=lambda x: x[1], reverse=True)
+            for episode_num in episode_nums_list:
+                episode_offset_re = re.compile(
+                    r'(?<=%s.*?)%s(?=.*?%s)' % (front, episode_num[0], back))
+                title = re.sub(episode_offset_re, r'%s' % episode_num[1], title)
+            return title, "", True
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return title, str(err), False
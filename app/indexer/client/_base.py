@@ -85,6 +85,8 @@ class _IIndexClient(metaclass=ABCMeta):
         index_rule_fail = 0
         index_match_fail = 0
         index_error = 0
+        # 通过初步过滤的种子
+        candidates = []
         for item in result_array:
             try:
                 # 名称
@@ -166,46 +168,75 @@ class _IIndexClient(metaclass=ABCMeta):
                     log.info(f"【{self.client_name}】{match_msg}")
                     index_rule_fail += 1
                     continue
-                # 识别媒体信息
+                # 识别媒体信息，需重新识别的先收集起来批量查询
+                media_info = None
                 if not match_media:
                     # 不过滤
                     media_info = meta_info
+                elif meta_info.imdb_id \
+                        and match_media.imdb_id \
+                        and str(meta_info.imdb_id) == str(match_media.imdb_id):
+                    # IMDBID匹配，合并媒体数据
+                    media_info = self.media.merge_media_info(meta_info, match_media)
                 else:
-                    # 0-识别并模糊匹配；1-识别并精确匹配
-                    if meta_info.imdb_id \
-                            and match_media.imdb_id \
-                            and str(meta_info.imdb_id) == str(match_media.imdb_id):
-                        # IMDBID匹配，合并媒体数据
+                    # 查询缓存
+                    cache_info = self.media.get_cache_info(meta_info)
+                    if str(cache_info.get("id")) == str(match_media.tmdb_id):
+                        # 缓存匹配，合并媒体数据
                         media_info = self.media.merge_media_info(meta_info, match_media)
-                    else:
-                        # 查询缓存
-                        cache_info = self.media.get_cache_info(meta_info)
-                        if match_media \
-                                and str(cache_info.get("id")) == str(match_media.tmdb_id):
-                            # 缓存匹配，合并媒体数据
-                            media_info = self.media.merge_media_info(meta_info, match_media)
-                        else:
-                            # 重新识别
-                            media_info = self.media.get_media_info(title=torrent_name, subtitle=description, chinese=False)
-                            if not media_info:
-                                log.warn(f"【{self.client_name}】{torrent_name} 识别媒体信息出错！")
-                                index_error += 1
-                                continue
-                            elif not media_info.tmdb_info:
-                                log.info(
-                                    f"【{self.client_name}】{torrent_name} 识别为 {media_info.get_name()} 未匹配到媒体信息")
-                                index_match_fail += 1
-                                continue
-                            # TMDBID是否匹配
-                            if str(media_info.tmdb_id) != str(match_media.tmdb_id):
-                                log.info(
-                                    f"【{self.client_name}】{torrent_name} 识别为 "
-                                    f"{media_info.type.value}/{media_info.get_title_string()}/{media_info.tmdb_id} "
-                                    f"与 {match_media.type.value}/{match_media.get_title_string()}/{match_media.tmdb_id} 不匹配")
-                                index_match_fail += 1
-                                continue
-                            # 合并媒体数据
-                            media_info = self.media.merge_media_info(media_info, match_media)
+                candidates.append({
+                    "media_info": media_info,
+                    "torrent_name": torrent_name,
+                    "description": description,
+                    "enclosure": enclosure,
+                    "size": size,
+                    "seeders": seeders,
+                    "peers": peers,
+                    "page_url": page_url,
+                    "uploadvolumefactor": uploadvolumefactor,
+                    "downloadvolumefactor": downloadvolumefactor,
+                    "res_order": res_order
+                })
+            except Exception as err:
+                print(str(err))
+        # 重新识别，相同媒体只查询一次TMDB
+        recognize_candidates = [candidate for candidate in candidates if not candidate.get("media_info")]
+        if recognize_candidates:
+            recognize_infos = self.media.get_media_infos(
+                titles=[(candidate.get("torrent_name"), candidate.get("description"))
+                        for candidate in recognize_candidates],
+                chinese=False)
+            for candidate, media_info in zip(recognize_candidates, recognize_infos):
+                candidate["recognize_info"] = media_info
+        for candidate in candidates:
+            try:
+                media_info = candidate.get("media_info")
+                torrent_name = candidate.get("torrent_name")
+                description = candidate.get("description")
+                res_order = candidate.get("res_order")
+                if match_media:
+                    if not media_info:
+                        # 重新识别的结果
+                        media_info = candidate.get("recognize_info")
+                        if not media_info:
+                            log.warn(f"【{self.client_name}】{torrent_name} 识别媒体信息出错！")
+                            index_error += 1
+                            continue
+                        elif not media_info.tmdb_info:
+                            log.info(
+                                f"【{self.client_name}】{torrent_name} 识别为 {media_info.get_name()} 未匹配到媒体信息")
+                            index_match_fail += 1
+                            continue
+                        # TMDBID是否匹配
+                        if str(media_info.tmdb_id) != str(match_media.tmdb_id):
+                            log.info(
+                                f"【{self.client_name}】{torrent_name} 识别为 "
+                                f"{media_info.type.value}/{media_info.get_title_string()}/{media_info.tmdb_id} "
+                                f"与 {match_media.type.value}/{match_media.get_title_string()}/{match_media.tmdb_id} 不匹配")
+                            index_match_fail += 1
+                            continue
+                        # 合并媒体数据
+                        media_info = self.media.merge_media_info(media_info, match_media)
                     # 过滤类型
                     if filter_args.get("type"):
                         if (filter_args.get("type") == MediaType.TV and media_info.type == MediaType.MOVIE) \
@@ -252,16 +283,16 @@ class _IIndexClient(metaclass=ABCMeta):
                     f"{media_info.get_season_episode_string()} 匹配成功")
                 media_info.set_torrent_info(site=indexer.name,
                                             site_order=order_seq,
-                                            enclosure=enclosure,
+                                            enclosure=candidate.get("enclosure"),
                                             res_order=res_order,
                                             filter_rule=filter_args.get("rule"),
-                                            size=size,
-                                            seeders=seeders,
-                                            peers=peers,
+                                            size=candidate.get("size"),
+                                            seeders=candidate.get("seeders"),
+                                            peers=candidate.get("peers"),
                                             description=description,
-                                            page_url=page_url,
-                                            upload_volume_factor=uploadvolumefactor,
-                                            download_volume_factor=downloadvolumefactor)
+                                            page_url=candidate.get("page_url"),
+                                            upload_volume_factor=candidate.get("uploadvolumefactor"),
+                                            download_volume_factor=candidate.get("downloadvolumefactor"))
                 if media_info not in ret_array:
                     index_sucess += 1
                     ret_array.append(media_info)
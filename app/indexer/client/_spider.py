@@ -1,6 +1,7 @@
 import copy
 import datetime
 import re
+import threading
 from urllib.parse import quote
 
 from jinja2 import Template
@@ -90,6 +91,8 @@ class TorrentSpider(feapder.AirSpider):
     torrents_info = {}
     # 种子列表
     torrents_info_array = []
+    # 搜索完成事件
+    _complete_event = None
 
     def setparam(self, indexer,
                  keyword: [str, list] = None,
@@ -135,6 +138,31 @@ class TorrentSpider(feapder.AirSpider):
             self.referer = referer
         self.result_num = Config().get_config('pt').get('site_search_result_num') or 100
         self.torrents_info_array = []
+        self._complete_event = threading.Event()
+
+    def set_complete(self):
+        """
+        标记搜索完成并通知等待方
+        """
+        self.is_complete = True
+        if self._complete_event:
+            self._complete_event.set()
+
+    def wait_complete(self, timeout=None):
+        """
+        等待搜索完成
+        :param timeout: 超时时间（秒）
+        :return: 是否在超时前完成
+        """
+        if not self._complete_event:
+            return self.is_complete
+        return self._complete_event.wait(timeout)
+
+    def end_callback(self):
+        """
+        爬虫结束回调，请求失败未进入解析时也能结束等待
+        """
+        self.set_complete()
 
     def start_requests(self):
         """
@@ -142,7 +170,7 @@ class TorrentSpider(feapder.AirSpider):
         """
 
         if not self.search or not self.domain:
-            self.is_complete = True
+            self.set_complete()
             return
 
         # 种子搜索相对路径
@@ -648,7 +676,7 @@ class TorrentSpider(feapder.AirSpider):
             html_text = self.clean_all_sites_free(html_text)
             if not html_text:
                 self.is_error = True
-                self.is_complete = True
+                self.set_complete()
                 return
             # 解析站点文本对象
             html_doc = PyQuery(html_text)
@@ -665,4 +693,4 @@ class TorrentSpider(feapder.AirSpider):
             ExceptionUtils.exception_traceback(err)
             log.warn(f"【Spider】错误：{self.indexername} {str(err)}")
         finally:
-            self.is_complete = True
+            self.set_complete()
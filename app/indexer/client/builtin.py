@@ -1,6 +1,5 @@
 import copy
 import datetime
-import time
 
 import log
 from app.conf import SystemConfig
@@ -13,7 +12,7 @@ from app.indexer.client._mt_spider import MTSpider
 from app.indexer.client._torrentleech import TorrentLeech
 from app.indexer.client._plugins import PluginsSpider
 from app.sites import Sites
-from app.utils import StringUtils
+from app.utils import StringUtils, SearchResultCache
 from app.utils.types import SearchType, IndexerType, ProgressKey, SystemConfigKey
 from config import Config
 from web.backend.pro_user import ProUser
@@ -29,6 +28,7 @@ class BuiltinIndexer(_IIndexClient):
     # 私有属性
     _client_config = {}
     _show_more_sites = False
+    _search_cache_ttl = 600
     progress = None
     sites = None
     dbhelper = None
@@ -49,6 +49,12 @@ class BuiltinIndexer(_IIndexClient):
         self.chromehelper = ChromeHelper()
         self.systemconfig = SystemConfig()
         self._show_more_sites = Config().get_config("laboratory").get('show_more_sites')
+        pt = Config().get_config('pt') or {}
+        cache_ttl = pt.get('site_search_cache_ttl')
+        self._search_cache_ttl = int(cache_ttl) if cache_ttl is not None else 600
+        SearchResultCache.configure(maxsize=int(pt.get('site_search_cache_size') or 500),
+                                    ttl=max(self._search_cache_ttl, 1))
+        SearchResultCache.clear()
 
     @classmethod
     def match(cls, ctype):
@@ -150,10 +156,6 @@ class BuiltinIndexer(_IIndexClient):
         """
         if not indexer or not key_word:
             return None
-        # 站点流控
-        if self.sites.check_ratelimit(indexer.siteid):
-            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 触发站点流控，跳过 ...")
-            return []
         # fix 共用同一个dict时会导致某个站点的更新全局全效
         if filter_args is None:
             _filter_args = {}
@@ -177,6 +179,25 @@ class BuiltinIndexer(_IIndexClient):
         if indexer.language == "en" and StringUtils.is_chinese(search_word):
             log.warn(f"【{self.client_name}】{indexer.name} 无法使用中文名搜索")
             return []
+        mtype = match_media.type if match_media and match_media.tmdb_info else None
+        # 命中缓存时不再请求站点，仅重新过滤
+        cache_key = self.__get_search_cache_key(indexer, search_word, mtype)
+        cache_result = SearchResultCache.get(cache_key) if self._search_cache_ttl else None
+        if cache_result is not None:
+            log.info(f"【{self.client_name}】{indexer.name} 使用缓存的搜索结果：{len(cache_result)}")
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 使用缓存的 {len(cache_result)} 条数据")
+            if not cache_result:
+                return []
+            return self.filter_search_results(result_array=copy.deepcopy(cache_result),
+                                              order_seq=order_seq,
+                                              indexer=indexer,
+                                              filter_args=_filter_args,
+                                              match_media=match_media,
+                                              start_time=start_time)
+        # 站点流控
+        if self.sites.check_ratelimit(indexer.siteid):
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 触发站点流控，跳过 ...")
+            return []
         # 开始索引
         result_array = []
         try:
@@ -187,7 +208,7 @@ class BuiltinIndexer(_IIndexClient):
             elif indexer.parser == "RenderSpider":
                 error_flag, result_array = RenderSpider(indexer).search(
                     keyword=search_word,
-                    mtype=match_media.type if match_media and match_media.tmdb_info else None)
+                    mtype=mtype)
             elif indexer.parser == "TorrentLeech":
                 error_flag, result_array = TorrentLeech(indexer).search(keyword=search_word)
             else:
@@ -197,7 +218,7 @@ class BuiltinIndexer(_IIndexClient):
                     error_flag, result_array = self.__spider_search(
                         keyword=search_word,
                         indexer=indexer,
-                        mtype=match_media.type if match_media and match_media.tmdb_info else None)
+                        mtype=mtype)
         except Exception as err:
             error_flag = True
             print(str(err))
@@ -209,6 +230,9 @@ class BuiltinIndexer(_IIndexClient):
                                                 itype=self.client_id,
                                                 seconds=seconds,
                                                 result='N' if error_flag else 'Y')
+        # 缓存未出错的原始结果
+        if not error_flag and self._search_cache_ttl:
+            SearchResultCache.set(cache_key, copy.deepcopy(result_array), ttl=self._search_cache_ttl)
         # 返回结果
         if len(result_array) == 0:
             log.warn(f"【{self.client_name}】{indexer.name} 未搜索到数据")
@@ -271,6 +295,16 @@ class BuiltinIndexer(_IIndexClient):
                                                 result='N' if error_flag else 'Y')
         return result_array
 
+    @staticmethod
+    def __get_search_cache_key(indexer, keyword, mtype=None):
+        """
+        生成搜索结果缓存的KEY：站点+规范化后的关键字+媒体类型
+        """
+        if isinstance(keyword, list):
+            keyword = "|".join(str(k) for k in keyword)
+        keyword = " ".join(str(keyword).lower().split())
+        return f"{indexer.id or indexer.domain}|{keyword}|{mtype.value if mtype else ''}"
+
     @staticmethod
     def __spider_search(indexer, keyword=None, page=None, mtype=None, timeout=30):
         """
@@ -288,13 +322,8 @@ class BuiltinIndexer(_IIndexClient):
                         page=page,
                         mtype=mtype)
         spider.start()
-        # 循环判断是否获取到数据
-        sleep_count = 0
-        while not spider.is_complete:
-            sleep_count += 1
-            time.sleep(1)
-            if sleep_count > timeout:
-                break
+        # 等待搜索完成或超时
+        spider.wait_complete(timeout)
         # 是否发生错误
         result_flag = spider.is_error
         # 种子列表
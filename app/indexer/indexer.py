@@ -1,5 +1,7 @@
 import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from threading import Lock
 
 import log
 from app.helper import ProgressHelper, SubmoduleHelper, DbHelper
@@ -9,6 +11,12 @@ from app.utils.types import SearchType, IndexerType, ProgressKey
 from app.sites import Sites
 from config import Config
 
+# 共享搜索线程池的最大线程数
+SEARCH_MAX_WORKERS = 32
+# 单个站点同时进行的搜索数
+SITE_SEARCH_CONCURRENCY = 2
+
+
 @singleton
 class Indexer(object):
     _indexer_schemas = []
@@ -16,6 +24,12 @@ class Indexer(object):
     _client_type = None
     progress = None
     dbhelper = None
+    # 所有搜索共用的线程池
+    _search_executor = None
+    # 站点并发限制：站点 -> 等待中的搜索、站点 -> 进行中的搜索数
+    _site_queues = {}
+    _site_running = {}
+    _site_lock = Lock()
 
     def __init__(self):
         self._indexer_schemas = SubmoduleHelper.import_submodules(
@@ -23,6 +37,8 @@ class Indexer(object):
             filter_func=lambda _, obj: hasattr(obj, 'client_id')
         )
         log.debug(f"【Indexer】加载索引器：{self._indexer_schemas}")
+        self._search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS,
+                                                   thread_name_prefix="IndexerSearch")
         self.init_config()
 
     def init_config(self):
@@ -107,6 +123,51 @@ class Indexer(object):
         """
         return self._client.list(url=url, page=page, keyword=keyword)
 
+    def __submit_search(self, order_seq, indexer, key_word, filter_args, match_media, in_from):
+        """
+        按站点排队提交搜索，同一站点的并发搜索数不超过SITE_SEARCH_CONCURRENCY，
+        超出的搜索在队列中等待，不占用线程池的线程
+        :return: Future
+        """
+        job = {
+            "future": Future(),
+            "args": (order_seq, indexer, key_word, filter_args, match_media, in_from)
+        }
+        site_key = indexer.id or indexer.domain
+        with self._site_lock:
+            self._site_queues.setdefault(site_key, deque()).append(job)
+            self.__dispatch_search(site_key)
+        return job.get("future")
+
+    def __dispatch_search(self, site_key):
+        """
+        站点有空闲名额时取出等待中的搜索交给线程池，需在锁内调用
+        """
+        queue = self._site_queues.get(site_key)
+        while queue and self._site_running.get(site_key, 0) < SITE_SEARCH_CONCURRENCY:
+            job = queue.popleft()
+            self._site_running[site_key] = self._site_running.get(site_key, 0) + 1
+            self._search_executor.submit(self.__search_indexer, site_key, job)
+        if not queue:
+            self._site_queues.pop(site_key, None)
+
+    def __search_indexer(self, site_key, job):
+        """
+        搜索单个站点，完成后释放站点名额
+        """
+        result, error = None, None
+        try:
+            result = self._client.search(*job.get("args"))
+        except Exception as err:
+            error = err
+        with self._site_lock:
+            self._site_running[site_key] -= 1
+            self.__dispatch_search(site_key)
+        if error:
+            job.get("future").set_exception(error)
+        else:
+            job.get("future").set_result(result)
+
     def __get_client(self, ctype: [IndexerType, str], conf=None):
         return self.__build_class(ctype=ctype, conf=conf)
 
@@ -164,18 +225,16 @@ class Indexer(object):
             log.info(f"【{self._client_type.value}】开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
             self.progress.update(ptype=ProgressKey.Search,
                                  text="开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
-        # 多线程
-        executor = ThreadPoolExecutor(max_workers=len(indexers))
+        # 多线程，使用共享线程池
         all_task = []
         for index in indexers:
             order_seq = 100 - int(index.pri)
-            task = executor.submit(self._client.search,
-                                   order_seq,
-                                   index,
-                                   key_word,
-                                   filter_args,
-                                   match_media,
-                                   in_from)
+            task = self.__submit_search(order_seq,
+                                        index,
+                                        key_word,
+                                        filter_args,
+                                        match_media,
+                                        in_from)
             all_task.append(task)
         ret_array = []
         finish_count = 0
@@ -3,6 +3,7 @@ import os
 import random
 import re
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
 
 import zhconv
@@ -13,11 +14,15 @@ from app.helper import MetaHelper
 from app.helper.openai_helper import OpenAiHelper
 from app.media.meta.metainfo import MetaInfo
 from app.media.tmdbv3api import TMDb, Search, Movie, TV, Person, Find, TMDbException, Discover, Trending, Episode, Genre
-from app.utils import PathUtils, EpisodeFormat, RequestUtils, NumberUtils, StringUtils, cacheman
+from app.utils import PathUtils, EpisodeFormat, RequestUtils, NumberUtils, StringUtils, ExceptionUtils, \
+    SingleFlight, cacheman
 from app.utils.types import MediaType, MatchMode
 from config import Config, KEYWORD_BLACKLIST, KEYWORD_SEARCH_WEIGHT_3, KEYWORD_SEARCH_WEIGHT_2, KEYWORD_SEARCH_WEIGHT_1, \
     KEYWORD_STR_SIMILARITY_THRESHOLD, KEYWORD_DIFF_SCORE_THRESHOLD
 
+# 批量识别时并发查询TMDB的线程数
+TMDB_MAX_WORKERS = 5
+
 
 class Media:
     # TheMovieDB
@@ -39,6 +44,8 @@ class Media:
     _chatgpt_enable = None
     _default_language = None
     _tmdb_include_adult = None
+    # 合并并发的相同查询，所有实例共用
+    _single_flight = SingleFlight()
 
     def __init__(self):
         self.init_config()
@@ -65,6 +72,8 @@ class Media:
             self.tmdb.domain = Config().get_tmdbapi_url()
             # 开启缓存
             self.tmdb.cache = True
+            # 持久化缓存文件
+            self.tmdb.cache_path = os.path.join(Config().get_config_path(), "tmdb_response.db")
             # APIKEY
             self.tmdb.api_key = app.get('rmt_tmdbkey')
             # 语种
@@ -582,6 +591,18 @@ class Media:
             return None
         # 设置语言
         self.__set_language(language)
+        return self._single_flight.do(("tmdb_info", mtype, str(tmdbid), self.tmdb.language,
+                                       append_to_response, chinese),
+                                      self.__get_tmdb_info,
+                                      mtype=mtype,
+                                      tmdbid=tmdbid,
+                                      append_to_response=append_to_response,
+                                      chinese=chinese)
+
+    def __get_tmdb_info(self, mtype, tmdbid, append_to_response=None, chinese=True):
+        """
+        查询TMDB详情并转换类型、中文标题
+        """
         if mtype == MediaType.MOVIE:
             tmdb_info = self.__get_tmdb_movie_detail(tmdbid, append_to_response)
             if tmdb_info:
@@ -737,16 +758,135 @@ class Media:
         # 设置语言
         self.__set_language(language)
         # 识别
-        meta_info = MetaInfo(title, subtitle=subtitle)
+        meta_info = self.__parse_media_meta(title=title, subtitle=subtitle, mtype=mtype)
+        if not meta_info:
+            return None
+        file_media_info = self.__search_media_info(meta_info=meta_info,
+                                                   title=title,
+                                                   cache=cache,
+                                                   strict=strict,
+                                                   chinese=chinese,
+                                                   append_to_response=append_to_response)
+        # 赋值TMDB信息并返回
+        meta_info.set_tmdb_info(file_media_info)
+        return meta_info
+
+    def get_media_infos(self, titles,
+                        mtype=None,
+                        strict=None,
+                        cache=True,
+                        language=None,
+                        chinese=True,
+                        append_to_response=None,
+                        meta_infos=None):
+        """
+        批量识别名称，按缓存KEY分组，相同KEY只查询一次TMDB，不同KEY并发查询
+        :param titles: 种子名称列表，元素为名称或(名称, 副标题)
+        :param mtype: 类型：电影、电视剧、动漫
+        :param strict: 是否严格模式，为true时，不会再去掉年份再查一次
+        :param cache: 是否使用缓存，默认TRUE
+        :param language: 语言
+        :param chinese: 原标题为英文时是否从别名中搜索中文名称
+        :param append_to_response: 额外查询的信息
+        :param meta_infos: 与titles一一对应的已识别的MetaInfo，传入时不再重复识别名称
+        :return: 与titles顺序一一对应的MetaInfo列表，无法识别的为None
+        """
+        if not titles:
+            return []
+        if not self.tmdb:
+            log.error("【Meta】TMDB API Key 未设置！")
+            return [None] * len(titles)
+        # 设置语言
+        self.__set_language(language)
+        # 识别并按缓存KEY分组
+        parsed_metas = meta_infos or [None] * len(titles)
+        meta_infos = []
+        media_groups = {}
+        for item, parsed_meta in zip(titles, parsed_metas):
+            title, subtitle = item if isinstance(item, (tuple, list)) else (item, None)
+            meta_info = self.__parse_media_meta(title=title,
+                                                subtitle=subtitle,
+                                                mtype=mtype,
+                                                meta_info=parsed_meta) if title else None
+            meta_infos.append(meta_info)
+            if meta_info:
+                media_groups.setdefault(self.__make_cache_key(meta_info), []).append((title, meta_info))
+        if not media_groups:
+            return meta_infos
+        log.debug(f"【Meta】批量识别 {len(titles)} 个名称，需查询 {len(media_groups)} 个媒体")
+        # 每组只查询一次，结果赋值给组内所有名称
+        with ThreadPoolExecutor(max_workers=min(TMDB_MAX_WORKERS, len(media_groups)),
+                                thread_name_prefix="MediaRecognize") as executor:
+            futures = {executor.submit(self.__search_media_info,
+                                       meta_info=group[0][1],
+                                       title=group[0][0],
+                                       cache=cache,
+                                       strict=strict,
+                                       chinese=chinese,
+                                       append_to_response=append_to_response): group
+                       for group in media_groups.values()}
+            for future in as_completed(futures):
+                try:
+                    file_media_info = future.result()
+                except Exception as err:
+                    ExceptionUtils.exception_traceback(err)
+                    file_media_info = None
+                for _, meta_info in futures[future]:
+                    meta_info.set_tmdb_info(file_media_info)
+        return meta_infos
+
+    @staticmethod
+    def __parse_media_meta(title, subtitle=None, mtype=None, meta_info=None):
+        """
+        识别名称，返回用于查询TMDB的MetaInfo，无法识别时返回None
+        """
+        if not meta_info:
+            meta_info = MetaInfo(title, subtitle=subtitle)
         if not meta_info.get_name() or not meta_info.type:
             log.warn("【Rmt】%s 未识别出有效信息！" % meta_info.org_string)
             return None
         if mtype:
             meta_info.type = mtype
+        return meta_info
+
+    def __search_media_info(self, meta_info, title, cache=True, strict=None, chinese=True, append_to_response=None,
+                            file_path=None):
+        """
+        按缓存KEY查询缓存或TMDB，返回TMDB信息，相同KEY的并发查询只执行一次
+        :param file_path: 识别文件时传入文件路径，按文件识别的规则查询TMDB
+        """
         media_key = self.__make_cache_key(meta_info)
+        return self._single_flight.do(("media_info", media_key, cache, strict, chinese, append_to_response,
+                                       self.tmdb.language, file_path is not None),
+                                      self.__do_search_media_info,
+                                      meta_info=meta_info,
+                                      title=title,
+                                      media_key=media_key,
+                                      cache=cache,
+                                      strict=strict,
+                                      chinese=chinese,
+                                      append_to_response=append_to_response,
+                                      file_path=file_path)
+
+    def __do_search_media_info(self, meta_info, title, media_key, cache=True, strict=None, chinese=True,
+                               append_to_response=None, file_path=None):
+        """
+        按缓存KEY查询缓存或TMDB，返回TMDB信息
+        """
         if not cache or not self.meta.get_meta_data_by_key(media_key):
             # 缓存没有或者强制不使用缓存
-            if meta_info.type != MediaType.TV and not meta_info.year:
+            if file_path:
+                # 识别文件：按类型和年份查询
+                file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                                     first_media_year=meta_info.year,
+                                                     search_type=meta_info.type,
+                                                     media_year=meta_info.year,
+                                                     season_number=meta_info.begin_season)
+                if not file_media_info and self._rmt_match_mode == MatchMode.NORMAL:
+                    # 去掉年份再查一次，有可能是年份错误
+                    file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                                         search_type=meta_info.type)
+            elif meta_info.type != MediaType.TV and not meta_info.year:
                 file_media_info = self.__search_multi_tmdb(file_media_name=meta_info.get_name())
             else:
                 if meta_info.type == MediaType.TV:
@@ -777,13 +917,13 @@ class Media:
                     if not file_media_info and self._rmt_match_mode == MatchMode.NORMAL and not strict:
                         # 非严格模式下去掉年份和类型再查一次
                         file_media_info = self.__search_multi_tmdb(file_media_name=meta_info.get_name())
-            if not file_media_info and self._search_tmdbweb:
+            if not file_media_info and self._search_tmdbweb and not file_path:
                 # 从网站查询
                 file_media_info = self.__search_tmdb_web(file_media_name=meta_info.get_name(),
                                                          mtype=meta_info.type)
             if not file_media_info and self._chatgpt_enable:
                 # 通过ChatGPT查询
-                mtype, seaons, episodes, file_media_info = self.__search_chatgpt(file_name=title,
+                mtype, seaons, episodes, file_media_info = self.__search_chatgpt(file_name=file_path or title,
                                                                                  mtype=meta_info.type)
                 # 修正类型和集数
                 meta_info.type = mtype
@@ -824,9 +964,14 @@ class Media:
                                                      append_to_response=append_to_response)
             else:
                 file_media_info = None
-        # 赋值TMDB信息并返回
-        meta_info.set_tmdb_info(file_media_info)
-        return meta_info
+        return file_media_info
+
+    @classmethod
+    def get_lookup_stats(cls):
+        """
+        获取TMDB查询合并统计：实际执行次数、被合并的调用次数
+        """
+        return cls._single_flight.get_stats()
 
     def __insert_media_cache(self, media_key, file_media_info):
         """
@@ -887,7 +1032,9 @@ class Media:
         # 不是list的转为list
         if not isinstance(file_list, list):
             file_list = [file_list]
-        # 遍历每个文件，看得出来的名称是不是不一样，不一样的先搜索媒体信息
+        # 第一步：解析所有文件名称，自带TMDB信息的直接赋值
+        file_metas = []
+        parent_infos = {}
         for file_path in file_list:
             try:
                 if not os.path.exists(file_path):
@@ -896,8 +1043,6 @@ class Media:
                 # 解析媒体名称
                 # 先用自己的名称
                 file_name = os.path.basename(file_path)
-                parent_name = os.path.basename(os.path.dirname(file_path))
-                parent_parent_name = os.path.basename(PathUtils.get_parent_paths(file_path, 2))
                 # 过滤掉蓝光原盘目录下的子文件
                 if not os.path.isdir(file_path) \
                         and PathUtils.get_bluray_dir(file_path):
@@ -909,15 +1054,7 @@ class Media:
                     meta_info = MetaInfo(title=file_name, filePath=file_path)
                     # 识别不到则使用上级的名称
                     if not meta_info.get_name() or not meta_info.year:
-                        parent_info = MetaInfo(parent_name)
-                        if not parent_info.get_name() or not parent_info.year:
-                            parent_parent_info = MetaInfo(parent_parent_name)
-                            parent_info.type = parent_parent_info.type if parent_parent_info.type and parent_info.type != MediaType.TV else parent_info.type
-                            parent_info.cn_name = parent_parent_info.cn_name if parent_parent_info.cn_name else parent_info.cn_name
-                            parent_info.en_name = parent_parent_info.en_name if parent_parent_info.en_name else parent_info.en_name
-                            parent_info.year = parent_parent_info.year if parent_parent_info.year else parent_info.year
-                            parent_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
-                                                                           parent_parent_info.begin_season)
+                        parent_info = self.__get_parent_meta_info(file_path, parent_infos)
                         if not meta_info.get_name():
                             meta_info.cn_name = parent_info.cn_name
                             meta_info.en_name = parent_info.en_name
@@ -932,66 +1069,6 @@ class Media:
                     if not meta_info.get_name() or not meta_info.type:
                         log.warn("【Rmt】%s 未识别出有效信息！" % meta_info.org_string)
                         continue
-                    # 区配缓存及TMDB
-                    media_key = self.__make_cache_key(meta_info)
-                    if not self.meta.get_meta_data_by_key(media_key):
-                        # 没有缓存数据
-                        file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                             first_media_year=meta_info.year,
-                                                             search_type=meta_info.type,
-                                                             media_year=meta_info.year,
-                                                             season_number=meta_info.begin_season)
-                        if not file_media_info:
-                            if self._rmt_match_mode == MatchMode.NORMAL:
-                                # 去掉年份再查一次，有可能是年份错误
-                                file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                                     search_type=meta_info.type)
-                        if not file_media_info and self._chatgpt_enable:
-                            # 从ChatGPT查询
-                            mtype, seaons, episodes, file_media_info = self.__search_chatgpt(file_name=file_path,
-                                                                                             mtype=meta_info.type)
-                            # 修正类型和集数
-                            meta_info.type = mtype
-                            if not meta_info.get_season_string():
-                                meta_info.set_season(seaons)
-                            if not meta_info.get_episode_string():
-                                meta_info.set_episode(episodes)
-                        if not file_media_info and self._search_keyword:
-                            cache_name = cacheman["tmdb_supply"].get(meta_info.get_name())
-                            is_movie = False
-                            if not cache_name:
-                                cache_name, is_movie = self.__search_engine(meta_info.get_name())
-                                cacheman["tmdb_supply"].set(meta_info.get_name(), cache_name)
-                            if cache_name:
-                                log.info("【Meta】开始辅助查询：%s ..." % cache_name)
-                                if is_movie:
-                                    file_media_info = self.__search_tmdb(file_media_name=cache_name,
-                                                                         search_type=MediaType.MOVIE)
-                                else:
-                                    file_media_info = self.__search_multi_tmdb(file_media_name=cache_name)
-                        # 补全TMDB信息
-                        if file_media_info and not file_media_info.get("genres"):
-                            file_media_info = self.get_tmdb_info(mtype=file_media_info.get("media_type"),
-                                                                 tmdbid=file_media_info.get("id"),
-                                                                 chinese=chinese,
-                                                                 append_to_response=append_to_response)
-                        # 保存到缓存
-                        if file_media_info is not None:
-                            self.__insert_media_cache(media_key=media_key,
-                                                      file_media_info=file_media_info)
-                    else:
-                        # 使用缓存信息
-                        cache_info = self.meta.get_meta_data_by_key(media_key)
-                        if cache_info.get("id"):
-                            file_media_info = self.get_tmdb_info(mtype=cache_info.get("type"),
-                                                                 tmdbid=cache_info.get("id"),
-                                                                 chinese=chinese,
-                                                                 append_to_response=append_to_response)
-                        else:
-                            # 缓存为未识别
-                            file_media_info = None
-                    # 赋值TMDB信息
-                    meta_info.set_tmdb_info(file_media_info)
                 # 自带TMDB信息
                 else:
                     meta_info = MetaInfo(title=file_name, mtype=media_type, filePath=file_path)
@@ -1007,14 +1084,69 @@ class Media:
                             meta_info.end_episode = end_ep
                     # 加入缓存
                     self.save_rename_cache(file_name, tmdb_info)
-                # 按文件路程存储
-                return_media_infos[file_path] = meta_info
+                file_metas.append((file_path, meta_info))
             except Exception as err:
                 print(str(err))
                 log.error("【Rmt】发生错误：%s - %s" % (str(err), traceback.format_exc()))
-        # 循环结束
+        if tmdb_info:
+            return dict(file_metas)
+        # 第二步：按缓存KEY分组
+        media_groups = {}
+        for file_path, meta_info in file_metas:
+            media_groups.setdefault(self.__make_cache_key(meta_info), []).append((file_path, meta_info))
+        # 第三步：并发查询各组的TMDB信息，每组只查询一次
+        if media_groups:
+            with ThreadPoolExecutor(max_workers=min(TMDB_MAX_WORKERS, len(media_groups)),
+                                    thread_name_prefix="MediaRecognize") as executor:
+                futures = {executor.submit(self.__search_media_info,
+                                           meta_info=group[0][1],
+                                           title=os.path.basename(group[0][0]),
+                                           chinese=chinese,
+                                           append_to_response=append_to_response,
+                                           file_path=group[0][0]): group
+                           for group in media_groups.values()}
+                # 第四步：赋值TMDB信息，查询出错的组不返回
+                failed_paths = set()
+                for future in as_completed(futures):
+                    try:
+                        file_media_info = future.result()
+                    except Exception as err:
+                        log.error("【Rmt】发生错误：%s - %s" % (str(err), traceback.format_exc()))
+                        failed_paths.update(file_path for file_path, _ in futures[future])
+                        continue
+                    for _, meta_info in futures[future]:
+                        meta_info.set_tmdb_info(file_media_info)
+                file_metas = [(file_path, meta_info) for file_path, meta_info in file_metas
+                              if file_path not in failed_paths]
+        # 按文件路径存储，保持文件清单顺序
+        for file_path, meta_info in file_metas:
+            return_media_infos[file_path] = meta_info
         return return_media_infos
 
+    @staticmethod
+    def __get_parent_meta_info(file_path, parent_infos):
+        """
+        识别文件上级及上上级目录的名称并合并，相同目录只识别一次
+        :param file_path: 文件路径
+        :param parent_infos: 已识别的目录信息
+        """
+        parent_path = os.path.dirname(file_path)
+        if parent_path in parent_infos:
+            return parent_infos[parent_path]
+        parent_name = os.path.basename(parent_path)
+        parent_parent_name = os.path.basename(PathUtils.get_parent_paths(file_path, 2))
+        parent_info = MetaInfo(parent_name)
+        if not parent_info.get_name() or not parent_info.year:
+            parent_parent_info = MetaInfo(parent_parent_name)
+            parent_info.type = parent_parent_info.type if parent_parent_info.type and parent_info.type != MediaType.TV else parent_info.type
+            parent_info.cn_name = parent_parent_info.cn_name if parent_parent_info.cn_name else parent_info.cn_name
+            parent_info.en_name = parent_parent_info.en_name if parent_parent_info.en_name else parent_info.en_name
+            parent_info.year = parent_parent_info.year if parent_parent_info.year else parent_info.year
+            parent_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
+                                                           parent_parent_info.begin_season)
+        parent_infos[parent_path] = parent_info
+        return parent_info
+
     def __dict_tmdbpersons(self, infos, chinese=True):
         """
         TMDB人员信息转为字典
@@ -1,3 +1,5 @@
+import copy
+
 import regex as re
 import cn2an
 from app.media.fanart import Fanart
@@ -11,141 +13,147 @@ class MetaBase(object):
     """
     媒体信息基类
     """
-    proxies = None
-    category_handler = None
-    # 是否处理的文件
-    fileflag = False
-    # 需要处理的文件路径，如果有
-    filePath = None
-    # 原字符串
-    org_string = None
-    # 识别词处理后字符串
-    rev_string = None
-    # 副标题
-    subtitle = None
-    # 类型 电影、电视剧
-    type = None
-    # 识别的中文名
-    cn_name = None
-    # 识别的英文名
-    en_name = None
-    # 总季数
-    total_seasons = 0
-    # 识别的开始季 数字
-    begin_season = None
-    # 识别的结束季 数字
-    end_season = None
-    # 总集数
-    total_episodes = 0
-    # 识别的开始集
-    begin_episode = None
-    # 识别的结束集
-    end_episode = None
-    # Partx Cd Dvd Disk Disc
-    part = None
-    # 识别的资源类型
-    resource_type = None
-    # 识别的效果
-    resource_effect = None
-    # 识别的分辨率
-    resource_pix = None
-    # 识别的制作组/字幕组
-    resource_team = None
-    # 自定义占位符
-    customization = None
-    # 视频编码
-    video_encode = None
-    # 音频编码
-    audio_encode = None
-    # 二级分类
-    category = ""
-    # TMDB ID
-    tmdb_id = 0
-    # IMDB ID
-    imdb_id = ""
-    # TVDB ID
-    tvdb_id = 0
-    # 豆瓣 ID
-    douban_id = 0
-    # 自定义搜索词
-    keyword = None
-    # 媒体标题
-    title = None
-    # 媒体原语种
-    original_language = None
-    # 媒体原发行标题
-    original_title = None
-    # 媒体发行日期
-    release_date = None
-    # 媒体发行流媒体
-    networks = None
-    # 播放时长
-    runtime = 0
-    # 媒体年份
-    year = None
-    # 封面图片
-    backdrop_path = None
-    poster_path = None
-    fanart_backdrop = None
-    fanart_poster = None
-    # 评分
-    vote_average = 0
-    # 描述
-    overview = None
-    # TMDB 的其它信息
-    tmdb_info = {}
-    # 本地状态 1-已订阅 2-已存在
-    fav = "0"
-    # 站点列表
-    rss_sites = []
-    search_sites = []
-    # 种子附加信息
-    # 站点名称
-    site = None
-    # 站点优先级
-    site_order = 0
-    # 操作用户
-    user_name = None
-    # 种子链接
-    enclosure = None
-    # 资源优先级
-    res_order = 0
-    # 使用的过滤规则
-    filter_rule = None
-    # 是否洗版
-    over_edition = None
-    # 种子大小
-    size = 0
-    # 做种者
-    seeders = 0
-    # 下载者
-    peers = 0
-    # 种子描述
-    description = None
-    # 详情页面
-    page_url = None
-    # 上传因子
-    upload_volume_factor = None
-    # 下载因子
-    download_volume_factor = None
-    # HR
-    hit_and_run = None
-    # 种子标签
-    labels = None
-    # 订阅ID
-    rssid = None
-    # 保存目录
-    save_path = None
-    # 下载设置
-    download_setting = None
-    # 识别辅助
-    ignored_words = None
-    replaced_words = None
-    offset_words = None
-    # 备注字典
-    note = {}
-    # 副标题解析
-    _subtitle_flag = False
+    # 实例属性及默认值：实例数据只保存在__slots__中，不创建__dict__，
+    # 可变默认值（如tmdb_info字典）不预先创建，在首次访问时才创建
+    _defaults = {
+        # 是否处理的文件
+        "fileflag": False,
+        # 需要处理的文件路径，如果有
+        "filePath": None,
+        # 指定的媒体类型
+        "media_type": None,
+        # 原字符串
+        "org_string": None,
+        # 识别词处理后字符串
+        "rev_string": None,
+        # 副标题
+        "subtitle": None,
+        # 类型 电影、电视剧
+        "type": None,
+        # 识别的中文名
+        "cn_name": None,
+        # 识别的英文名
+        "en_name": None,
+        # 总季数
+        "total_seasons": 0,
+        # 识别的开始季 数字
+        "begin_season": None,
+        # 识别的结束季 数字
+        "end_season": None,
+        # 总集数
+        "total_episodes": 0,
+        # 识别的开始集
+        "begin_episode": None,
+        # 识别的结束集
+        "end_episode": None,
+        # Partx Cd Dvd Disk Disc
+        "part": None,
+        # 识别的资源类型
+        "resource_type": None,
+        # 识别的效果
+        "resource_effect": None,
+        # 识别的分辨率
+        "resource_pix": None,
+        # 识别的制作组/字幕组
+        "resource_team": None,
+        # 自定义占位符
+        "customization": None,
+        # 视频编码
+        "video_encode": None,
+        # 音频编码
+        "audio_encode": None,
+        # 二级分类
+        "category": "",
+        # TMDB ID
+        "tmdb_id": 0,
+        # IMDB ID
+        "imdb_id": "",
+        # TVDB ID
+        "tvdb_id": 0,
+        # 豆瓣 ID
+        "douban_id": 0,
+        # 自定义搜索词
+        "keyword": None,
+        # 媒体标题
+        "title": None,
+        # 媒体原语种
+        "original_language": None,
+        # 媒体原发行标题
+        "original_title": None,
+        # 媒体发行日期
+        "release_date": None,
+        # 媒体发行流媒体
+        "networks": None,
+        # 播放时长
+        "runtime": 0,
+        # 媒体年份
+        "year": None,
+        # 封面图片
+        "backdrop_path": None,
+        "poster_path": None,
+        "fanart_backdrop": None,
+        "fanart_poster": None,
+        # 评分
+        "vote_average": 0,
+        # 描述
+        "overview": None,
+        # TMDB 的其它信息
+        "tmdb_info": {},
+        # 本地状态 1-已订阅 2-已存在
+        "fav": "0",
+        # 站点列表
+        "rss_sites": [],
+        "search_sites": [],
+        # 种子附加信息
+        # 站点名称
+        "site": None,
+        # 站点优先级
+        "site_order": 0,
+        # 操作用户
+        "user_name": None,
+        # 种子链接
+        "enclosure": None,
+        # 资源优先级
+        "res_order": 0,
+        # 使用的过滤规则
+        "filter_rule": None,
+        # 是否洗版
+        "over_edition": None,
+        # 种子大小
+        "size": 0,
+        # 做种者
+        "seeders": 0,
+        # 下载者
+        "peers": 0,
+        # 种子描述
+        "description": None,
+        # 详情页面
+        "page_url": None,
+        # 上传因子
+        "upload_volume_factor": None,
+        # 下载因子
+        "download_volume_factor": None,
+        # HR
+        "hit_and_run": None,
+        # 种子标签
+        "labels": None,
+        # 订阅ID
+        "rssid": None,
+        # 保存目录
+        "save_path": None,
+        # 下载设置
+        "download_setting": None,
+        # 识别辅助
+        "ignored_words": None,
+        "replaced_words": None,
+        "offset_words": None,
+        # 备注字典
+        "note": {},
+        # 副标题解析
+        "_subtitle_flag": False
+    }
+    __slots__ = tuple(_defaults) + ("_fanart",)
+    _eager_defaults = ()
     _subtitle_season_re = r"(?<![全共]\s*)[第\s]+([0-9一二三四五六七八九十S\-]+)\s*季(?!\s*[全共])"
     _subtitle_season_all_re = r"[全共]\s*([0-9一二三四五六七八九十]+)\s*季|([0-9一二三四五六七八九十]+)\s*季\s*全"
     _subtitle_episode_re = r"(?<![全共]\s*)[第\s]+([0-9一二三四五六七八九十百零EP\-]+)\s*[集话話期](?!\s*[全共])"
@@ -161,8 +169,8 @@ class MetaBase(object):
                  en_name=None,
                  tmdb_id=None,
                  imdb_id=None):
-        self.category_handler = Category()
-        self.fanart = Fanart()
+        for name, value in self._eager_defaults:
+            setattr(self, name, value)
         if not title:
             return
         self.org_string = title
@@ -175,6 +183,52 @@ class MetaBase(object):
         self.tmdb_id = tmdb_id
         self.imdb_id = imdb_id
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 不可变的默认值在初始化时直接赋值，避免识别过程中频繁进入__getattr__
+        cls._eager_defaults = tuple((name, value) for name, value in cls._defaults.items()
+                                    if not isinstance(value, (list, dict)))
+
+    def __getattr__(self, name):
+        """
+        未赋值的属性返回默认值
+        """
+        try:
+            value = self._defaults[name]
+        except KeyError:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+        if isinstance(value, (list, dict)):
+            value = value.copy()
+            setattr(self, name, value)
+        return value
+
+    @property
+    def category_handler(self):
+        return Category()
+
+    @property
+    def fanart(self):
+        try:
+            return self._fanart
+        except AttributeError:
+            self._fanart = Fanart()
+            return self._fanart
+
+    def clone(self):
+        """
+        复制识别结果，列表、字典等可变属性一并复制，修改副本不影响原对象
+        """
+        meta_info = object.__new__(type(self))
+        for name in self._defaults:
+            try:
+                value = object.__getattribute__(self, name)
+            except AttributeError:
+                continue
+            if isinstance(value, (list, dict, set)):
+                value = value.copy()
+            object.__setattr__(meta_info, name, value)
+        return meta_info
+
     def get_name(self):
         if self.cn_name and StringUtils.is_all_chinese(self.cn_name):
             return self.cn_name
@@ -9,10 +9,14 @@ class CustomizationMatcher(object):
     """
     customization = None
     custom_separator = None
+    __customization_re = None
+    # 自定义配置版本，每次更新后递增
+    version = 0
 
     def __init__(self):
         self.customization = None
         self.custom_separator = None
+        self.__customization_re = None
 
     def match(self, title=None):
         """
@@ -21,12 +25,11 @@ class CustomizationMatcher(object):
         """
         if not title:
             return ""
-        if not self.customization:
+        if not self.customization or not self.__customization_re:
             return ""
-        customization_re = re.compile(r"%s" % self.customization)
         # 处理重复多次的情况，保留先后顺序（按添加自定义占位符的顺序）
         unique_customization = {}
-        for item in re.findall(customization_re, title):
+        for item in re.findall(self.__customization_re, title):
             if not isinstance(item, tuple):
                 item = (item,)
             for i in range(len(item)):
@@ -42,3 +45,5 @@ class CustomizationMatcher(object):
         """
         self.customization = customization
         self.custom_separator = separator
+        self.version += 1
+        self.__customization_re = re.compile(r"%s" % customization) if customization else None
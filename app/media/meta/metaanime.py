@@ -14,6 +14,11 @@ class MetaAnime(MetaBase):
     """
     识别动漫
     """
+    _parse_defaults = {
+        "_name": None
+    }
+    _defaults = dict(MetaBase._defaults, **_parse_defaults)
+    __slots__ = tuple(_parse_defaults)
     _anime_no_words = ['CHS&CHT', 'MP4', 'GB MP4', 'WEB-DL', 'AT-X', 'ADN', 'HDRip']
     _name_nostring_re = r"S\d{2}\s*-\s*S\d{2}|S\d{2}|\s+S\d{1,2}|EP?\d{2,4}\s*-\s*EP?\d{2,4}|EP?\d{2,4}|\s+EP?\d{1,4}"
 
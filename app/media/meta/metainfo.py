@@ -1,16 +1,47 @@
 import os.path
+from threading import Lock
+
 import regex as re
 
 import log
 from app.helper import WordsHelper
+from app.media.meta.customization import CustomizationMatcher
 from app.media.meta.metaanime import MetaAnime
 from app.media.meta.metavideo import MetaVideo
 from app.media.meta.metavideov2 import MetaVideoV2
+from app.media.meta.release_groups import ReleaseGroupsMatcher
 from app.utils.types import MediaType
-from app.utils import StringUtils
+from app.utils import StringUtils, MetaInfoCache
 from config import Config, RMT_MEDIAEXT
 from app.helper import FfmpegHelper
 
+
+class MetaInfoConfig(object):
+    """
+    识别用到的配置快照，配置重新加载或保存时刷新，避免每次识别都读取配置
+    """
+    # 是否使用ffmpeg获取视频元数据
+    ffmpeg_video_meta_enable = False
+    # 是否使用增强识别V2
+    recognize_enhance_enable = False
+
+    @classmethod
+    def refresh(cls):
+        media = Config().get_config('media')
+        cls.ffmpeg_video_meta_enable = (media.get('ffmpeg_video_meta', False) or False) if media else False
+        laboratory = Config().get_config('laboratory')
+        cls.recognize_enhance_enable = (laboratory.get('recognize_enhance_enable', False) or False) \
+            if laboratory else False
+
+
+MetaInfoConfig.refresh()
+Config().add_config_listener(MetaInfoConfig.refresh)
+
+# 识别结果缓存命中统计
+_cache_stats = {"hit": 0, "miss": 0}
+_cache_stats_lock = Lock()
+
+
 def MetaInfo(title,
              subtitle=None,
              mtype=None,
@@ -27,20 +58,54 @@ def MetaInfo(title,
     :param mtype: 指定识别类型，为空则自动识别类型
     :return: MetaAnime、MetaVideo
     """
+    # 使用ffmpeg补充文件信息时，结果与文件内容相关，不缓存
+    if filePath and MetaInfoConfig.ffmpeg_video_meta_enable:
+        return __parse_meta_info(title, subtitle, mtype, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id)
+    # 识别结果只与输入和识别词、制作组、占位符配置相关，配置变化后版本号改变，旧缓存不再命中
+    cache_key = (title, subtitle, mtype, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id,
+                 WordsHelper().version,
+                 ReleaseGroupsMatcher().version,
+                 CustomizationMatcher().version,
+                 MetaInfoConfig.recognize_enhance_enable)
+    meta_info = MetaInfoCache.get(cache_key)
+    with _cache_stats_lock:
+        _cache_stats["hit" if meta_info else "miss"] += 1
+    if not meta_info:
+        meta_info = __parse_meta_info(title, subtitle, mtype, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id)
+        MetaInfoCache.set(cache_key, meta_info)
+    # 缓存中保存的对象不直接返回，调用方修改副本不影响缓存
+    return meta_info.clone()
 
-    # 使用ffmpeg获取视频元数据状态
-    media = Config().get_config('media')
-    ffmpeg_video_meta_enable = False
-    if media:
-        ffmpeg_video_meta_enable = media.get('ffmpeg_video_meta', False) or False
+
+def get_meta_cache_stats():
+    """
+    获取识别结果缓存统计：容量、条目数、命中、未命中、命中率
+    """
+    with _cache_stats_lock:
+        hit, miss = _cache_stats["hit"], _cache_stats["miss"]
+    total = hit + miss
+    return {
+        "capacity": MetaInfoCache.maxsize,
+        "size": MetaInfoCache.size(),
+        "hit": hit,
+        "miss": miss,
+        "hit_rate": round(hit * 100 / total, 1) if total else 0
+    }
+
+
+def __parse_meta_info(title, subtitle, mtype, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id):
+    """
+    识别名称，返回MetaAnime、MetaVideo对象
+    """
     # 记录原始名称
     org_title = title
     # 应用自定义识别词，获取识别词处理后名称
-    rev_title, msg, used_info = WordsHelper().process(title)
-    if rev_title and ffmpeg_video_meta_enable and filePath:
+    words_helper = WordsHelper()
+    rev_title, msg, used_info = words_helper.process(title)
+    if rev_title and MetaInfoConfig.ffmpeg_video_meta_enable and filePath:
         rev_title = __complete_rev_title(rev_title, filePath)
     if subtitle:
-        subtitle, _, _ = WordsHelper().process(subtitle)
+        subtitle, _, _ = words_helper.process(subtitle)
 
     if msg:
         for msg_item in msg:
@@ -52,12 +117,7 @@ def MetaInfo(title,
     else:
         fileflag = False
 
-    laboratory = Config().get_config('laboratory')
-    recognize_enhance_enable = False
-    if laboratory:
-        recognize_enhance_enable = laboratory.get('recognize_enhance_enable', False) or False
-
-    if recognize_enhance_enable:
+    if MetaInfoConfig.recognize_enhance_enable:
          meta_info = MetaVideoV2(rev_title, subtitle, fileflag, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id)
     else:
         if mtype == MediaType.ANIME or is_anime(rev_title):
@@ -15,14 +15,19 @@ class MetaVideo(MetaBase):
     识别电影、电视剧
     """
     # 控制标位区
-    _stop_name_flag = False
-    _stop_cnname_flag = False
-    _last_token = ""
-    _last_token_type = ""
-    _continue_flag = True
-    _unknown_name_str = ""
-    _source = ""
-    _effect = []
+    _parse_defaults = {
+        "_stop_name_flag": False,
+        "_stop_cnname_flag": False,
+        "_last_token": "",
+        "_last_token_type": "",
+        "_continue_flag": True,
+        "_unknown_name_str": "",
+        "_source": "",
+        "_effect": [],
+        "tokens": None
+    }
+    _defaults = dict(MetaBase._defaults, **_parse_defaults)
+    __slots__ = tuple(_parse_defaults)
     # 正则式区
     _season_re = r"S(\d{2})|^S(\d{1,2})$|S(\d{1,2})E"
     _episode_re = r"EP?(\d{2,4})$|^EP?(\d{1,4})$|^S\d{1,2}EP?(\d{1,4})$|S\d{2}EP?(\d{2,4})"
@@ -16,10 +16,16 @@ from app.utils.tokens import Tokens
         
 class MetaVideoV2(MetaBase):
 
-    _media_item_title = None
-    _media_item_subtitle = None
-    _original_title = None
-    _original_subtitle = None
+    _parse_defaults = {
+        "_media_item_title": None,
+        "_media_item_subtitle": None,
+        "_original_title": None,
+        "_original_subtitle": None,
+        # 版本
+        "edition": None
+    }
+    _defaults = dict(MetaBase._defaults, **_parse_defaults)
+    __slots__ = tuple(_parse_defaults)
 
     _name_no_begin_re = r"^\[.+?]"
     _name_nostring_re = r"^PTS|^JADE|^ViuTV|^AOD|^CHC|^[A-Z]{1,4}TV[\-0-9UVHDK]*" \
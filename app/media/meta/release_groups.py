@@ -8,8 +8,11 @@ class ReleaseGroupsMatcher(object):
     识别制作组、字幕组
     """
     __release_groups = None
+    __groups_re = None
     custom_release_groups = None
     custom_separator = None
+    # 自定义配置版本，每次更新后递增
+    version = 0
     RELEASE_GROUPS = {
         "0ff": ['FF(?:(?:A|WE)B|CD|E(?:DU|B)|TV)'],
         "1pt": [],
@@ -79,6 +82,11 @@ class ReleaseGroupsMatcher(object):
             for release_group in site_groups:
                 release_groups.append(release_group)
         self.__release_groups = '|'.join(release_groups)
+        self.__groups_re = self.__compile_groups(self.__release_groups)
+
+    @staticmethod
+    def __compile_groups(groups):
+        return re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
 
     def match(self, title=None, groups=None):
         """
@@ -88,13 +96,12 @@ class ReleaseGroupsMatcher(object):
         """
         if not title:
             return ""
-        if not groups:
-            if self.custom_release_groups:
-                groups = f"{self.__release_groups}|{self.custom_release_groups}"
-            else:
-                groups = self.__release_groups
+        if groups:
+            groups_re = self.__compile_groups(groups)
+        else:
+            # 使用预编译的内置+自定义制作组正则
+            groups_re = self.__groups_re
         title = f"{title} "
-        groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
         # 处理一个制作组识别多次的情况，保留顺序
         unique_groups = []
         for item in re.findall(groups_re, title):
@@ -109,3 +116,8 @@ class ReleaseGroupsMatcher(object):
         """
         self.custom_release_groups = release_groups
         self.custom_separator = separator
+        self.version += 1
+        if release_groups:
+            self.__groups_re = self.__compile_groups(f"{self.__release_groups}|{release_groups}")
+        else:
+            self.__groups_re = self.__compile_groups(self.__release_groups)
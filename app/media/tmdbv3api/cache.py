@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class TMDbCache(object):
+    """
+    TMDB接口响应的持久化缓存，按接口+参数+语言存储于SQLite，过期后在容忍期内先返回旧数据再后台刷新
+    """
+    # 各接口缓存时间（秒），按顺序匹配接口路径
+    ENDPOINT_TTLS = [
+        (re.compile(r"^/(trending|discover)/"), 3600),
+        (re.compile(r"^/(movie|tv)/(popular|top_rated|now_playing|upcoming|on_the_air|airing_today)$"), 3600),
+        (re.compile(r"^/search/"), 24 * 3600),
+        (re.compile(r"^/tv/\d+/season/"), 24 * 3600),
+        (re.compile(r"^/genre/"), 30 * 24 * 3600),
+        (re.compile(r"^/(movie|tv|person|find)/"), 7 * 24 * 3600),
+    ]
+    DEFAULT_TTL = 24 * 3600
+    # 过期后仍可返回旧数据的时间（秒）
+    STALE_TTL = 7 * 24 * 3600
+    # 最大缓存条目数
+    MAX_ENTRIES = 50000
+    # 每写入多少条检查一次容量
+    TRIM_INTERVAL = 500
+
+    _instances = {}
+    _instances_lock = Lock()
+
+    def __init__(self, path, timer=None):
+        """
+        :param path: 缓存文件路径
+        :param timer: 返回当前时间戳（秒）的函数，默认time.time
+        """
+        self._path = path
+        self._timer = timer or time.time
+        self._lock = Lock()
+        self._refreshing = set()
+        self._writes = 0
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="TMDbCacheRefresh")
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS TMDB_RESPONSE ("
+                           "KEY TEXT PRIMARY KEY NOT NULL, "
+                           "ENDPOINT TEXT, "
+                           "RESPONSE TEXT, "
+                           "UPDATE_TIME INTEGER, "
+                           "EXPIRE_TIME INTEGER)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS INDX_TMDB_RESPONSE_UPDATE ON TMDB_RESPONSE (UPDATE_TIME)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS INDX_TMDB_RESPONSE_EXPIRE ON TMDB_RESPONSE (EXPIRE_TIME)")
+        self._conn.commit()
+
+    @classmethod
+    def instance(cls, path):
+        """
+        同一缓存文件共用一个实例
+        """
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    @staticmethod
+    def make_key(action, append_to_response, language, include_adult):
+        return "%s?%s&language=%s&include_adult=%s" % (action, append_to_response or "", language, include_adult)
+
+    @classmethod
+    def get_ttl(cls, action):
+        for pattern, ttl in cls.ENDPOINT_TTLS:
+            if pattern.search(action):
+                return ttl
+        return cls.DEFAULT_TTL
+
+    def get(self, key):
+        """
+        读取缓存
+        :return: 响应内容（不存在或已超过容忍期时为None）, 是否已过期需要刷新
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT RESPONSE, EXPIRE_TIME FROM TMDB_RESPONSE WHERE KEY = ?",
+                                     (key,)).fetchone()
+        if not row:
+            return None, False
+        now = int(self._timer())
+        if now >= row[1] + self.STALE_TTL:
+            return None, False
+        try:
+            return json.loads(row[0]), now >= row[1]
+        except ValueError:
+            return None, False
+
+    def set(self, key, action, response):
+        """
+        写入缓存，超出容量时淘汰最早写入的条目
+        """
+        now = int(self._timer())
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO TMDB_RESPONSE (KEY, ENDPOINT, RESPONSE, UPDATE_TIME, EXPIRE_TIME) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               (key, action, json.dumps(response), now, now + self.get_ttl(action)))
+            self._writes += 1
+            if self._writes % self.TRIM_INTERVAL == 0:
+                self._conn.execute("DELETE FROM TMDB_RESPONSE WHERE EXPIRE_TIME < ?", (now - self.STALE_TTL,))
+                self._conn.execute("DELETE FROM TMDB_RESPONSE WHERE KEY IN ("
+                                   "SELECT KEY FROM TMDB_RESPONSE ORDER BY UPDATE_TIME DESC LIMIT -1 OFFSET ?)",
+                                   (self.MAX_ENTRIES,))
+            self._conn.commit()
+
+    def revalidate(self, key, action, fetch):
+        """
+        后台刷新已过期的缓存，同一KEY同时只刷新一次
+        :param fetch: 请求函数，返回新的响应内容，失败时返回None
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _refresh():
+            try:
+                response = fetch()
+                if response is not None:
+                    self.set(key, action, response)
+            except Exception as err:
+                logger.warning("TMDB cache refresh failed: %s" % err)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(_refresh)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM TMDB_RESPONSE")
+            self._conn.commit()
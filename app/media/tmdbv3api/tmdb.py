@@ -9,6 +9,7 @@ import requests
 import requests.exceptions
 
 from .as_obj import AsObj
+from .cache import TMDbCache
 from .exceptions import TMDbException
 from app.utils.commons import ttl_lru
 
@@ -24,6 +25,7 @@ class TMDb(object):
     TMDB_PROXIES = "TMDB_PROXIES"
     TMDB_DOMAIN = "TMDB_DOMAIN"
     TMDB_INCLUDE_ADULT = "TMDB_INCLUDE_ADULT"
+    TMDB_CACHE_PATH = "TMDB_CACHE_PATH"
     REQUEST_CACHE_MAXSIZE = 512
 
     def __init__(self, obj_cached=True, session=None):
@@ -133,6 +135,20 @@ class TMDb(object):
     def cache(self, cache):
         os.environ[self.TMDB_CACHE_ENABLED] = str(cache)
 
+    @property
+    def cache_path(self):
+        return os.environ.get(self.TMDB_CACHE_PATH)
+
+    @cache_path.setter
+    def cache_path(self, cache_path):
+        os.environ[self.TMDB_CACHE_PATH] = str(cache_path or '')
+
+    @property
+    def response_cache(self):
+        if not self.cache_path:
+            return None
+        return TMDbCache.instance(self.cache_path)
+
     @staticmethod
     def _get_obj(result, key="results", all_details=False):
         if "success" in result and result["success"] is False:
@@ -153,8 +169,19 @@ class TMDb(object):
         return requests.request(method, url, data=data, proxies=eval(proxies), verify=False, timeout=10)
 
     def cache_clear(self):
+        if self.response_cache:
+            self.response_cache.clear()
         return self.cached_request.cache_clear()
 
+    def _request_json(self, url):
+        req = self._session.request("GET", url, proxies=eval(self.proxies), timeout=10, verify=False)
+        if req.status_code != 200:
+            return None
+        json = req.json()
+        if "errors" in json or json.get("success") is False:
+            return None
+        return json
+
     def _call(
             self, action, append_to_response, call_cached=True, method="GET", data=None
     ):
@@ -170,33 +197,51 @@ class TMDb(object):
             self.language,
         )
 
-        if self.cache and self.obj_cached and call_cached and method != "POST":
-            req = self.ttl_cached_request(method, url, data, self.proxies)
-        else:
-            req = self._session.request(method, url, data=data, proxies=eval(self.proxies), timeout=10, verify=False)
+        # 持久化缓存，过期后先返回旧数据并在后台刷新
+        response_cache = None
+        cache_key = None
+        json = None
+        if self.cache and self.obj_cached and call_cached and method == "GET":
+            response_cache = self.response_cache
+            if response_cache:
+                cache_key = TMDbCache.make_key(action, append_to_response, self.language, self.include_adult)
+                json, stale = response_cache.get(cache_key)
+                if json is not None and stale:
+                    response_cache.revalidate(cache_key, action, lambda: self._request_json(url))
+
+        if json is None:
+            if self.cache and self.obj_cached and call_cached and method != "POST" and not response_cache:
+                req = self.ttl_cached_request(method, url, data, self.proxies)
+            else:
+                req = self._session.request(method, url, data=data, proxies=eval(self.proxies), timeout=10,
+                                            verify=False)
 
-        headers = req.headers
+            headers = req.headers
 
-        if "X-RateLimit-Remaining" in headers:
-            self._remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Remaining" in headers:
+                self._remaining = int(headers["X-RateLimit-Remaining"])
 
-        if "X-RateLimit-Reset" in headers:
-            self._reset = int(headers["X-RateLimit-Reset"])
+            if "X-RateLimit-Reset" in headers:
+                self._reset = int(headers["X-RateLimit-Reset"])
 
-        if self._remaining < 1:
-            current_time = int(time.time())
-            sleep_time = self._reset - current_time
+            if self._remaining < 1:
+                current_time = int(time.time())
+                sleep_time = self._reset - current_time
 
-            if self.wait_on_rate_limit:
-                logger.warning("Rate limit reached. Sleeping for: %d" % sleep_time)
-                time.sleep(abs(sleep_time))
-                self._call(action, append_to_response, call_cached, method, data)
-            else:
-                raise TMDbException(
-                    "Rate limit reached. Try again in %d seconds." % sleep_time
-                )
+                if self.wait_on_rate_limit:
+                    logger.warning("Rate limit reached. Sleeping for: %d" % sleep_time)
+                    time.sleep(abs(sleep_time))
+                    self._call(action, append_to_response, call_cached, method, data)
+                else:
+                    raise TMDbException(
+                        "Rate limit reached. Try again in %d seconds." % sleep_time
+                    )
 
-        json = req.json()
+            json = req.json()
+
+            if response_cache and req.status_code == 200 \
+                    and "errors" not in json and json.get("success") is not False:
+                response_cache.set(cache_key, action, json)
 
         if "page" in json:
             os.environ["page"] = str(json["page"])
@@ -1,4 +1,6 @@
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 
 import log
@@ -10,7 +12,7 @@ from app.media.meta import MetaInfo
 from app.message import Message
 from app.sites import Sites, SiteConf
 from app.subscribe import Subscribe
-from app.utils import ExceptionUtils, Torrent
+from app.utils import ExceptionUtils, Torrent, StringUtils
 from app.utils.commons import singleton
 from app.utils.types import MediaType, SearchType
 
@@ -30,6 +32,11 @@ class Rss:
     subscribe = None
     message = None
 
+    # RSS下载并发数
+    _MAX_CONCURRENCY = 10
+    # 单个站点RSS下载超时时间（秒）
+    _RSS_TIMEOUT = 30
+
     def __init__(self):
         self.init_config()
 
@@ -41,6 +48,7 @@ class Rss:
         self.filter = Filter()
         self.dbhelper = DbHelper()
         self.rsshelper = RssHelper()
+        self.rsshelper.init_enclosure_filter()
         self.subscribe = Subscribe()
         self.message = Message()
 
@@ -100,20 +108,20 @@ class Rss:
             rss_download_torrents = []
             # 缺失的资源详情
             rss_no_exists = {}
+            # 订阅及过滤规则版本，变化时各站点RSS重新全量处理
+            feed_version = StringUtils.md5_hash(f"{rss_movies}{rss_tvs}{self.filter.get_rule_infos()}")
+            # 并发下载各站点RSS
+            rss_results = self.__fetch_rss_sites(rss_sites_info=rss_sites_info,
+                                                 check_sites=check_sites,
+                                                 feed_version=feed_version)
             # 遍历站点资源
-            for site_info in rss_sites_info:
-                if not site_info:
-                    continue
+            for site_info, rss_acticles, fetch_time in rss_results:
                 # 站点名称
                 site_name = site_info.get("name")
-                # 没有订阅的站点中的不搜索
-                if check_sites and site_name not in check_sites:
-                    continue
                 # 站点rss链接
                 rss_url = site_info.get("rssurl")
-                if not rss_url:
-                    log.info(f"【Rss】{site_name} 未配置rssurl，跳过...")
-                    continue
+                # 开始处理时间
+                start_time = time.time()
                 # 站点信息
                 site_id = site_info.get("id")
                 site_cookie = site_info.get("cookie")
@@ -125,13 +133,12 @@ class Rss:
                 site_proxy = site_info.get("proxy")
                 # 使用的规则
                 site_fliter_rule = site_info.get("rule")
-                # 开始下载RSS
+                # 开始处理RSS
                 log.info(f"【Rss】正在处理：{site_name}")
                 if site_info.get("pri"):
                     site_order = 100 - int(site_info.get("pri"))
                 else:
                     site_order = 0
-                rss_acticles = self.rsshelper.parse_rssxml(url=rss_url)
                 if rss_acticles is None:
                     # RSS链接过期
                     log.error(f"【Rss】站点 {site_name} RSS链接已过期，请重新获取！")
@@ -141,13 +148,20 @@ class Rss:
                                                         f"链接：{rss_url}")
                     continue
                 if not rss_acticles:
-                    log.warn(f"【Rss】{site_name} 未下载到数据")
+                    log.info(f"【Rss】{site_name} 没有新数据")
                     continue
                 else:
-                    log.info(f"【Rss】{site_name} 获取数据：{len(rss_acticles)}")
+                    log.info(f"【Rss】{site_name} 获取新数据：{len(rss_acticles)}")
+                # 需要下次重新处理的种子
+                retry_enclosures = set()
+                # 一次查询出已订阅过的种子
+                rssd_enclosures = self.rsshelper.get_rssd_enclosures(
+                    [article.get('enclosure') for article in rss_acticles])
+                # 批量识别未命中缓存的种子名称，相同媒体只查询一次TMDB
+                article_medias = self.__recognize_articles(rss_acticles, rssd_enclosures)
                 # 处理RSS结果
                 res_num = 0
-                for article in rss_acticles:
+                for article_index, article in enumerate(rss_acticles):
                     try:
                         # 种子名
                         title = article.get('title')
@@ -160,26 +174,33 @@ class Rss:
                         # 开始处理
                         log.info(f"【Rss】开始处理：{title}")
                         # 检查这个种子是不是下过了
-                        if self.rsshelper.is_rssd_by_enclosure(enclosure):
+                        if not enclosure or enclosure in rssd_enclosures:
                             log.info(f"【Rss】{title} 已成功订阅过")
                             continue
                         # 识别种子名称，开始搜索TMDB
-                        media_info = MetaInfo(title=title)
-                        cache_info = self.media.get_cache_info(media_info)
-                        if cache_info.get("id"):
+                        media_info, cache_info = article_medias[article_index]
+                        if cache_info is None:
+                            # 识别出错，下次重新处理
+                            retry_enclosures.add(enclosure)
+                            continue
+                        if cache_info:
                             # 使用缓存信息
                             media_info.tmdb_id = cache_info.get("id")
                             media_info.type = cache_info.get("type")
                             media_info.title = cache_info.get("title")
                             media_info.year = cache_info.get("year")
+                            if not media_info.tmdb_id:
+                                # 缓存为未识别，缓存过期后重新查询
+                                retry_enclosures.add(enclosure)
                         else:
-                            # 重新查询TMDB
-                            media_info = self.media.get_media_info(title=title)
+                            # 重新查询TMDB的结果
                             if not media_info:
                                 log.warn(f"【Rss】{title} 无法识别出媒体信息！")
                                 continue
                             elif not media_info.tmdb_info:
                                 log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
+                                # 可能是TMDB查询失败，下次重新处理
+                                retry_enclosures.add(enclosure)
                         # 大小及种子页面
                         media_info.set_torrent_info(size=size,
                                                     page_url=page_url,
@@ -203,6 +224,9 @@ class Rss:
 
                         # 未匹配
                         if not match_flag:
+                            # 已命中订阅但促销等种子详情不符合要求的，下次重新检查
+                            if site_parse and match_info:
+                                retry_enclosures.add(enclosure)
                             continue
 
                         # 非模糊匹配命中，检查本地情况，检查删除订阅
@@ -294,6 +318,7 @@ class Rss:
 
                         # 站点流控
                         if self.sites.check_ratelimit(site_id):
+                            retry_enclosures.add(enclosure)
                             continue
 
                         # 设置种子信息
@@ -308,20 +333,119 @@ class Rss:
                                                      save_path=match_info.get("save_path"))
                         # 插入数据库历史记录
                         self.rsshelper.insert_rss_torrents(media_info)
+                        rssd_enclosures.add(enclosure)
                         # 加入下载列表
                         if media_info not in rss_download_torrents:
                             rss_download_torrents.append(media_info)
                             res_num = res_num + 1
                     except Exception as e:
+                        retry_enclosures.add(article.get('enclosure'))
                         ExceptionUtils.exception_traceback(e)
                         log.error("【Rss】处理RSS发生错误：%s" % str(e))
                         continue
-                log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源" % (site_name, res_num))
+                # 登记已处理的种子，RSS无变化时不再重复识别
+                self.rsshelper.mark_feed_seen(feed_key=f"rss:{site_id}",
+                                              enclosures=[article.get('enclosure') for article in rss_acticles
+                                                          if article.get('enclosure') not in retry_enclosures])
+                log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源，耗时 %.2f 秒（下载 %.2f 秒）" % (
+                    site_name, res_num, fetch_time + time.time() - start_time, fetch_time))
             log.info("【Rss】所有RSS处理结束，共 %s 个有效资源" % len(rss_download_torrents))
             # 开始择优下载
             self.download_rss_torrent(rss_download_torrents=rss_download_torrents,
                                       rss_no_exists=rss_no_exists)
 
+    def __recognize_articles(self, rss_acticles, rssd_enclosures):
+        """
+        识别RSS种子名称，命中缓存的直接使用缓存，其余批量查询TMDB
+        :param rss_acticles: RSS种子列表
+        :param rssd_enclosures: 已订阅过的种子链接
+        :return: 与rss_acticles一一对应的(媒体信息, 缓存信息)列表，缓存信息为空时媒体信息为TMDB查询结果，
+                 识别出错时缓存信息为None
+        """
+        article_medias = [(None, {})] * len(rss_acticles)
+        recognize_metas = {}
+        for index, article in enumerate(rss_acticles):
+            enclosure = article.get('enclosure')
+            if not enclosure or enclosure in rssd_enclosures:
+                continue
+            # 单个种子识别出错时跳过该种子
+            try:
+                meta_info = MetaInfo(title=article.get('title'))
+                cache_info = self.media.get_cache_info(meta_info)
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error(f"【Rss】{article.get('title')} 识别出错：{str(e)}")
+                article_medias[index] = (None, None)
+                continue
+            if cache_info.get("id"):
+                article_medias[index] = (meta_info, cache_info)
+            else:
+                recognize_metas[index] = meta_info
+        if recognize_metas:
+            indexes = list(recognize_metas)
+            try:
+                # 已识别的名称直接传入，不再重复识别
+                media_infos = self.media.get_media_infos(
+                    titles=[rss_acticles[index].get('title') for index in indexes],
+                    meta_infos=[recognize_metas[index] for index in indexes])
+                cache_info = {}
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error(f"【Rss】批量识别媒体信息出错：{str(e)}")
+                media_infos = [None] * len(indexes)
+                cache_info = None
+            for index, media_info in zip(indexes, media_infos):
+                article_medias[index] = (media_info, cache_info)
+        return article_medias
+
+    def __fetch_rss_sites(self, rss_sites_info, check_sites, feed_version=None):
+        """
+        并发下载并解析各站点的RSS，单站点超时不影响其它站点，站点流控在下载种子前检查
+        :param rss_sites_info: 开启订阅的站点列表
+        :param check_sites: 有订阅的站点名称，为空时为全部站点
+        :param feed_version: 订阅规则版本，变化时重新处理全部种子
+        :return: [(站点信息, 未处理过的种子信息列表, 下载耗时)]，顺序与站点列表一致
+        """
+        fetch_sites = []
+        for site_info in rss_sites_info:
+            if not site_info:
+                continue
+            # 站点名称
+            site_name = site_info.get("name")
+            # 没有订阅的站点中的不搜索
+            if check_sites and site_name not in check_sites:
+                continue
+            # 站点rss链接
+            if not site_info.get("rssurl"):
+                log.info(f"【Rss】{site_name} 未配置rssurl，跳过...")
+                continue
+            fetch_sites.append(site_info)
+        if not fetch_sites:
+            return []
+
+        def __fetch(site_info):
+            start_time = time.time()
+            rss_acticles = self.rsshelper.parse_rssxml(url=site_info.get("rssurl"),
+                                                       timeout=self._RSS_TIMEOUT,
+                                                       feed_key=f"rss:{site_info.get('id')}",
+                                                       feed_version=f"{feed_version}{site_info.get('rule')}")
+            return rss_acticles, time.time() - start_time
+
+        log.info(f"【Rss】开始下载 {len(fetch_sites)} 个站点的RSS...")
+        results = []
+        with ThreadPoolExecutor(max_workers=min(len(fetch_sites), self._MAX_CONCURRENCY)) as executor:
+            futures = [executor.submit(__fetch, site_info) for site_info in fetch_sites]
+            for site_info, future in zip(fetch_sites, futures):
+                try:
+                    rss_acticles, fetch_time = future.result()
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    log.error(f"【Rss】{site_info.get('name')} 下载RSS出错：{str(e)}")
+                    continue
+                log.debug(f"【Rss】{site_info.get('name')} RSS下载耗时 {fetch_time:.2f} 秒")
+                results.append((site_info, rss_acticles, fetch_time))
+        return results
+
     def check_torrent_rss(self,
                           media_info,
                           rss_movies,
@@ -1,5 +1,6 @@
 import os
 import threading
+import time
 import traceback
 
 from watchdog.events import FileSystemEventHandler
@@ -9,8 +10,8 @@ from watchdog.observers.polling import PollingObserver
 import log
 from app.conf import ModuleConf
 from app.filetransfer import FileTransfer
-from app.helper import DbHelper
-from app.utils import PathUtils, ExceptionUtils
+from app.helper import DbHelper, ThreadHelper
+from app.utils import PathUtils, ExceptionUtils, ExpiringSet
 from app.utils.commons import singleton
 from app.utils.types import SyncType
 from config import RMT_MEDIAEXT
@@ -34,14 +35,22 @@ class FileMonitorHandler(FileSystemEventHandler):
     def on_moved(self, event):
         self.sync.file_change_handler(event, "移动", event.dest_path)
 
-    """
     def on_modified(self, event):
-        self.sync.file_change_handler(event, "修改", event.src_path)
-    """
+        # 修改事件只用于延长正在写入的文件的等待时间，已同步的文件被修改时不重新处理
+        self.sync.file_change_handler(event, "修改", event.src_path, pending_only=True)
 
 
 @singleton
 class Sync(object):
+    # 已处理文件的去重时间窗口（秒）
+    SYNCED_FILES_TTL = 24 * 3600
+    # 已处理文件的去重容量
+    SYNCED_FILES_MAXSIZE = 100000
+    # 文件在该时间（秒）内没有新事件且大小不变才开始处理
+    DEBOUNCE_SECONDS = 3
+    # 等待处理文件的检查间隔（秒）
+    DEBOUNCE_INTERVAL = 1
+
     filetransfer = None
     dbhelper = None
 
@@ -49,10 +58,19 @@ class Sync(object):
     _monitor_sync_path_ids = []
     _observer = []
     _sync_paths = []
-    _synced_files = []
+    _synced_files = None
     _need_sync_paths = {}
+    # 等待文件稳定的路径：路径 -> 最后事件时间、文件大小
+    _pending_files = {}
+    _pending_lock = None
+    _pending_event = None
 
     def __init__(self):
+        self._synced_files = ExpiringSet(maxsize=self.SYNCED_FILES_MAXSIZE, ttl=self.SYNCED_FILES_TTL)
+        self._pending_files = {}
+        self._pending_lock = threading.Lock()
+        self._pending_event = threading.Event()
+        threading.Thread(target=self.__debounce_files, name="SyncDebounce", daemon=True).start()
         self.init_config()
 
     def init_config(self):
@@ -163,12 +181,13 @@ class Sync(object):
                     and config.get("enabled"):
                 self.dbhelper.check_config_sync_paths(sid=sid, enabled=0)
 
-    def file_change_handler(self, event, text, event_path):
+    def file_change_handler(self, event, text, event_path, pending_only=False):
         """
         处理文件变化
         :param event: 事件
         :param text: 事件描述
         :param event_path: 事件文件路径
+        :param pending_only: 只刷新等待中文件的事件时间，不加入新文件
         """
         if not event.is_directory:
             # 文件发生变化
@@ -177,110 +196,170 @@ class Sync(object):
                     return
                 log.debug("【Sync】文件%s：%s" % (text, event_path))
                 # 判断是否处理过了
-                need_handler_flag = False
-                try:
-                    lock.acquire()
-                    if event_path not in self._synced_files:
-                        self._synced_files.append(event_path)
-                        need_handler_flag = True
-                finally:
-                    lock.release()
-                if not need_handler_flag:
+                if event_path in self._synced_files:
                     log.debug("【Sync】文件已处理过：%s" % event_path)
                     return
+                # 同一文件的连续事件合并，等待写入完成后再处理
+                now = time.monotonic()
+                with self._pending_lock:
+                    pending = self._pending_files.get(event_path)
+                    if pending:
+                        pending["time"] = now
+                    elif not pending_only:
+                        self._pending_files[event_path] = {"time": now, "size": self.__get_file_size(event_path)}
+                        self._pending_event.set()
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error("【Sync】发生错误：%s - %s" % (str(e), traceback.format_exc()))
 
-                # 上级目录
-                from_dir = os.path.dirname(event_path)
-                # 判断是否在监控目录下
-                sync_id = None
-                is_root_path = False
-                for sid in self._monitor_sync_path_ids:
-                    sync_path_conf = self.get_sync_path_conf(sid)
-                    mon_path = sync_path_conf.get('from')
-                    target_path = sync_path_conf.get('to')
-                    unknown_path = sync_path_conf.get('unknown')
-                    # 判断是否在监控目录下
-                    if PathUtils.is_path_in_path(mon_path, event_path):
-                        if os.path.normpath(mon_path) == os.path.normpath(from_dir):
-                            is_root_path = True
-                        sync_id = sid
-                    # 目的目录下不处理
-                    if PathUtils.is_path_in_path(target_path, event_path):
-                        log.error(f"【Sync】{event_path} -> {target_path} 目的目录存在嵌套，无法同步！")
-                        return
-                    # 未识别目录下不处理
-                    if PathUtils.is_path_in_path(unknown_path, event_path):
-                        log.error(f"【Sync】{event_path} -> {unknown_path} 未识别目录存在嵌套，无法同步！")
-                        return
-                # 不在监控目录下，不处理
-                if not sync_id:
-                    log.debug(f"【Sync】{event_path} 不在监控目录下，不处理 ...")
-                    return
-                # 媒体库目录及子目录不处理
-                if self.filetransfer.is_target_dir_path(event_path):
-                    log.error(f"【Sync】{event_path} 是媒体库子目录，无法同步！")
-                    return
-                # 回收站及隐藏的文件不处理
-                if PathUtils.is_invalid_path(event_path):
-                    log.debug(f"【Sync】{event_path} 是回收站或隐藏的文件，不处理 ...")
-                    return
+    @staticmethod
+    def __get_file_size(file_path):
+        try:
+            return os.path.getsize(file_path)
+        except OSError:
+            return None
+
+    def __debounce_files(self):
+        """
+        定期检查等待中的文件，一段时间内无新事件且大小不变的文件交由线程池处理
+        """
+        while True:
+            self._pending_event.wait()
+            time.sleep(self.DEBOUNCE_INTERVAL)
+            try:
+                for event_path in self.__pop_settled_files():
+                    # 判断是否处理过了
+                    if not self._synced_files.add(event_path):
+                        log.debug("【Sync】文件已处理过：%s" % event_path)
+                        continue
+                    ThreadHelper().start_thread(self.__handle_file_change, (event_path,))
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+
+    def __pop_settled_files(self):
+        """
+        取出已稳定的文件，已删除的文件直接丢弃，仍在写入的文件重新计时
+        """
+        settled_files = []
+        now = time.monotonic()
+        with self._pending_lock:
+            for event_path, pending in list(self._pending_files.items()):
+                if now - pending["time"] < self.DEBOUNCE_SECONDS:
+                    continue
+                size = self.__get_file_size(event_path)
+                if size is None:
+                    self._pending_files.pop(event_path)
+                elif size != pending["size"]:
+                    pending.update({"time": now, "size": size})
+                else:
+                    self._pending_files.pop(event_path)
+                    settled_files.append(event_path)
+            if not self._pending_files:
+                self._pending_event.clear()
+        return settled_files
 
-                # 应用的同步配置
-                sync_path_conf = self.get_sync_path_conf(sync_id)
+    def __handle_file_change(self, event_path):
+        """
+        处理已稳定的文件
+        :param event_path: 文件路径
+        """
+        if not event_path:
+            return
+        try:
+            if not os.path.exists(event_path):
+                return
+            # 上级目录
+            from_dir = os.path.dirname(event_path)
+            # 判断是否在监控目录下
+            sync_id = None
+            is_root_path = False
+            for sid in self._monitor_sync_path_ids:
+                sync_path_conf = self.get_sync_path_conf(sid)
                 mon_path = sync_path_conf.get('from')
                 target_path = sync_path_conf.get('to')
                 unknown_path = sync_path_conf.get('unknown')
-                rename = sync_path_conf.get('rename')
-                sync_mode = ModuleConf.RMT_MODES.get(sync_path_conf.get('syncmod'))
+                # 判断是否在监控目录下
+                if PathUtils.is_path_in_path(mon_path, event_path):
+                    if os.path.normpath(mon_path) == os.path.normpath(from_dir):
+                        is_root_path = True
+                    sync_id = sid
+                # 目的目录下不处理
+                if PathUtils.is_path_in_path(target_path, event_path):
+                    log.error(f"【Sync】{event_path} -> {target_path} 目的目录存在嵌套，无法同步！")
+                    return
+                # 未识别目录下不处理
+                if PathUtils.is_path_in_path(unknown_path, event_path):
+                    log.error(f"【Sync】{event_path} -> {unknown_path} 未识别目录存在嵌套，无法同步！")
+                    return
+            # 不在监控目录下，不处理
+            if not sync_id:
+                log.debug(f"【Sync】{event_path} 不在监控目录下，不处理 ...")
+                return
+            # 媒体库目录及子目录不处理
+            if self.filetransfer.is_target_dir_path(event_path):
+                log.error(f"【Sync】{event_path} 是媒体库子目录，无法同步！")
+                return
+            # 回收站及隐藏的文件不处理
+            if PathUtils.is_invalid_path(event_path):
+                log.debug(f"【Sync】{event_path} 是回收站或隐藏的文件，不处理 ...")
+                return
 
-                # 不做识别重命名
-                if not rename:
-                    if '.!qB' in event_path:
-                        log.info(f"【Sync】{event_path} 还未下载完毕，不进行同步")
-                    else:
-                        self.__link(event_path, mon_path, target_path, sync_mode)
-                # 识别转移
+            # 应用的同步配置
+            sync_path_conf = self.get_sync_path_conf(sync_id)
+            mon_path = sync_path_conf.get('from')
+            target_path = sync_path_conf.get('to')
+            unknown_path = sync_path_conf.get('unknown')
+            rename = sync_path_conf.get('rename')
+            sync_mode = ModuleConf.RMT_MODES.get(sync_path_conf.get('syncmod'))
+
+            # 不做识别重命名
+            if not rename:
+                if '.!qB' in event_path:
+                    log.info(f"【Sync】{event_path} 还未下载完毕，不进行同步")
                 else:
-                    # 不是媒体文件不处理
-                    name = os.path.basename(event_path)
-                    if not name:
+                    self.__link(event_path, mon_path, target_path, sync_mode)
+            # 识别转移
+            else:
+                # 不是媒体文件不处理
+                name = os.path.basename(event_path)
+                if not name:
+                    return
+                if name.lower() != "index.bdmv":
+                    ext = os.path.splitext(name)[-1]
+                    if ext.lower() not in RMT_MEDIAEXT:
                         return
-                    if name.lower() != "index.bdmv":
-                        ext = os.path.splitext(name)[-1]
-                        if ext.lower() not in RMT_MEDIAEXT:
-                            return
-                    # 监控根目录下的文件发生变化时直接发走
-                    if is_root_path:
-                        ret, ret_msg = self.filetransfer.transfer_media(in_from=SyncType.MON,
-                                                                        in_path=event_path,
-                                                                        target_dir=target_path,
-                                                                        unknown_dir=unknown_path,
-                                                                        rmt_mode=sync_mode)
-                        if not ret:
-                            log.warn("【Sync】%s 转移失败：%s" % (event_path, ret_msg))
-                    else:
-                        try:
-                            lock.acquire()
-                            if self._need_sync_paths.get(from_dir):
-                                files = self._need_sync_paths[from_dir].get('files')
-                                if not files:
-                                    files = [event_path]
-                                else:
-                                    if event_path not in files:
-                                        files.append(event_path)
-                                    else:
-                                        return
-                                self._need_sync_paths[from_dir].update({'files': files})
+                # 监控根目录下的文件发生变化时直接发走
+                if is_root_path:
+                    ret, ret_msg = self.filetransfer.transfer_media(in_from=SyncType.MON,
+                                                                    in_path=event_path,
+                                                                    target_dir=target_path,
+                                                                    unknown_dir=unknown_path,
+                                                                    rmt_mode=sync_mode)
+                    if not ret:
+                        log.warn("【Sync】%s 转移失败：%s" % (event_path, ret_msg))
+                else:
+                    try:
+                        lock.acquire()
+                        if self._need_sync_paths.get(from_dir):
+                            files = self._need_sync_paths[from_dir].get('files')
+                            if not files:
+                                files = [event_path]
                             else:
-                                self._need_sync_paths[from_dir] = {'target': target_path,
-                                                                   'unknown': unknown_path,
-                                                                   'syncmod': sync_mode,
-                                                                   'files': [event_path]}
-                        finally:
-                            lock.release()
-            except Exception as e:
-                ExceptionUtils.exception_traceback(e)
-                log.error("【Sync】发生错误：%s - %s" % (str(e), traceback.format_exc()))
+                                if event_path not in files:
+                                    files.append(event_path)
+                                else:
+                                    return
+                            self._need_sync_paths[from_dir].update({'files': files})
+                        else:
+                            self._need_sync_paths[from_dir] = {'target': target_path,
+                                                               'unknown': unknown_path,
+                                                               'syncmod': sync_mode,
+                                                               'files': [event_path]}
+                    finally:
+                        lock.release()
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            log.error("【Sync】发生错误：%s - %s" % (str(e), traceback.format_exc()))
 
     def transfer_mon_files(self):
         """
@@ -23,6 +23,8 @@ class TorrentRemover(object):
 
     _scheduler = None
     _remove_tasks = {}
+    # 任务ID -> 编译后的删种策略
+    _remove_rules = {}
 
     def __init__(self):
         self.init_config()
@@ -60,6 +62,13 @@ class TorrentRemover(object):
                 "interval": task.INTERVAL,
                 "enabled": task.ENABLED,
             }
+        self._remove_rules = {}
+        for taskid, task in self._remove_tasks.items():
+            if not task.get("config"):
+                continue
+            self._remove_rules[taskid] = self.downloader.get_remove_rule(
+                config=dict(task.get("config"), samedata=task.get("samedata"), onlynastool=task.get("onlynastool")),
+                name=task.get("name"))
         if not self._remove_tasks:
             return
         # 启动删种任务
@@ -109,65 +118,87 @@ class TorrentRemover(object):
             tasks = [task] if task else []
         if not tasks:
             return
+        # 同一下载器的任务在同一份种子快照上计算
+        downloader_tasks = {}
         for task in tasks:
-            try:
-                lock.acquire()
-                # 获取需删除种子列表
-                downloader_id = task.get("downloader")
-                task.get("config")["samedata"] = task.get("samedata")
-                task.get("config")["onlynastool"] = task.get("onlynastool")
-                torrents = self.downloader.get_remove_torrents(
-                    downloader_id=downloader_id,
-                    config=task.get("config")
-                )
-                log.info(f"【TorrentRemover】自动删种任务：{task.get('name')} 获取符合处理条件种子数 {len(torrents)}")
-                title = f"自动删种任务：{task.get('name')}"
-                text = ""
-                if task.get("action") == 1:
-                    text = f"共暂停{len(torrents)}个种子"
-                    for torrent in torrents:
-                        name = torrent.get("name")
-                        site = torrent.get("site")
-                        size = round(torrent.get("size")/1021/1024/1024, 3)
-                        text_item = f"{name} 来自站点：{site} 大小：{size} GB"
-                        log.info(f"【TorrentRemover】暂停种子：{text_item}")
-                        text = f"{text}\n{text_item}"
-                        # 暂停种子
-                        self.downloader.stop_torrents(downloader_id=downloader_id,
-                                                      ids=[torrent.get("id")])
-                elif task.get("action") == 2:
-                    text = f"共删除{len(torrents)}个种子"
-                    for torrent in torrents:
-                        name = torrent.get("name")
-                        site = torrent.get("site")
-                        size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
-                        text_item = f"{name} 来自站点：{site} 大小：{size} GB"
-                        log.info(f"【TorrentRemover】删除种子：{text_item}")
-                        text = f"{text}\n{text_item}"
-                        # 删除种子
-                        self.downloader.delete_torrents(downloader_id=downloader_id,
-                                                        delete_file=False,
-                                                        ids=[torrent.get("id")])
-                elif task.get("action") == 3:
-                    text = f"共删除{len(torrents)}个种子（及文件）"
-                    for torrent in torrents:
-                        name = torrent.get("name")
-                        site = torrent.get("site")
-                        size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
-                        text_item = f"{name} 来自站点：{site} 大小：{size} GB"
-                        log.info(f"【TorrentRemover】删除种子及文件：{text_item}")
-                        text = f"{text}\n{text_item}"
-                        # 删除种子
-                        self.downloader.delete_torrents(downloader_id=downloader_id,
-                                                        delete_file=True,
-                                                        ids=[torrent.get("id")])
-                if torrents and title and text:
-                    self.message.send_auto_remove_torrents_message(title=title, text=text)
-            except Exception as e:
-                ExceptionUtils.exception_traceback(e)
-                log.error(f"【TorrentRemover】自动删种任务：{task.get('name')}异常：{str(e)}")
-            finally:
-                lock.release()
+            downloader_tasks.setdefault(task.get("downloader"), []).append(task)
+        for downloader_id, tasks in downloader_tasks.items():
+            with lock:
+                try:
+                    results = self.downloader.evaluate_remove_rules(
+                        downloader_id=downloader_id,
+                        rules={str(task.get("id")): self._remove_rules.get(str(task.get("id"))) for task in tasks}
+                    )
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    log.error(f"【TorrentRemover】下载器 {downloader_id} 获取删种任务种子异常：{str(e)}")
+                    continue
+                # 本次已删除的种子，后面的任务不再重复处理
+                handled_ids = set()
+                for task in tasks:
+                    self.__remove_torrents(task, results.get(str(task.get("id"))) or {}, handled_ids)
+
+    def __remove_torrents(self, task, result, handled_ids=None):
+        """
+        按任务动作处理符合条件的种子
+        :param task: 删种任务
+        :param result: 删种策略计算结果
+        :param handled_ids: 同一下载器本次已删除的种子ID，删除后加入本任务删除的种子
+        """
+        try:
+            downloader_id = task.get("downloader")
+            torrents = [torrent for torrent in result.get("torrents") or []
+                        if handled_ids is None or torrent.get("id") not in handled_ids]
+            log.info(f"【TorrentRemover】自动删种任务：{task.get('name')} 获取符合处理条件种子数 {len(torrents)}，"
+                     f"耗时 {round(result.get('seconds') or 0, 3)} 秒")
+            title = f"自动删种任务：{task.get('name')}"
+            text = ""
+            if task.get("action") == 1:
+                text = f"共暂停{len(torrents)}个种子"
+                for torrent in torrents:
+                    name = torrent.get("name")
+                    site = torrent.get("site")
+                    size = round(torrent.get("size")/1021/1024/1024, 3)
+                    text_item = f"{name} 来自站点：{site} 大小：{size} GB"
+                    log.info(f"【TorrentRemover】暂停种子：{text_item}")
+                    text = f"{text}\n{text_item}"
+                # 批量暂停种子
+                self.downloader.stop_torrents(downloader_id=downloader_id,
+                                              ids=[torrent.get("id") for torrent in torrents])
+            elif task.get("action") == 2:
+                text = f"共删除{len(torrents)}个种子"
+                for torrent in torrents:
+                    name = torrent.get("name")
+                    site = torrent.get("site")
+                    size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
+                    text_item = f"{name} 来自站点：{site} 大小：{size} GB"
+                    log.info(f"【TorrentRemover】删除种子：{text_item}")
+                    text = f"{text}\n{text_item}"
+                # 批量删除种子
+                self.downloader.delete_torrents(downloader_id=downloader_id,
+                                                delete_file=False,
+                                                ids=[torrent.get("id") for torrent in torrents])
+            elif task.get("action") == 3:
+                text = f"共删除{len(torrents)}个种子（及文件）"
+                for torrent in torrents:
+                    name = torrent.get("name")
+                    site = torrent.get("site")
+                    size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
+                    text_item = f"{name} 来自站点：{site} 大小：{size} GB"
+                    log.info(f"【TorrentRemover】删除种子及文件：{text_item}")
+                    text = f"{text}\n{text_item}"
+                # 批量删除种子及文件
+                self.downloader.delete_torrents(downloader_id=downloader_id,
+                                                delete_file=True,
+                                                ids=[torrent.get("id") for torrent in torrents])
+            # 只暂停的种子仍可被后面的删除任务删除
+            if handled_ids is not None and task.get("action") in [2, 3]:
+                handled_ids.update(torrent.get("id") for torrent in torrents)
+            if torrents and title and text:
+                self.message.send_auto_remove_torrents_message(title=title, text=text)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            log.error(f"【TorrentRemover】自动删种任务：{task.get('name')}异常：{str(e)}")
 
     def update_torrent_remove_task(self, data):
         """
@@ -303,13 +334,11 @@ class TorrentRemover(object):
         if not task:
             return False, []
         else:
-            task.get("config")["samedata"] = task.get("samedata")
-            task.get("config")["onlynastool"] = task.get("onlynastool")
-            torrents = self.downloader.get_remove_torrents(
+            results = self.downloader.evaluate_remove_rules(
                 downloader_id=task.get("downloader"),
-                config=task.get("config")
+                rules={str(taskid): self._remove_rules.get(str(taskid))}
             )
-            return True, torrents
+            return True, results.get(str(taskid), {}).get("torrents") or []
 
     def stop_service(self):
         """
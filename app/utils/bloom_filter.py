@@ -0,0 +1,50 @@
+import hashlib
+import math
+from threading import Lock
+
+
+class BloomFilter:
+    """
+    布隆过滤器，判断不存在时一定不存在，判断存在时可能误判，需要再查询确认
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        :param capacity: 预计容纳的元素数量，超出后误判率上升
+        :param error_rate: 误判率
+        """
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.count = 0
+        self._bit_size = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self._hash_count = max(int(round(self._bit_size / self.capacity * math.log(2))), 1)
+        self._bits = bytearray((self._bit_size + 7) // 8)
+        self._lock = Lock()
+
+    def __positions(self, item):
+        digest = hashlib.blake2b(str(item).encode("utf-8"), digest_size=16).digest()
+        hash1 = int.from_bytes(digest[:8], "little")
+        hash2 = int.from_bytes(digest[8:], "little") | 1
+        return [(hash1 + i * hash2) % self._bit_size for i in range(self._hash_count)]
+
+    def add(self, item):
+        """
+        添加元素
+        """
+        positions = self.__positions(item)
+        with self._lock:
+            for pos in positions:
+                self._bits[pos >> 3] |= 1 << (pos & 7)
+            self.count += 1
+
+    def is_full(self):
+        """
+        是否已超出预计容量
+        """
+        return self.count > self.capacity
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self.__positions(item))
+
+    def __len__(self):
+        return self.count
@@ -16,3 +16,7 @@ ConfigLoadCache = Cache(maxsize=1, ttl=10, timer=time.time, default=None)
 CategoryLoadCache = Cache(maxsize=2, ttl=3, timer=time.time, default=None)
 
 OpenAISessionCache = Cache(maxsize=100, ttl=3600, timer=time.time, default=None)
+
+SearchResultCache = Cache(maxsize=500, ttl=600, timer=time.time, default=None)
+
+MetaInfoCache = LRUCache(maxsize=5000, default=None)
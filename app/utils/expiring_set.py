@@ -0,0 +1,77 @@
+import time
+from collections import deque
+from threading import Lock
+
+
+class ExpiringSet(object):
+    """
+    有容量上限且按时间窗口过期的去重集合：哈希表判断是否存在，按加入顺序的环形队列淘汰过期及超出容量的元素
+    """
+
+    def __init__(self, maxsize, ttl, timer=time.monotonic):
+        """
+        :param maxsize: 最大元素数，超出时淘汰最早加入的元素
+        :param ttl: 元素保留时间（秒）
+        :param timer: 计时函数
+        """
+        self.maxsize = max(int(maxsize), 1)
+        self.ttl = ttl
+        self._timer = timer
+        # 元素 -> 过期时间
+        self._items = {}
+        # (过期时间, 元素)，按加入顺序排列
+        self._ring = deque()
+        self._lock = Lock()
+
+    def __purge(self, now):
+        """
+        淘汰队首已过期或超出容量的元素，队列中已被刷新或删除的旧记录直接丢弃
+        """
+        ring, items = self._ring, self._items
+        while ring:
+            expire, item = ring[0]
+            if items.get(item) != expire:
+                ring.popleft()
+            elif expire <= now or len(items) > self.maxsize:
+                ring.popleft()
+                del items[item]
+            else:
+                break
+
+    def add(self, item):
+        """
+        加入元素
+        :return: 元素原先不存在（或已过期）时返回True，已存在时返回False
+        """
+        with self._lock:
+            now = self._timer()
+            expire = self._items.get(item)
+            if expire is not None and expire > now:
+                return False
+            expire = now + self.ttl
+            self._items[item] = expire
+            self._ring.append((expire, item))
+            self.__purge(now)
+            return True
+
+    def discard(self, item):
+        """
+        移除元素，队列中的记录在淘汰时丢弃
+        """
+        with self._lock:
+            self._items.pop(item, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._ring.clear()
+
+    def __contains__(self, item):
+        with self._lock:
+            expire = self._items.get(item)
+            return expire is not None and expire > self._timer()
+
+    def __len__(self):
+        with self._lock:
+            self.__purge(self._timer())
+            return len(self._items)
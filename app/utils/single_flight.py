@@ -0,0 +1,63 @@
+import copy
+from threading import Event, Lock
+
+
+class _Call(object):
+    """
+    进行中的一次调用
+    """
+
+    def __init__(self):
+        self.event = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    合并相同KEY的并发调用：同一时刻只有第一个调用真正执行，其余调用等待并共享其结果
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls = {}
+        self._stats = {"executed": 0, "coalesced": 0}
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        执行调用，已有相同KEY的调用在进行中时等待其完成
+        :param key: 调用KEY
+        :param func: 实际执行的函数
+        :return: 函数返回值，等待方得到的是结果的副本
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["executed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def get_stats(self):
+        """
+        获取统计信息：实际执行次数、被合并的调用次数
+        """
+        with self._lock:
+            return dict(self._stats)
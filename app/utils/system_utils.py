@@ -1,8 +1,11 @@
 import datetime
+import errno
 import os
 import platform
 import shutil
 import subprocess
+import time
+from threading import Lock
 
 import psutil
 
@@ -13,6 +16,25 @@ from config import Config, WEBDRIVER_PATH
 from math import ceil
 
 class SystemUtils:
+    # 复制方式：reflink克隆、内核态复制、sendfile、用户态缓冲复制
+    COPY_REFLINK = "reflink"
+    COPY_FILE_RANGE = "copy_file_range"
+    COPY_SENDFILE = "sendfile"
+    COPY_BUFFERED = "buffered"
+    # Linux FICLONE ioctl
+    _FICLONE = 0x40049409
+    # 出现时回退到下一种方式的错误码
+    _COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL,
+                             errno.EBADF, errno.ENOTTY, errno.EPERM, errno.ETXTBSY, errno.ENOTSOCK}
+    # 表示文件系统或内核不支持该复制方式的错误码，记录后同一对设备不再尝试，其余错误只与单个文件有关
+    _COPY_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY}
+    # 缓冲复制块大小
+    _COPY_BUFSIZE = 8 * 1024 * 1024
+    # 已确认不支持的复制方式：(方式, 源设备, 目的设备)
+    _copy_unsupported = set()
+    # 各复制方式的次数、字节数、耗时
+    _copy_stats = {}
+    _copy_lock = Lock()
 
     @staticmethod
     def __get_hidden_shell():
@@ -130,15 +152,112 @@ class SystemUtils:
     @staticmethod
     def copy(src, dest):
         """
-        复制
+        复制，依次尝试reflink克隆、copy_file_range、sendfile，都不支持时使用缓冲复制
         """
         try:
-            shutil.copy2(os.path.normpath(src), os.path.normpath(dest))
+            SystemUtils.copy_file(os.path.normpath(src), os.path.normpath(dest))
             return 0, ""
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return -1, str(err)
 
+    @staticmethod
+    def copy_file(src, dest):
+        """
+        复制文件内容及元数据，参数与shutil.copy2一致，可作为shutil.move的copy_function
+        :return: 目的文件路径
+        """
+        if os.path.isdir(dest):
+            dest = os.path.join(dest, os.path.basename(src))
+        # 与shutil.copyfile一致，目的文件就是源文件（如指向源文件的软链接）时不能以写方式打开
+        if os.path.exists(dest) and os.path.samefile(src, dest):
+            raise shutil.SameFileError("{!r} and {!r} are the same file".format(src, dest))
+        start_time = time.time()
+        with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            method = SystemUtils.__copy_fileobj(fsrc, fdst, size)
+        shutil.copystat(src, dest)
+        seconds = time.time() - start_time
+        with SystemUtils._copy_lock:
+            stats = SystemUtils._copy_stats.setdefault(method, {"count": 0, "bytes": 0, "seconds": 0})
+            stats["count"] += 1
+            stats["bytes"] += size
+            stats["seconds"] += seconds
+        return dest
+
+    @staticmethod
+    def __copy_fileobj(fsrc, fdst, size):
+        """
+        按顺序尝试各复制方式，返回实际使用的方式
+        """
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        devices = (os.fstat(src_fd).st_dev, os.fstat(dst_fd).st_dev)
+        methods = [(SystemUtils.COPY_REFLINK, SystemUtils.__copy_reflink),
+                   (SystemUtils.COPY_FILE_RANGE, SystemUtils.__copy_file_range),
+                   (SystemUtils.COPY_SENDFILE, SystemUtils.__copy_sendfile)]
+        for method, func in methods:
+            if (method, *devices) in SystemUtils._copy_unsupported:
+                continue
+            try:
+                func(src_fd, dst_fd, size)
+                return method
+            except (OSError, AttributeError, ImportError) as err:
+                if isinstance(err, OSError) and err.errno not in SystemUtils._COPY_FALLBACK_ERRNOS:
+                    raise
+                if not isinstance(err, OSError) or err.errno in SystemUtils._COPY_UNSUPPORTED_ERRNOS:
+                    with SystemUtils._copy_lock:
+                        SystemUtils._copy_unsupported.add((method, *devices))
+                # 清除可能已写入的部分内容，由下一种方式重新复制
+                os.ftruncate(dst_fd, 0)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+        fsrc.seek(0)
+        shutil.copyfileobj(fsrc, fdst, SystemUtils._COPY_BUFSIZE)
+        return SystemUtils.COPY_BUFFERED
+
+    @staticmethod
+    def __copy_reflink(src_fd, dst_fd, size):
+        """
+        reflink克隆，btrfs、XFS等文件系统上只复制元数据
+        """
+        import fcntl
+        fcntl.ioctl(dst_fd, SystemUtils._FICLONE, src_fd)
+
+    @staticmethod
+    def __copy_file_range(src_fd, dst_fd, size):
+        """
+        内核态复制，支持的文件系统上会自动使用服务端复制或克隆
+        """
+        offset = 0
+        while offset < size:
+            copied = os.copy_file_range(src_fd, dst_fd, size - offset, offset, offset)
+            if copied == 0:
+                # 部分文件系统不支持时不报错而是返回0
+                raise OSError(errno.EINVAL, "copy_file_range returned 0")
+            offset += copied
+
+    @staticmethod
+    def __copy_sendfile(src_fd, dst_fd, size):
+        """
+        sendfile复制，数据不经过用户态
+        """
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(dst_fd, src_fd, offset, min(size - offset, 0x7ffff000))
+            if sent == 0:
+                raise OSError(errno.EINVAL, "sendfile returned 0")
+            offset += sent
+
+    @staticmethod
+    def get_copy_stats():
+        """
+        获取各复制方式的使用次数、字节数及平均速度（字节/秒）
+        """
+        with SystemUtils._copy_lock:
+            stats = {method: dict(item) for method, item in SystemUtils._copy_stats.items()}
+        for item in stats.values():
+            item["throughput"] = round(item["bytes"] / item["seconds"]) if item["seconds"] else 0
+        return stats
+
     @staticmethod
     def move(src, dest):
         """
@@ -148,7 +267,7 @@ class SystemUtils:
             tmp_file = os.path.normpath(os.path.join(os.path.dirname(src),
                                                      os.path.basename(dest)))
             shutil.move(os.path.normpath(src), tmp_file)
-            shutil.move(tmp_file, os.path.normpath(dest))
+            shutil.move(tmp_file, os.path.normpath(dest), copy_function=SystemUtils.copy_file)
             return 0, ""
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
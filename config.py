@@ -103,6 +103,7 @@ class Config(object):
     _config = {}
     _config_path = None
     _user = None
+    _config_listeners = []
 
     def __init__(self):
         self._config_path = os.environ.get('NASTOOL_CONFIG')
@@ -133,6 +134,21 @@ class Config(object):
         except Exception as err:
             print("【Config】加载 config.yaml 配置出错：%s" % str(err))
             return False
+        self.__notify_config_listeners()
+
+    def add_config_listener(self, listener):
+        """
+        注册配置变更监听，配置重新加载或保存后调用
+        """
+        if listener not in self._config_listeners:
+            self._config_listeners.append(listener)
+
+    def __notify_config_listeners(self):
+        for listener in list(self._config_listeners):
+            try:
+                listener()
+            except Exception as err:
+                print("【Config】配置变更通知出错：%s" % str(err))
 
     def init_syspath(self):
         with open(os.path.join(self.get_root_path(),
@@ -167,7 +183,9 @@ class Config(object):
         self._config = new_cfg
         with open(self._config_path, mode='w', encoding='utf-8') as sf:
             yaml = ruamel.yaml.YAML()
-            return yaml.dump(new_cfg, sf)
+            ret = yaml.dump(new_cfg, sf)
+        self.__notify_config_listeners()
+        return ret
 
     def get_config_path(self):
         return os.path.dirname(self._config_path)
@@ -1,11 +1,71 @@
 import unittest
 
+from tests.test_brush_rule import BrushRuleTest
+from tests.test_downloader_batch import DownloaderBatchTest
+from tests.test_indexer import IndexerTest
+from tests.test_media import MediaTest
+from tests.test_meta_helper import MetaHelperTest
 from tests.test_metainfo import MetaInfoTest
+from tests.test_remove_rule import RemoveRuleTest
+from tests.test_rss_helper import RssHelperTest
+from tests.test_single_flight import SingleFlightTest
+from tests.test_sync import SyncTest
+from tests.test_system_utils import SystemUtilsTest
+from tests.test_tmdb_cache import TMDbCacheTest
+from tests.test_torrent_cache import TorrentCacheTest
+from tests.test_transfer_helper import TransferHelperTest
+from tests.test_transfer_queue import TransferQueueTest
+from tests.test_words_helper import WordsHelperTest
 
 if __name__ == '__main__':
     suite = unittest.TestSuite()
     # 测试名称识别
     suite.addTest(MetaInfoTest('test_metainfo'))
+    suite.addTest(MetaInfoTest('test_cache'))
+    suite.addTest(MetaInfoTest('test_slots'))
+    # 测试RSS解析
+    suite.addTest(RssHelperTest('test_iter_rssxml'))
+    suite.addTest(RssHelperTest('test_expired_rss'))
+    # 测试自定义识别词
+    suite.addTest(WordsHelperTest('test_pipeline'))
+    # 测试站点搜索
+    suite.addTest(IndexerTest('test_spider_search'))
+    suite.addTest(IndexerTest('test_site_queue'))
+    # 测试文件批量识别
+    suite.addTest(MediaTest('test_media_info_on_files'))
+    suite.addTest(MediaTest('test_concurrent_files'))
+    # 测试并发查询合并
+    suite.addTest(SingleFlightTest('test_coalesce'))
+    suite.addTest(SingleFlightTest('test_error'))
+    # 测试TMDB缓存
+    suite.addTest(MetaHelperTest('test_bounded'))
+    suite.addTest(MetaHelperTest('test_read_refresh'))
+    # 测试TMDB接口缓存
+    suite.addTest(TMDbCacheTest('test_ttl'))
+    suite.addTest(TMDbCacheTest('test_revalidate'))
+    suite.addTest(TMDbCacheTest('test_max_entries'))
+    suite.addTest(TMDbCacheTest('test_key'))
+    # 测试文件转移调度
+    suite.addTest(TransferHelperTest('test_fast_lane'))
+    # 测试文件复制方式
+    suite.addTest(SystemUtilsTest('test_copy_fallback'))
+    suite.addTest(SystemUtilsTest('test_copy_fallback_errno'))
+    suite.addTest(SystemUtilsTest('test_copy_same_file'))
+    # 测试目录监控
+    suite.addTest(SyncTest('test_synced_files'))
+    suite.addTest(SyncTest('test_debounce'))
+    # 测试下载文件转移队列
+    suite.addTest(TransferQueueTest('test_limits'))
+    # 测试下载器种子状态同步
+    suite.addTest(TorrentCacheTest('test_sync'))
+    # 测试删种规则
+    suite.addTest(RemoveRuleTest('test_rules'))
+    suite.addTest(RemoveRuleTest('test_remove_tasks'))
+    # 测试下载器批量操作
+    suite.addTest(DownloaderBatchTest('test_batch'))
+    suite.addTest(DownloaderBatchTest('test_transfer_flush'))
+    # 测试刷流规则
+    suite.addTest(BrushRuleTest('test_rules'))
 
     # 运行测试
     runner = unittest.TextTestRunner()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import time
+from unittest import TestCase, skipUnless
+
+from app.brushtask_rule import BrushRssRule, BrushRemoveRule, parse_brush_rule_str
+from app.utils.types import BrushDeleteType
+
+RSS_RULE = {"size": "bw#1,20", "include": "1080p|2160p", "exclude": "REMUX", "free": "FREE", "hr": "Y",
+            "peercount": "lt#10", "dlcount": "5", "upspeed": "", "downspeed": ""}
+REMOVE_RULE = {"time": "gt#24", "ratio": "gt#2", "uploadsize": "gt#50", "dltime": "gt#6",
+               "avg_upspeed": "lt#100", "iatime": "gt#12"}
+
+
+def legacy_check_remove_rule(remove_rule, seeding_time=None, ratio=None, uploaded=None, dltime=None,
+                             avg_upspeed=None, iatime=None):
+    """
+    原有的删种规则判断（每次按字符串拆分），作为对照
+    """
+    conditions = [("time", seeding_time, 3600, BrushDeleteType.SEEDTIME),
+                  ("ratio", ratio, 1, BrushDeleteType.RATIO),
+                  ("uploadsize", uploaded, 1024 ** 3, BrushDeleteType.UPLOADSIZE),
+                  ("dltime", dltime, 3600, BrushDeleteType.DLTIME),
+                  ("avg_upspeed", avg_upspeed, 1024, BrushDeleteType.AVGUPSPEED),
+                  ("iatime", iatime, 3600, BrushDeleteType.IATIME)]
+    for key, value, unit, delete_type in conditions:
+        if remove_rule.get(key) and value:
+            rules = remove_rule.get(key).split("#")
+            if rules[0] and len(rules) > 1 and rules[1]:
+                if key == "avg_upspeed":
+                    if float(value) < float(rules[1]) * unit:
+                        return True, delete_type
+                elif float(value) > float(rules[1]) * unit:
+                    return True, delete_type
+    return False, BrushDeleteType.NOTDELETE
+
+
+def legacy_match_torrent(rss_rule, title, torrent_size):
+    """
+    原有的种子大小、包含、排除规则判断，作为对照
+    """
+    rule_sizes = rss_rule.get("size").split("#")
+    min_size, max_size = rule_sizes[1].split(",")
+    if rule_sizes[0] == "bw" and not float(min_size) * 1024 ** 3 < float(torrent_size) < float(max_size) * 1024 ** 3:
+        return False
+    if not re.search(r"%s" % rss_rule.get("include"), title):
+        return False
+    if re.search(r"%s" % rss_rule.get("exclude"), title):
+        return False
+    return True
+
+
+class BrushRuleTest(TestCase):
+    torrents = [(f"Show.{i}.S01.{'2160p' if i % 3 else '720p'}.{'REMUX' if i % 5 == 0 else 'WEB-DL'}",
+                 (i % 30) * 1024 ** 3 + 1,
+                 {"seeding_time": (i % 48) * 3600, "ratio": (i % 30) / 10, "uploaded": (i % 70) * 1024 ** 3,
+                  "dltime": (i % 9) * 3600, "avg_upspeed": (i % 300) * 1024, "iatime": (i % 20) * 3600})
+                for i in range(1, 2000)]
+
+    def test_rules(self):
+        # 规则字符串按字面量解析，不执行代码
+        self.assertEqual(parse_brush_rule_str(str(RSS_RULE)), RSS_RULE)
+        self.assertEqual(parse_brush_rule_str("__import__('os').getcwd()"), {})
+        rss_rule = BrushRssRule(RSS_RULE)
+        remove_rule = BrushRemoveRule(REMOVE_RULE)
+        for title, size, values in self.torrents:
+            self.assertEqual(rss_rule.match_torrent(title, size), legacy_match_torrent(RSS_RULE, title, size))
+            self.assertEqual(remove_rule.check(**values), legacy_check_remove_rule(REMOVE_RULE, **values))
+        self.assertTrue(rss_rule.need_attr)
+        self.assertTrue(rss_rule.match_attr("", {"free": True, "peer_count": 3}))
+        self.assertFalse(rss_rule.match_attr("", {"free": True, "hr": True, "peer_count": 3}))
+        self.assertFalse(rss_rule.match_attr("", {"free": True, "peer_count": 10}))
+        # 旧版本只有数值的做种人数按小于处理
+        self.assertEqual(BrushRssRule({"peercount": "5"}).peercount.op, "lt")
+        # 正则错误的规则不匹配任何种子
+        self.assertFalse(BrushRssRule({"include": "(1080p"}).match_torrent("1080p", 1))
+        self.assertEqual(BrushRemoveRule({}).check(ratio=10), (False, BrushDeleteType.NOTDELETE))
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        rule_strs = (str(RSS_RULE), str(REMOVE_RULE))
+        start_time = time.perf_counter()
+        for title, size, values in self.torrents:
+            # 原方式：每次读取任务都eval规则字符串，每个种子重新拆分规则
+            rss_rule, remove_rule = eval(rule_strs[0]), eval(rule_strs[1])
+            legacy_match_torrent(rss_rule, title, size)
+            legacy_check_remove_rule(remove_rule, **values)
+        legacy_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        rss_rule = BrushRssRule(parse_brush_rule_str(rule_strs[0]))
+        remove_rule = BrushRemoveRule(parse_brush_rule_str(rule_strs[1]))
+        for title, size, values in self.torrents:
+            rss_rule.match_torrent(title, size)
+            remove_rule.check(**values)
+        rule_time = time.perf_counter() - start_time
+        print(f"{len(self.torrents)} torrents: eval and split {legacy_time * 1000:.0f}ms, "
+              f"parsed rules {rule_time * 1000:.0f}ms")
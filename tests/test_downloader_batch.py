@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, skipUnless
+from urllib.parse import parse_qs
+
+from app.downloader import Downloader
+from app.downloader.client.qbittorrent import Qbittorrent
+
+# 删除的种子数
+TORRENT_COUNT = 500
+# 模拟qBittorrent处理每个请求的耗时（秒）
+REQUEST_DELAY = 0.002
+
+
+class FakeQbittorrentHandler(BaseHTTPRequestHandler):
+    """
+    模拟qBittorrent WebUI，记录种子操作请求及涉及的种子Hash
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def __response(self, body, content_type="text/plain"):
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if self.path.endswith("/auth/login"):
+            self.send_header("Set-Cookie", "SID=fake; path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __handle(self, data=None):
+        path = self.path.split("?")[0]
+        if path.endswith("/app/version"):
+            return self.__response("v4.5.5")
+        if path.endswith("/app/webapiVersion"):
+            return self.__response("2.8.19")
+        if path.endswith("/app/preferences"):
+            return self.__response(json.dumps({}), content_type="application/json")
+        if "/torrents/" in path:
+            time.sleep(REQUEST_DELAY)
+            hashes = (data or {}).get("hashes", [""])[0]
+            self.server.actions.append((path.rsplit("/", 1)[-1], hashes.split("|") if hashes else []))
+        return self.__response("Ok.")
+
+    def do_GET(self):
+        self.__handle()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.__handle(parse_qs(self.rfile.read(length).decode("utf-8")))
+
+
+class FakeTransferClient(object):
+    """
+    模拟下载器的待转移种子列表，设置为已整理后不再返回
+    """
+
+    def __init__(self, count):
+        self.tasks = [{"id": f"{i:040x}", "path": f"/downloads/{i}", "tags": ["NASTOOL"]} for i in range(count)]
+        self.tagged = set()
+        self.calls = []
+
+    def get_transfer_task(self, **kwargs):
+        return [task for task in self.tasks if task.get("id") not in self.tagged]
+
+    def batch_set_torrents_status(self, ids, tags=None):
+        self.calls.append(len(ids))
+        self.tagged.update(ids)
+
+    def batch_delete_torrents(self, ids, delete_file=False):
+        self.batch_set_torrents_status(ids)
+
+
+class FakeFileTransfer(object):
+    def __init__(self):
+        self.paths = Counter()
+        self._lock = threading.Lock()
+
+    def transfer_media(self, in_path, **kwargs):
+        time.sleep(0.01)
+        with self._lock:
+            self.paths[in_path] += 1
+        return True, ""
+
+
+class DownloaderBatchTest(TestCase):
+    server = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeQbittorrentHandler)
+        cls.server.actions = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.client = Qbittorrent({"host": "127.0.0.1", "port": self.server.server_address[1],
+                                   "username": "admin", "password": "adminadmin"})
+        self.server.actions.clear()
+        self.ids = [f"{i:040x}" for i in range(TORRENT_COUNT)]
+
+    def test_batch(self):
+        self.client.batch_size = 200
+        self.assertTrue(self.client.batch_delete_torrents(ids=self.ids, delete_file=True))
+        self.assertEqual([len(hashes) for _, hashes in self.server.actions], [200, 200, 100])
+        self.assertEqual(sum([hashes for _, hashes in self.server.actions], []), self.ids)
+        self.server.actions.clear()
+        self.client.batch_stop_torrents(ids=self.ids[0])
+        self.client.batch_set_torrents_status(ids=self.ids[:10])
+        self.assertEqual(self.server.actions, [("pause", self.ids[:1]), ("addTags", self.ids[:10])])
+        self.assertFalse(self.client.batch_delete_torrents(ids=[]))
+
+    def test_transfer_flush(self):
+        downloader = Downloader()
+        client, filetransfer = FakeTransferClient(45), FakeFileTransfer()
+        saved = (downloader._downloader_confs, downloader._DownloaderEnum, downloader.filetransfer)
+        downloader._downloader_confs = {"1": {"id": 1, "name": "test", "rmt_mode": "copy"}}
+        downloader._DownloaderEnum = {"1": "test"}
+        downloader.filetransfer = filetransfer
+        downloader._Downloader__get_client = lambda did=None: client
+        try:
+            # 并发执行的转移不会重复转移已转移待设置状态的种子
+            threads = [threading.Thread(target=downloader.transfer, args=("1",)) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            downloader.transfer("1")
+        finally:
+            del downloader._Downloader__get_client
+            downloader._downloader_confs, downloader._DownloaderEnum, downloader.filetransfer = saved
+        self.assertEqual(len(filetransfer.paths), 45)
+        self.assertEqual(set(filetransfer.paths.values()), {1})
+        self.assertEqual(client.tagged, {task.get("id") for task in client.tasks})
+        self.assertLess(len(client.calls), 45)
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        start_time = time.perf_counter()
+        for torrent_id in self.ids:
+            self.client.delete_torrents(delete_file=True, ids=[torrent_id])
+        single_time = time.perf_counter() - start_time
+        single_requests = len(self.server.actions)
+        self.server.actions.clear()
+        start_time = time.perf_counter()
+        self.client.batch_delete_torrents(ids=self.ids, delete_file=True)
+        batch_time = time.perf_counter() - start_time
+        self.assertEqual(single_requests, TORRENT_COUNT)
+        self.assertLess(len(self.server.actions), single_requests)
+        print(f"delete {TORRENT_COUNT} torrents: per torrent {single_requests} requests {single_time:.2f}s, "
+              f"batched {len(self.server.actions)} requests {batch_time:.2f}s")
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from types import SimpleNamespace
+from unittest import TestCase, skipUnless
+
+from app.indexer import Indexer
+from app.indexer.client._spider import TorrentSpider
+from app.indexer.indexerConf import IndexerConf
+
+# 模拟站点响应延迟（秒）
+STUB_DELAY = 0.05
+# 模拟站点返回的种子数
+STUB_TORRENTS = 50
+
+
+class StubTrackerHandler(BaseHTTPRequestHandler):
+    """
+    本地模拟站点，返回固定的种子列表页面
+    """
+
+    def do_GET(self):
+        time.sleep(STUB_DELAY)
+        rows = "".join(
+            f"<tr><td class=\"title\"><a href=\"details.php?id={i}\">Stub.Movie.{i}.2023.1080p.BluRay.x264-Stub</a></td>"
+            f"<td class=\"dl\"><a href=\"download.php?id={i}\">DL</a></td>"
+            f"<td class=\"size\">{i + 1}.5 GB</td></tr>"
+            for i in range(STUB_TORRENTS))
+        body = f"<html><body><table class=\"torrents\">{rows}</table></body></html>".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class IndexerTest(TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubTrackerHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.indexer = IndexerConf(datas={
+            "id": "stub",
+            "name": "Stub",
+            "domain": f"http://127.0.0.1:{self.server.server_address[1]}/",
+            "search": {
+                "paths": [{"path": "torrents.php", "method": "get"}],
+                "params": {"search": "{keyword}"}
+            },
+            "torrents": {
+                "list": {"selector": "table.torrents > tr"},
+                "fields": {
+                    "title": {"selector": "td.title a"},
+                    "details": {"selector": "td.title a", "attribute": "href"},
+                    "download": {"selector": "td.dl a", "attribute": "href"},
+                    "size": {"selector": "td.size"}
+                }
+            }
+        }, cookie="uid=1")
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __search(self, wait):
+        spider = TorrentSpider()
+        spider.setparam(indexer=self.indexer, keyword="Stub")
+        start_time = time.perf_counter()
+        spider.start()
+        wait(spider)
+        return time.perf_counter() - start_time, spider.torrents_info_array.copy()
+
+    @staticmethod
+    def __wait_polling(spider, timeout=30):
+        """
+        原有的轮询等待方式，作为对照
+        """
+        sleep_count = 0
+        while not spider.is_complete:
+            sleep_count += 1
+            time.sleep(1)
+            if sleep_count > timeout:
+                break
+
+    def test_spider_search(self):
+        _, torrents = self.__search(lambda spider: spider.wait_complete(30))
+        self.assertEqual(len(torrents), STUB_TORRENTS)
+        self.assertTrue(torrents[0].get("enclosure", "").endswith("download.php?id=0"))
+
+    def test_site_queue(self):
+        release = threading.Event()
+
+        class SlowClient(object):
+            def search(self, order_seq, indexer, *args):
+                if indexer.id == "slow":
+                    release.wait(5)
+                return [indexer.id]
+
+        indexer = Indexer()
+        saved = (indexer._client, indexer._search_executor)
+        indexer._client = SlowClient()
+        indexer._search_executor = ThreadPoolExecutor(max_workers=3)
+        try:
+            submit = indexer._Indexer__submit_search
+            slow = SimpleNamespace(id="slow", domain="")
+            slow_tasks = [submit(1, slow, "", {}, None, None) for _ in range(6)]
+            # 慢站点排队的搜索不占用线程，其它站点不需要等待
+            fast_task = submit(1, SimpleNamespace(id="fast", domain=""), "", {}, None, None)
+            self.assertEqual(fast_task.result(timeout=2), ["fast"])
+            self.assertFalse(any(task.done() for task in slow_tasks))
+            release.set()
+            self.assertEqual([task.result(timeout=5) for task in slow_tasks], [["slow"]] * 6)
+        finally:
+            release.set()
+            indexer._search_executor.shutdown()
+            indexer._client, indexer._search_executor = saved
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        for name, wait in [("polling", self.__wait_polling),
+                           ("event", lambda spider: spider.wait_complete(30))]:
+            latencies = [self.__search(wait)[0] for _ in range(5)]
+            print(f"{name}: avg {sum(latencies) / len(latencies) * 1000:.0f}ms, "
+                  f"max {max(latencies) * 1000:.0f}ms")
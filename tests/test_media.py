@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import TestCase, skipUnless
+
+from app.media import Media
+from app.utils.types import MediaType
+
+# 模拟TMDB请求耗时（秒）
+TMDB_DELAY = 0.02
+
+
+class MemoryMetaCache(object):
+    """
+    内存中的识别缓存，避免测试写入配置目录
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get_meta_data_by_key(self, key):
+        with self._lock:
+            return self._data.get(key) or {}
+
+    def update_meta_data(self, meta_data):
+        with self._lock:
+            for key, item in meta_data.items():
+                self._data.setdefault(key, item)
+
+
+class MockTmdb(object):
+    """
+    模拟TMDB查询，按名称返回固定的媒体信息并统计请求次数
+    """
+
+    def __init__(self, delay=TMDB_DELAY):
+        self.calls = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def search(self, file_media_name, search_type=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        tmdbid = abs(hash(file_media_name)) % 100000 + 1
+        return {"id": tmdbid, "name": file_media_name, "media_type": search_type or MediaType.TV,
+                "first_air_date": "2020-01-01"}
+
+    def info(self, mtype, tmdbid, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {"id": tmdbid, "name": f"Show {tmdbid}", "media_type": mtype or MediaType.TV,
+                "first_air_date": "2020-01-01", "genres": [{"id": 18}], "genre_ids": [18]}
+
+
+def build_media_tree(root, shows=10, seasons=2, episodes=30):
+    """
+    生成剧集目录：剧集名/Season N/剧集名.SxxExx.mkv
+    """
+    files = []
+    for show in range(shows):
+        show_name = f"Test.Show.{chr(65 + show)}{chr(65 + show)}"
+        for season in range(1, seasons + 1):
+            season_dir = os.path.join(root, show_name, f"Season {season}")
+            os.makedirs(season_dir, exist_ok=True)
+            for episode in range(1, episodes + 1):
+                file_path = os.path.join(season_dir,
+                                         f"{show_name}.S{season:02d}E{episode:02d}.1080p.WEB-DL.H264-Group.mkv")
+                open(file_path, "w").close()
+                files.append(file_path)
+    return files
+
+
+class MediaTest(TestCase):
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.files = build_media_tree(self.root)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    @staticmethod
+    def __build_media(delay=TMDB_DELAY):
+        media = Media()
+        mock = MockTmdb(delay)
+        media.tmdb = SimpleNamespace(language="zh")
+        media.meta = MemoryMetaCache()
+        media._Media__search_tmdb = mock.search
+        media.get_tmdb_info = mock.info
+        return media, mock
+
+    def test_media_info_on_files(self):
+        media, mock = self.__build_media()
+        media_infos = media.get_media_info_on_files(self.files)
+        self.assertEqual(list(media_infos.keys()), self.files)
+        self.assertTrue(all(info.tmdb_id for info in media_infos.values()))
+        # 每个剧集每季只查询一次搜索和一次详情
+        self.assertEqual(mock.calls, 10 * 2 * 2)
+        # 查询出错的剧集不返回，不会被当作未识别文件转移
+        media, mock = self.__build_media()
+        search = mock.search
+
+        def __search(file_media_name, **kwargs):
+            if file_media_name.upper().endswith(" AA"):
+                raise ConnectionError("TMDB连接失败")
+            return search(file_media_name, **kwargs)
+
+        media._Media__search_tmdb = __search
+        media_infos = media.get_media_info_on_files(self.files)
+        self.assertEqual(list(media_infos.keys()), [f for f in self.files if "Test.Show.AA" not in f])
+        self.assertTrue(all(info.tmdb_id for info in media_infos.values()))
+
+    def test_concurrent_files(self):
+        # 同时识别相同文件（如目录同步与下载器转移），相同媒体只查询一次
+        media, mock = self.__build_media(delay=0.3)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(media.get_media_info_on_files(self.files)))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 2)
+        for media_infos in results:
+            self.assertEqual(list(media_infos.keys()), self.files)
+            self.assertTrue(all(info.tmdb_id for info in media_infos.values()))
+        self.assertEqual(mock.calls, 10 * 2 * 2)
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        media, mock = self.__build_media()
+        start_time = time.perf_counter()
+        for file_path in self.files:
+            media.get_media_info_on_files(file_path)
+        serial_time = time.perf_counter() - start_time
+        serial_calls = mock.calls
+        media, mock = self.__build_media()
+        start_time = time.perf_counter()
+        media.get_media_info_on_files(self.files)
+        pipeline_time = time.perf_counter() - start_time
+        print(f"{len(self.files)} files: per file {serial_time:.2f}s/{serial_calls} calls, "
+              f"pipeline {pipeline_time:.2f}s/{mock.calls} calls")
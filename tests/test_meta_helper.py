@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import time
+from collections import OrderedDict
+from unittest import TestCase
+
+from app.helper import MetaHelper
+from app.helper.meta_helper import CACHE_EXPIRE_TIMESTAMP_STR, EXPIRE_TIMESTAMP
+
+
+class MetaHelperTest(TestCase):
+    """
+    使用内存数据库测试TMDB缓存的容量限制及写入方式
+    """
+
+    def setUp(self) -> None:
+        self.meta = MetaHelper()
+        self.meta.save_meta_data()
+        self.state = (self.meta._conn, self.meta._memory_cache_size)
+        self.meta._conn = self.meta._MetaHelper__init_db(":memory:")
+        self.meta._memory_cache_size = 10
+        self.meta._memory_cache = OrderedDict()
+        self.meta._unknown_data = OrderedDict()
+        self.meta._dirty_keys = set()
+        self.meta._deleted_keys = set()
+
+    def tearDown(self) -> None:
+        self.meta._conn.close()
+        self.meta._conn, self.meta._memory_cache_size = self.state
+        self.meta._memory_cache = OrderedDict()
+        self.meta._unknown_data = OrderedDict()
+
+    def __db_count(self):
+        return self.meta._conn.execute("SELECT COUNT(1) FROM META_DATA").fetchone()[0]
+
+    def test_bounded(self):
+        self.meta.update_meta_data({f"key{i}": {"id": i + 1, "title": f"title{i}"} for i in range(30)})
+        self.meta.update_meta_data({f"unknown{i}": {"id": 0} for i in range(30)})
+        # 内存中的条目数不超过容量，被淘汰的变更已写入数据库
+        self.assertEqual(len(self.meta._memory_cache), 10)
+        self.assertEqual(len(self.meta._unknown_data), 10)
+        self.assertEqual(self.__db_count(), 20)
+        self.meta.save_meta_data()
+        self.assertEqual(self.__db_count(), 30)
+        self.assertFalse(self.meta._dirty_keys)
+        self.assertEqual(self.meta.get_meta_data_by_key("key0").get("title"), "title0")
+        self.assertEqual(self.meta.get_meta_data_by_key("unknown29").get("id"), 0)
+
+    def test_read_refresh(self):
+        self.meta.update_meta_data({"key": {"id": 1, "title": "title"}})
+        self.meta.save_meta_data()
+        # 刚写入的条目读取时不需要刷新过期时间
+        self.meta.get_meta_data_by_key("key")
+        self.assertFalse(self.meta._dirty_keys)
+        # 过期时间刷新在内存条目上，只标记待写入
+        info = self.meta._memory_cache["key"][1]
+        info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + 3600
+        self.meta.get_meta_data_by_key("key")
+        self.assertEqual(self.meta._dirty_keys, {"key"})
+        self.assertIs(self.meta._memory_cache["key"][1], info)
+        self.assertGreaterEqual(info[CACHE_EXPIRE_TIMESTAMP_STR], int(time.time()) + EXPIRE_TIMESTAMP - 1)
+        self.meta.delete_meta_data("key")
+        self.assertEqual(self.meta.get_meta_data_by_key("key"), {})
+        self.meta.save_meta_data()
+        self.assertEqual(self.__db_count(), 0)
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 
-from unittest import TestCase
+import os
+import time
+import tracemalloc
+from unittest import TestCase, skipUnless
 
 from app.media.meta import MetaInfo
+from app.media.meta.metainfo import MetaInfoConfig
+from app.utils import MetaInfoCache
 from tests.cases.meta_cases import meta_cases
 
 
@@ -32,3 +37,62 @@ class MetaInfoTest(TestCase):
                 "audio_codec": meta_info.audio_encode or ""
             }
             self.assertEqual(target, info.get("target"))
+
+    def test_cache(self):
+        title = "The.Mandalorian.S02E03.1080p.WEB-DL.DDP5.1.H264-NTb"
+        meta_info = MetaInfo(title=title)
+        meta_info.set_tmdb_info({"id": 1, "media_type": meta_info.type, "name": "Changed"})
+        meta_info.ignored_words.append("test")
+        cached_info = MetaInfo(title=title)
+        self.assertIsNot(meta_info, cached_info)
+        self.assertFalse(cached_info.tmdb_id)
+        self.assertNotIn("test", cached_info.ignored_words)
+        self.assertEqual(cached_info.get_season_episode_string(), meta_info.get_season_episode_string())
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        titles = [(info.get("title"), info.get("subtitle")) for info in meta_cases if info.get("title")]
+        rounds = 5
+
+        def __run(before_round=None, before_title=None):
+            start_time = time.perf_counter()
+            for _ in range(rounds):
+                if before_round:
+                    before_round()
+                for title, subtitle in titles:
+                    if before_title:
+                        before_title()
+                    MetaInfo(title=title, subtitle=subtitle)
+            return len(titles) * rounds / (time.perf_counter() - start_time)
+
+        # 每次识别前重新读取配置且不使用缓存，模拟原有方式
+        legacy_speed = __run(before_round=MetaInfoCache.clear, before_title=MetaInfoConfig.refresh)
+        snapshot_speed = __run(before_round=MetaInfoCache.clear)
+        MetaInfoCache.clear()
+        cached_speed = __run()
+        print(f"{len(titles) * rounds} titles: per call config {legacy_speed:.0f} titles/s, "
+              f"snapshot {snapshot_speed:.0f} titles/s, cached {cached_speed:.0f} titles/s")
+
+    def test_slots(self):
+        meta_info = MetaInfo(title=meta_cases[0].get("title"), subtitle=meta_cases[0].get("subtitle"))
+        # 属性保存在__slots__中，TMDB信息未设置时不创建字典
+        self.assertFalse(hasattr(meta_info, "__dict__"))
+        with self.assertRaises(AttributeError):
+            object.__getattribute__(meta_info, "tmdb_info")
+        self.assertEqual(meta_info.tmdb_info, {})
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_memory(self):
+        titles = [(info.get("title"), info.get("subtitle")) for info in meta_cases if info.get("title")]
+        count = 10000
+        tracemalloc.start()
+        meta_infos = []
+        for i in range(count):
+            title, subtitle = titles[i % len(titles)]
+            meta_info = MetaInfo(title=title, subtitle=subtitle)
+            meta_info.set_torrent_info(site="Test", enclosure=f"https://example.com/download.php?id={i}", size=i,
+                                       description=subtitle, page_url=f"https://example.com/details.php?id={i}")
+            meta_infos.append(meta_info)
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{count} titles: {memory / 1024 / 1024:.2f}MB, {memory / count:.0f} bytes/title")
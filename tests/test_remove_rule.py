@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import time
+from types import SimpleNamespace
+from unittest import TestCase, skipUnless
+
+from app.downloader.client._remove_rule import RemoveRule
+from app.downloader.client._torrent_cache import QbittorrentTorrentCache
+from app.downloader.client.qbittorrent import Qbittorrent
+from app.torrentremover import TorrentRemover
+from app.utils import StringUtils
+
+# 模拟下载器中的种子数
+TORRENT_COUNT = 8000
+
+REMOVE_CONFIGS = {
+    "ratio": {"ratio": 2, "samedata": 1},
+    "seeding": {"seeding_time": 24, "savepath_key": "movies?", "tracker_key": r"site[0-4]\."},
+    "size": {"size": [1, 5], "upload_avs": 10, "qb_state": ["stalledUP"], "qb_category": ["tv"], "samedata": 1},
+    "tags": {"filter_tags": ["NASTOOL"], "ratio": 1, "samedata": 1},
+}
+
+
+class FakeQbittorrent(object):
+    """
+    模拟qBittorrent的种子状态，一部分种子为同一数据的辅种
+    """
+
+    def __init__(self, count):
+        now = int(time.time())
+        self.torrents = {}
+        for i in range(count):
+            data = i % (count // 4)
+            self.torrents[f"{i:040x}"] = {
+                "name": f"Test.Show.{data}.S01.1080p.WEB-DL.H264-Group",
+                "size": (data % 8) * 1024 * 1024 * 1024 + data,
+                "ratio": (i % 7) / 2,
+                "completion_on": now - (i % 96) * 3600 if i % 5 else -1,
+                "added_on": now - 100 * 3600,
+                "uploaded": (i % 13) * 1024 * 1024 * 1024,
+                "save_path": "/downloads/movies" if i % 3 else "/downloads/tv",
+                "tracker": f"https://tracker.site{i % 10}.org/announce.php",
+                "state": "stalledUP" if i % 2 else "uploading",
+                "category": "tv" if i % 3 == 0 else "movie",
+                "tags": "NASTOOL" if i % 4 else ""
+            }
+
+    def sync_maindata(self, rid=0):
+        return {"rid": 1, "full_update": True, "torrents": self.torrents}
+
+
+class FakeRemoverDownloader(object):
+    """
+    模拟下载器，记录自动删种任务的暂停、删除操作
+    """
+
+    def __init__(self, results):
+        self.results = results
+        self.actions = []
+
+    def evaluate_remove_rules(self, downloader_id, rules):
+        return {key: {"torrents": list(self.results.get(key) or [])} for key in rules}
+
+    def stop_torrents(self, downloader_id, ids):
+        self.actions.append(("stop", ids))
+
+    def delete_torrents(self, downloader_id, delete_file, ids):
+        self.actions.append(("delete", ids))
+
+
+def legacy_remove_torrents(torrents, config):
+    """
+    原有的删种规则判断，作为对照
+    """
+    torrents = [t for t in torrents if all(tag in t.tags for tag in config.get("filter_tags") or [])]
+    remove_torrents = []
+    remove_torrents_ids = []
+    ratio = config.get("ratio")
+    seeding_time = config.get("seeding_time")
+    size = config.get("size")
+    minsize = size[0] * 1024 * 1024 * 1024 if size else 0
+    maxsize = size[-1] * 1024 * 1024 * 1024 if size else 0
+    upload_avs = config.get("upload_avs")
+    savepath_key = config.get("savepath_key")
+    tracker_key = config.get("tracker_key")
+    qb_state = config.get("qb_state")
+    qb_category = config.get("qb_category")
+    for torrent in torrents:
+        date_done = torrent.completion_on if torrent.completion_on > 0 else torrent.added_on
+        date_now = int(time.time())
+        torrent_seeding_time = date_now - date_done if date_done else 0
+        torrent_upload_avs = torrent.uploaded / torrent_seeding_time if torrent_seeding_time else 0
+        if ratio and torrent.ratio <= ratio:
+            continue
+        if seeding_time and torrent_seeding_time <= seeding_time * 3600:
+            continue
+        if size and (torrent.size >= maxsize or torrent.size <= minsize):
+            continue
+        if upload_avs and torrent_upload_avs >= upload_avs * 1024:
+            continue
+        if savepath_key and not re.findall(savepath_key, torrent.save_path, re.I):
+            continue
+        if tracker_key and not re.findall(tracker_key, torrent.tracker, re.I):
+            continue
+        if qb_state and torrent.state not in qb_state:
+            continue
+        if qb_category and torrent.category not in qb_category:
+            continue
+        remove_torrents.append({
+            "id": torrent.hash,
+            "name": torrent.name,
+            "site": StringUtils.get_url_sld(torrent.tracker),
+            "size": torrent.size
+        })
+        remove_torrents_ids.append(torrent.hash)
+    if config.get("samedata") and remove_torrents:
+        remove_torrents_plus = []
+        for remove_torrent in remove_torrents:
+            name = remove_torrent.get("name")
+            size = remove_torrent.get("size")
+            for torrent in torrents:
+                if torrent.name == name and torrent.size == size and torrent.hash not in remove_torrents_ids:
+                    remove_torrents_plus.append({
+                        "id": torrent.hash,
+                        "name": torrent.name,
+                        "site": StringUtils.get_url_sld(torrent.tracker),
+                        "size": torrent.size
+                    })
+        remove_torrents_plus += remove_torrents
+        return remove_torrents_plus
+    return remove_torrents
+
+
+class RemoveRuleTest(TestCase):
+    @staticmethod
+    def __build_client(count):
+        qbc = FakeQbittorrent(count)
+        client = Qbittorrent({})
+        client.qbc = qbc
+        client._torrent_cache = QbittorrentTorrentCache(qbc)
+        torrents = [SimpleNamespace(hash=h, **t) for h, t in qbc.torrents.items()]
+        return client, torrents
+
+    def test_rules(self):
+        client, torrents = self.__build_client(400)
+        results = client.evaluate_remove_rules({key: RemoveRule(config) for key, config in REMOVE_CONFIGS.items()})
+        for key, config in REMOVE_CONFIGS.items():
+            expected = {t.get("id"): t for t in legacy_remove_torrents(torrents, config)}
+            self.assertTrue(expected, key)
+            self.assertEqual({t.get("id"): t for t in results[key]["torrents"]}, expected, key)
+        # 正则错误的规则不匹配任何种子
+        self.assertEqual(client.get_remove_torrents(config={"savepath_key": "(movies"}), [])
+
+    def test_remove_tasks(self):
+        torrents = [{"id": f"{i:040x}", "name": f"Torrent.{i}", "site": "site", "size": 1024} for i in range(6)]
+        downloader = FakeRemoverDownloader({"1": torrents[:3], "2": torrents[:4], "3": torrents})
+        remover = TorrentRemover()
+        saved = (remover.downloader, remover.message, remover._remove_tasks, remover._remove_rules)
+        remover.downloader = downloader
+        remover.message = SimpleNamespace(send_auto_remove_torrents_message=lambda **kwargs: None)
+        remover._remove_tasks = {
+            "1": {"id": 1, "name": "pause", "action": 1, "downloader": "1"},
+            "2": {"id": 2, "name": "delete", "action": 2, "downloader": "1"},
+            "3": {"id": 3, "name": "delete_file", "action": 3, "downloader": "1"}
+        }
+        remover._remove_rules = {"1": True, "2": True, "3": True}
+        try:
+            remover.auto_remove_torrents(["1", "2", "3"])
+        finally:
+            remover.downloader, remover.message, remover._remove_tasks, remover._remove_rules = saved
+        ids = [torrent.get("id") for torrent in torrents]
+        # 只暂停的种子同一次运行中仍会被删除，已删除的种子不再重复删除
+        self.assertEqual(downloader.actions, [("stop", ids[:3]), ("delete", ids[:4]), ("delete", ids[4:])])
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        client, torrents = self.__build_client(TORRENT_COUNT)
+        start_time = time.perf_counter()
+        for config in REMOVE_CONFIGS.values():
+            legacy_remove_torrents(torrents, config)
+        legacy_time = time.perf_counter() - start_time
+        rules = {key: RemoveRule(config) for key, config in REMOVE_CONFIGS.items()}
+        start_time = time.perf_counter()
+        results = client.evaluate_remove_rules(rules)
+        rule_time = time.perf_counter() - start_time
+        task_times = ", ".join(f"{key} {result['seconds'] * 1000:.0f}ms" for key, result in results.items())
+        print(f"{TORRENT_COUNT} torrents x {len(rules)} tasks: legacy {legacy_time:.2f}s, "
+              f"compiled {rule_time:.2f}s ({task_times})")
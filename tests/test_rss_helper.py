@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import tracemalloc
+from unittest import TestCase, skipUnless
+
+from app.helper import RssHelper
+
+
+def build_rss_feed(item_count, namespace=False):
+    """
+    生成包含指定数量条目的RSS内容
+    :param namespace: 是否使用默认命名空间（RSS 1.0/RDF格式）
+    """
+    items = []
+    for i in range(item_count):
+        items.append(
+            f"<item>"
+            f"<title><![CDATA[Test.Show.S01E{i % 100:02d}.2023.1080p.WEB-DL.H264.AAC-Group{i}]]></title>"
+            f"<link>https://pt.example.com/details.php?id={i}</link>"
+            f"<description><![CDATA[测试描述 {i} &amp; 中文]]></description>"
+            f"<enclosure url=\"https://pt.example.com/download.php?id={i}&amp;passkey=abc\" "
+            f"length=\"{1024 * 1024 * (i + 1)}\" type=\"application/x-bittorrent\"/>"
+            f"<pubDate>Sat, 15 Oct 2022 14:02:54 +0800</pubDate>"
+            f"</item>")
+    if namespace:
+        return ("<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+                "<rdf:RDF xmlns:rdf=\"http://www.w3.org/1999/02/22-rdf-syntax-ns#\" "
+                "xmlns=\"http://purl.org/rss/1.0/\"><channel><title>Example</title></channel>"
+                f"{''.join(items)}"
+                "</rdf:RDF>").encode("utf-8")
+    return ("<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+            "<rss version=\"2.0\"><channel><title>Example</title>"
+            f"{''.join(items)}"
+            "</channel></rss>").encode("utf-8")
+
+
+class RssHelperTest(TestCase):
+    def setUp(self) -> None:
+        self.feed = build_rss_feed(5000)
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_iter_rssxml(self):
+        stream_items = list(RssHelper.iter_rssxml(self.feed))
+        dom_items = RssHelper.parse_rssxml_dom(self.feed.decode("utf-8"))
+        self.assertEqual(stream_items, dom_items)
+        self.assertEqual(len(stream_items), 5000)
+        # 带默认命名空间的订阅源
+        feed = build_rss_feed(10, namespace=True)
+        stream_items = list(RssHelper.iter_rssxml(feed))
+        self.assertEqual(stream_items, RssHelper.parse_rssxml_dom(feed.decode("utf-8")))
+        self.assertEqual(len(stream_items), 10)
+        self.assertEqual(stream_items[0].get("size"), 1024 * 1024)
+
+    def test_expired_rss(self):
+        self.assertIsNone(RssHelper.parse_rssxml_dom("RSS Link has expired, You need to get a new one!"))
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        for name, parse in [("minidom", lambda: RssHelper.parse_rssxml_dom(self.feed.decode("utf-8"))),
+                            ("iterparse", lambda: list(RssHelper.iter_rssxml(self.feed)))]:
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            parse()
+            elapsed = time.perf_counter() - start_time
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{name}: {elapsed:.3f}s, peak {peak / 1024 / 1024:.1f}MB")
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from unittest import TestCase
+
+from app.utils import SingleFlight
+
+# 并发调用数
+CALL_COUNT = 8
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self) -> None:
+        self.single_flight = SingleFlight()
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __wait_coalesced(self, count):
+        """
+        等待其余调用都进入等待状态
+        """
+        for _ in range(500):
+            if self.single_flight.get_stats().get("coalesced") >= count:
+                return
+            time.sleep(0.01)
+        self.fail("等待方未全部进入等待")
+
+    def __run(self, func):
+        """
+        并发发起相同KEY的调用，返回各调用的结果或异常
+        """
+        results = [None] * CALL_COUNT
+
+        def __call(index):
+            try:
+                results[index] = self.single_flight.do("key", func)
+            except Exception as err:
+                results[index] = err
+
+        threads = [threading.Thread(target=__call, args=(i,)) for i in range(CALL_COUNT)]
+        for thread in threads:
+            thread.start()
+        self.__wait_coalesced(CALL_COUNT - 1)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesce(self):
+        def __lookup():
+            self.calls += 1
+            self.release.wait()
+            return {"id": 1, "genres": [{"id": 18}]}
+
+        results = self.__run(__lookup)
+        # 只执行一次，各调用得到相同内容的独立副本
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.single_flight.get_stats(), {"executed": 1, "coalesced": CALL_COUNT - 1})
+        self.assertTrue(all(result == {"id": 1, "genres": [{"id": 18}]} for result in results))
+        self.assertEqual(len({id(result) for result in results}), CALL_COUNT)
+        self.assertEqual(len({id(result.get("genres")) for result in results}), CALL_COUNT)
+        # 调用结束后相同KEY重新执行
+        self.assertEqual(self.single_flight.do("key", lambda: 2), 2)
+
+    def test_error(self):
+        def __lookup():
+            self.calls += 1
+            self.release.wait()
+            raise ConnectionError("TMDB连接失败")
+
+        results = self.__run(__lookup)
+        # 执行方的异常传递给所有等待方
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+        self.assertEqual(self.single_flight.do("key", lambda: 2), 2)
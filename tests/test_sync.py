@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import TestCase, skipUnless
+
+from app.sync import Sync
+from app.utils import ExpiringSet
+
+# 模拟的监控文件数
+FILE_COUNT = 20000
+
+
+class FakeTimer(object):
+    """
+    可手动推进的计时器
+    """
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class SyncTest(TestCase):
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_synced_files(self):
+        timer = FakeTimer()
+        synced_files = ExpiringSet(maxsize=3, ttl=10, timer=timer)
+        self.assertTrue(synced_files.add("a"))
+        self.assertFalse(synced_files.add("a"))
+        timer.now = 5
+        self.assertTrue(synced_files.add("b"))
+        # 超过时间窗口后可再次处理
+        timer.now = 10
+        self.assertNotIn("a", synced_files)
+        self.assertTrue(synced_files.add("a"))
+        self.assertEqual(len(synced_files), 2)
+        # 超出容量时淘汰最早加入的元素
+        synced_files.add("c")
+        synced_files.add("d")
+        self.assertEqual(len(synced_files), 3)
+        self.assertNotIn("b", synced_files)
+        synced_files.discard("c")
+        self.assertTrue(synced_files.add("c"))
+
+    def test_debounce(self):
+        sync = Sync()
+        handled = []
+        done = threading.Event()
+
+        def __handle(event_path):
+            handled.append(event_path)
+            done.set()
+
+        sync._Sync__handle_file_change = __handle
+        sync.DEBOUNCE_SECONDS = 0.5
+        sync.DEBOUNCE_INTERVAL = 0.1
+        file_path = os.path.join(self.root, "movie.mkv")
+        event = SimpleNamespace(is_directory=False)
+        try:
+            # 写入过程中的连续创建、修改事件只处理一次
+            with open(file_path, "wb") as f:
+                sync.file_change_handler(event, "创建", file_path)
+                for _ in range(5):
+                    f.write(os.urandom(1024))
+                    f.flush()
+                    sync.file_change_handler(event, "修改", file_path, pending_only=True)
+                    time.sleep(0.1)
+            self.assertTrue(done.wait(5))
+            sync.file_change_handler(event, "修改", file_path)
+            time.sleep(1)
+            self.assertEqual(handled, [file_path])
+            # 已同步的文件超出去重时间窗口后被修改，不重新处理
+            sync._synced_files.discard(file_path)
+            sync.file_change_handler(event, "修改", file_path, pending_only=True)
+            time.sleep(1)
+            self.assertEqual(handled, [file_path])
+        finally:
+            del sync._Sync__handle_file_change
+            del sync.DEBOUNCE_SECONDS
+            del sync.DEBOUNCE_INTERVAL
+            sync._synced_files.discard(file_path)
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        paths = [os.path.join(self.root, f"Show.{i}", f"Show.{i}.S01E01.mkv") for i in range(FILE_COUNT)]
+        synced_list = []
+        start_time = time.perf_counter()
+        for event_path in paths + paths:
+            if event_path not in synced_list:
+                synced_list.append(event_path)
+        list_time = time.perf_counter() - start_time
+        synced_set = ExpiringSet(maxsize=Sync().SYNCED_FILES_MAXSIZE, ttl=Sync().SYNCED_FILES_TTL)
+        start_time = time.perf_counter()
+        for event_path in paths + paths:
+            synced_set.add(event_path)
+        set_time = time.perf_counter() - start_time
+        self.assertEqual(len(synced_list), len(synced_set))
+        print(f"{FILE_COUNT} files x 2 events: list {list_time:.2f}s, expiring set {set_time:.3f}s")
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import errno
+import filecmp
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from app.utils import SystemUtils
+
+# 测试文件大小
+FILE_SIZE = 4 * 1024 * 1024
+# 性能测试文件大小
+BENCHMARK_FILE_SIZE = 200 * 1024 * 1024
+
+
+class SystemUtilsTest(TestCase):
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.src = os.path.join(self.root, "src.mkv")
+        self.__write_src(FILE_SIZE)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __write_src(self, size):
+        with open(self.src, "wb") as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(size // len(block)):
+                f.write(block)
+            f.write(b"tail")
+
+    def __copy(self, name):
+        dest = os.path.join(self.root, name)
+        self.assertEqual(SystemUtils.copy(self.src, dest), (0, ""))
+        self.assertTrue(filecmp.cmp(self.src, dest, shallow=False))
+        self.assertEqual(os.path.getmtime(self.src), os.path.getmtime(dest))
+        return dest
+
+    def test_copy_fallback(self):
+        def __unsupported(*args, **kwargs):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        # 模拟不支持reflink和copy_file_range的文件系统
+        with patch.object(SystemUtils, "_copy_unsupported", set()), \
+                patch.object(SystemUtils, "_FICLONE", -1), \
+                patch.object(os, "copy_file_range", __unsupported, create=True):
+            self.__copy("fallback.mkv")
+            stats = SystemUtils.get_copy_stats()
+        self.assertIn(SystemUtils.COPY_SENDFILE if hasattr(os, "sendfile") else SystemUtils.COPY_BUFFERED, stats)
+
+    def test_copy_fallback_errno(self):
+        def __busy(*args, **kwargs):
+            raise OSError(errno.ETXTBSY, "Text file busy")
+
+        # 单个文件的错误只回退本次复制，文件系统不支持的错误才记录
+        with patch.object(SystemUtils, "_copy_unsupported", set()) as unsupported, \
+                patch.object(SystemUtils, "_FICLONE", -1), \
+                patch.object(os, "copy_file_range", __busy, create=True):
+            self.__copy("busy.mkv")
+            self.assertNotIn(SystemUtils.COPY_FILE_RANGE, [method for method, *_ in unsupported])
+
+    def test_copy_same_file(self):
+        # 目的文件是指向源文件的软链接时报错，不能清空源文件
+        dest = os.path.join(self.root, "link.mkv")
+        os.symlink(self.src, dest)
+        size = os.path.getsize(self.src)
+        retcode, _ = SystemUtils.copy(self.src, dest)
+        self.assertEqual(retcode, -1)
+        self.assertEqual(os.path.getsize(self.src), size)
+        self.assertRaises(shutil.SameFileError, SystemUtils.copy_file, self.src, dest)
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        self.__write_src(BENCHMARK_FILE_SIZE)
+        copy2_times, copy_times = [], []
+        with patch.object(SystemUtils, "_copy_stats", {}):
+            for _ in range(3):
+                dest = os.path.join(self.root, "copy2.mkv")
+                start_time = time.perf_counter()
+                shutil.copy2(self.src, dest)
+                copy2_times.append(time.perf_counter() - start_time)
+                os.remove(dest)
+                dest = os.path.join(self.root, "copy.mkv")
+                start_time = time.perf_counter()
+                SystemUtils.copy(self.src, dest)
+                copy_times.append(time.perf_counter() - start_time)
+                self.assertTrue(filecmp.cmp(self.src, dest, shallow=False))
+                os.remove(dest)
+            stats = SystemUtils.get_copy_stats()
+        method = list(stats.keys())[0]
+        print(f"{BENCHMARK_FILE_SIZE // 1024 // 1024}MB: shutil.copy2 {min(copy2_times):.2f}s, "
+              f"SystemUtils.copy {min(copy_times):.2f}s via {method} "
+              f"({stats[method]['throughput'] / 1024 / 1024:.0f}MB/s)")
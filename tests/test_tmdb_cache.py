@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+from app.media.tmdbv3api.cache import TMDbCache
+
+
+class FakeTimer(object):
+    """
+    可手动推进的计时器
+    """
+
+    def __init__(self):
+        self.now = 1000000
+
+    def __call__(self):
+        return self.now
+
+
+class TMDbCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.timer = FakeTimer()
+        self.cache = TMDbCache(os.path.join(self.root, "tmdb_cache.db"), timer=self.timer)
+
+    def tearDown(self) -> None:
+        self.cache._executor.shutdown(wait=True)
+        self.cache._conn.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_ttl(self):
+        self.assertEqual(TMDbCache.get_ttl("/trending/all/week"), 3600)
+        self.assertEqual(TMDbCache.get_ttl("/tv/popular"), 3600)
+        self.assertEqual(TMDbCache.get_ttl("/search/movie"), 24 * 3600)
+        self.assertEqual(TMDbCache.get_ttl("/tv/1399/season/1"), 24 * 3600)
+        self.assertEqual(TMDbCache.get_ttl("/genre/movie/list"), 30 * 24 * 3600)
+        self.assertEqual(TMDbCache.get_ttl("/movie/550"), 7 * 24 * 3600)
+        self.assertEqual(TMDbCache.get_ttl("/configuration"), TMDbCache.DEFAULT_TTL)
+        # 按接口缓存时间过期
+        self.cache.set("trending", "/trending/all/week", {"page": 1})
+        self.cache.set("movie", "/movie/550", {"id": 550})
+        self.assertEqual(self.cache.get("trending"), ({"page": 1}, False))
+        self.timer.now += 3600
+        self.assertEqual(self.cache.get("trending"), ({"page": 1}, True))
+        self.assertEqual(self.cache.get("movie"), ({"id": 550}, False))
+        # 超过容忍期后不再返回旧数据
+        self.timer.now += TMDbCache.STALE_TTL
+        self.assertEqual(self.cache.get("trending"), (None, False))
+        self.assertEqual(self.cache.get("missing"), (None, False))
+
+    def test_revalidate(self):
+        self.cache.set("movie", "/movie/550", {"id": 550, "title": "old"})
+        self.timer.now += TMDbCache.get_ttl("/movie/550")
+        response, stale = self.cache.get("movie")
+        self.assertEqual((response.get("title"), stale), ("old", True))
+        # 过期数据在后台刷新，同一KEY同时只刷新一次
+        calls = []
+        release = threading.Event()
+
+        def __fetch():
+            calls.append(1)
+            release.wait(5)
+            return {"id": 550, "title": "new"}
+
+        self.cache.revalidate("movie", "/movie/550", __fetch)
+        self.cache.revalidate("movie", "/movie/550", __fetch)
+        release.set()
+        self.cache._executor.shutdown(wait=True)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.get("movie"), ({"id": 550, "title": "new"}, False))
+
+    def test_max_entries(self):
+        self.cache.MAX_ENTRIES = 5
+        self.cache.TRIM_INTERVAL = 1
+        for i in range(8):
+            self.timer.now += 1
+            self.cache.set(f"movie{i}", f"/movie/{i}", {"id": i})
+        # 超出容量时淘汰最早写入的条目
+        self.assertEqual([self.cache.get(f"movie{i}")[0] for i in range(3)], [None] * 3)
+        self.assertEqual([self.cache.get(f"movie{i}")[0] for i in range(3, 8)], [{"id": i} for i in range(3, 8)])
+
+    def test_key(self):
+        key = TMDbCache.make_key("/movie/550", "credits", "zh", False)
+        self.assertNotEqual(key, TMDbCache.make_key("/movie/550", "credits", "en", False))
+        self.assertNotEqual(key, TMDbCache.make_key("/movie/550", "images", "zh", False))
+        self.assertNotEqual(key, TMDbCache.make_key("/movie/550", "credits", "zh", True))
+        self.assertNotEqual(key, TMDbCache.make_key("/movie/551", "credits", "zh", False))
+        self.assertEqual(TMDbCache.make_key("/movie/550", None, "zh", False),
+                         TMDbCache.make_key("/movie/550", "", "zh", False))
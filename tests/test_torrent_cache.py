@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import time
+from unittest import TestCase, skipUnless
+
+from app.downloader.client._torrent_cache import _TorrentCache, QbittorrentTorrentCache
+from app.downloader.client.qbittorrent import Qbittorrent
+
+# 模拟下载器中的种子数
+TORRENT_COUNT = 8000
+# 每次查询间隔内发生变化的种子数
+CHANGED_COUNT = 50
+
+
+class FakeQbittorrent(object):
+    """
+    模拟qBittorrent的种子列表及/sync/maindata增量接口，统计返回的数据量
+    """
+
+    def __init__(self, count):
+        self.rid = 1
+        self.bytes = 0
+        self.requests = 0
+        self._history = {}
+        self.torrents = {}
+        for i in range(count):
+            self.torrents[f"{i:040x}"] = {
+                "name": f"Test.Show.{i}.S01E01.1080p.WEB-DL.H264-Group",
+                "state": "uploading" if i % 2 else "downloading",
+                "tags": "NASTOOL" if i % 3 else "",
+                "save_path": "/downloads",
+                "size": i * 1024,
+                "progress": 1.0 if i % 2 else 0.5,
+                "ratio": 1.5,
+                "upspeed": 0,
+                "dlspeed": 0
+            }
+        self._history[self.rid] = {h: dict(t) for h, t in self.torrents.items()}
+
+    def __response(self, data):
+        self.requests += 1
+        self.bytes += len(json.dumps(data))
+        return data
+
+    def change(self, start, count):
+        """
+        修改部分种子的状态，删除一个种子
+        """
+        for torrent_hash in list(self.torrents)[start:start + count]:
+            self.torrents[torrent_hash]["upspeed"] += 1024
+            self.torrents[torrent_hash]["tags"] = "NASTOOL, 已整理"
+        self.torrents.pop(list(self.torrents)[-1])
+        self.rid += 1
+        self._history[self.rid] = {h: dict(t) for h, t in self.torrents.items()}
+
+    def torrents_add_tags(self, **kwargs):
+        pass
+
+    def torrents_info(self, **kwargs):
+        return self.__response([dict(t, hash=h) for h, t in self.torrents.items()])
+
+    def sync_maindata(self, rid=0):
+        old = self._history.get(rid)
+        if not old:
+            return self.__response({"rid": self.rid, "full_update": True, "torrents": self._history[self.rid]})
+        torrents = {}
+        for torrent_hash, torrent in self.torrents.items():
+            changed = {k: v for k, v in torrent.items() if old.get(torrent_hash, {}).get(k) != v}
+            if changed:
+                torrents[torrent_hash] = changed
+        removed = [h for h in old if h not in self.torrents]
+        return self.__response({"rid": self.rid, "torrents": torrents, "torrents_removed": removed})
+
+
+class TorrentCacheTest(TestCase):
+    @staticmethod
+    def __build_client(qbc):
+        client = Qbittorrent({})
+        client.qbc = qbc
+        client._torrent_cache = QbittorrentTorrentCache(qbc)
+        return client
+
+    def test_sync(self):
+        qbc = FakeQbittorrent(100)
+        client = self.__build_client(qbc)
+        torrents, error = client.get_torrents(status=["completed"], tag="NASTOOL")
+        self.assertFalse(error)
+        self.assertEqual(sorted(t.hash for t in torrents),
+                         sorted(h for h, t in qbc.torrents.items() if t["state"] == "uploading" and t["tags"]))
+        # 刷新间隔内的查询直接读取快照
+        client.get_completed_torrents()
+        self.assertEqual(qbc.requests, 1)
+        # 写操作后下一次查询按增量同步
+        qbc.change(0, 10)
+        client.set_torrents_status(ids=[])
+        transfer_tasks = client.get_transfer_task()
+        self.assertEqual(qbc.requests, 2)
+        self.assertEqual(len(client.get_torrents()[0]), 99)
+        self.assertEqual(len(transfer_tasks), len([t for t in qbc.torrents.values()
+                                                   if t["state"] == "uploading" and "已整理" not in t["tags"]]))
+        torrent_hash = list(qbc.torrents)[0]
+        torrent = client.get_torrents(ids=torrent_hash)[0][0]
+        self.assertEqual(torrent.upspeed, 1024)
+        self.assertEqual(torrent.name, qbc.torrents[torrent_hash]["name"])
+        # 未实现同步方法的缓存不能实例化
+        self.assertRaises(TypeError, type("NoSyncCache", (_TorrentCache,), {}))
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        qbc = FakeQbittorrent(TORRENT_COUNT)
+        polls = 10
+        for _ in range(polls):
+            qbc.torrents_info()
+        full_bytes = qbc.bytes
+        qbc = FakeQbittorrent(TORRENT_COUNT)
+        client = self.__build_client(qbc)
+        cache_time = 0
+        for i in range(polls):
+            client._torrent_cache.invalidate()
+            start_time = time.perf_counter()
+            client.get_completed_torrents()
+            cache_time += time.perf_counter() - start_time
+            qbc.change(i * CHANGED_COUNT, CHANGED_COUNT)
+        print(f"{TORRENT_COUNT} torrents x {polls} polls: torrents_info {full_bytes / 1024 / 1024:.1f}MB, "
+              f"sync/maindata {qbc.bytes / 1024 / 1024:.1f}MB in {qbc.requests} requests, "
+              f"sync and filter {cache_time:.2f}s")
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, current_thread
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from app.helper import TransferHelper
+from app.utils import SystemUtils
+from app.utils.types import RmtMode
+
+# 模拟大文件复制耗时（秒）
+COPY_DELAY = 0.5
+# 排在复制后面的硬链接数
+LINK_COUNT = 20
+# 执行复制的线程
+COPY_THREADS = set()
+
+
+def slow_copy(src, dest):
+    """
+    模拟耗时的大文件复制
+    """
+    COPY_THREADS.add(current_thread().name)
+    time.sleep(COPY_DELAY)
+    shutil.copy2(src, dest)
+    return 0, ""
+
+
+class TransferHelperTest(TestCase):
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.src_dir = os.path.join(self.root, "src")
+        self.dest_dir = os.path.join(self.root, "dest")
+        os.makedirs(self.src_dir)
+        os.makedirs(self.dest_dir)
+        self.files = []
+        for i in range(LINK_COUNT + 2):
+            file_path = os.path.join(self.src_dir, f"file{i}.mkv")
+            with open(file_path, "wb") as f:
+                f.write(os.urandom(1024))
+            self.files.append(file_path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __run(self, transfer, tag):
+        """
+        先提交两个复制，再提交一批硬链接，返回硬链接全部完成的耗时和总耗时
+        """
+        jobs = [(self.files[0], RmtMode.COPY), (self.files[1], RmtMode.COPY)] + \
+               [(file_path, RmtMode.LINK) for file_path in self.files[2:]]
+        start_time = time.perf_counter()
+
+        def __transfer(file_path, dest, rmt_mode):
+            ret = transfer(file_path, dest, rmt_mode)
+            return ret, time.perf_counter() - start_time
+
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = []
+            for file_path, rmt_mode in jobs:
+                dest = os.path.join(self.dest_dir, f"{tag}-{os.path.basename(file_path)}")
+                futures.append((rmt_mode, executor.submit(__transfer, file_path, dest, rmt_mode)))
+                time.sleep(0.01)
+            link_time = 0
+            for rmt_mode, future in futures:
+                ret, finish_time = future.result()
+                self.assertEqual(ret[0], 0)
+                if rmt_mode == RmtMode.LINK:
+                    link_time = max(link_time, finish_time)
+        return link_time, time.perf_counter() - start_time
+
+    def test_fast_lane(self):
+        COPY_THREADS.clear()
+        with patch.object(SystemUtils, "copy", slow_copy):
+            link_time, total_time = self.__run(TransferHelper().execute, "executor")
+        # 复制在调用线程中执行，不再占用额外的转移线程
+        self.assertEqual(len(COPY_THREADS), 2)
+        self.assertFalse([name for name in COPY_THREADS if name.startswith("FileTransfer")])
+        # 硬链接不等待复制完成
+        self.assertLess(link_time, COPY_DELAY)
+        # 同一设备默认允许两个复制同时进行
+        self.assertLess(total_time, COPY_DELAY * 2)
+        self.assertEqual(len(os.listdir(self.dest_dir)), len(self.files))
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        lock = Lock()
+
+        def locked_transfer(src, dest, rmt_mode):
+            """
+            原有的全局锁方式，作为对照
+            """
+            with lock:
+                if rmt_mode == RmtMode.LINK:
+                    return SystemUtils.link(src, dest)
+                return SystemUtils.copy(src, dest)
+
+        with patch.object(SystemUtils, "copy", slow_copy):
+            lock_link, lock_total = self.__run(locked_transfer, "lock")
+            executor_link, executor_total = self.__run(TransferHelper().execute, "executor")
+        print(f"2 copies + {LINK_COUNT} links: global lock links done {lock_link:.2f}s/total {lock_total:.2f}s, "
+              f"executor links done {executor_link:.2f}s/total {executor_total:.2f}s")
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from unittest import TestCase, skipUnless
+
+from app.downloader.transfer_queue import TransferQueue
+
+# 模拟单个任务识别转移耗时（秒）
+TRANSFER_DELAY = 0.05
+# 每个下载器完成的任务数
+TASK_COUNT = 20
+
+
+class MockTransfer(object):
+    """
+    模拟识别转移，统计各下载器同时处理的最大任务数
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.running = {}
+        self.max_running = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, group, key):
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            self.running[group] = self.running.get(group, 0) + 1
+            self.max_running[group] = max(self.max_running.get(group, 0), self.running[group])
+        time.sleep(TRANSFER_DELAY)
+        with self._lock:
+            self.running[group] -= 1
+        return True
+
+
+class TransferQueueTest(TestCase):
+    @staticmethod
+    def __tasks():
+        return [(group, f"{group}-{i}") for group in ["qb", "tr"] for i in range(TASK_COUNT)]
+
+    def test_limits(self):
+        queue = TransferQueue(max_workers=4, group_concurrency=2)
+        transfer = MockTransfer()
+        futures = []
+        for group, key in self.__tasks():
+            futures.append(queue.submit(group, key, transfer, group, key))
+            # 排队或处理中的种子不会重复交给处理线程
+            self.assertIsNone(queue.submit(group, key, transfer, group, key))
+        for future in futures:
+            self.assertTrue(future.result())
+        self.assertTrue(all(count == 1 for count in transfer.calls.values()))
+        self.assertEqual(transfer.max_running, {"qb": 2, "tr": 2})
+        stats = queue.get_stats()
+        self.assertEqual(stats.get("completed"), TASK_COUNT * 2)
+        self.assertEqual(stats.get("queued"), 0)
+        self.assertEqual(len(stats.get("recent")), min(TransferQueue.RECENT_SIZE, TASK_COUNT * 2))
+        # 处理完成后可再次提交
+        self.assertTrue(queue.submit("qb", "qb-0", transfer, "qb", "qb-0").result())
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        transfer = MockTransfer()
+        start_time = time.perf_counter()
+        for group, key in self.__tasks():
+            transfer(group, key)
+        serial_time = time.perf_counter() - start_time
+        queue = TransferQueue(max_workers=4, group_concurrency=2)
+        start_time = time.perf_counter()
+        futures = [queue.submit(group, key, transfer, group, key) for group, key in self.__tasks()]
+        for future in futures:
+            future.result()
+        queue_time = time.perf_counter() - start_time
+        stats = queue.get_stats()
+        print(f"2 downloaders x {TASK_COUNT} tasks: serial {serial_time:.2f}s, queue {queue_time:.2f}s, "
+              f"avg wait {stats.get('avg_wait')}s, avg transfer {stats.get('avg_seconds')}s")
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import re
+import time
+from types import SimpleNamespace
+from unittest import TestCase, skipUnless
+
+import cn2an
+import regex
+
+from app.helper.words_helper import CustomWordsPipeline
+from app.utils import ExceptionUtils
+from tests.cases.meta_cases import meta_cases
+
+
+def legacy_replace_regex(title, replaced, replace):
+    """
+    原WordsHelper.replace_regex，作为对照
+    """
+    try:
+        if not regex.findall(r'%s' % replaced, title):
+            return title, "", False
+        else:
+            return regex.sub(r'%s' % replaced, r'%s' % replace, title), "", True
+    except Exception as err:
+        ExceptionUtils.exception_traceback(err)
+        return title, str(err), False
+
+
+def legacy_replace_noregex(title, replaced, replace):
+    """
+    原WordsHelper.replace_noregex，作为对照
+    """
+    try:
+        if title.find(replaced) == -1:
+            return title, "", False
+        else:
+            return title.replace(replaced, replace), "", True
+    except Exception as err:
+        ExceptionUtils.exception_traceback(err)
+        return title, str(err), False
+
+
+def legacy_episode_offset(title, front, back, offset):
+    """
+    原WordsHelper.episode_offset，作为对照
+    """
+    try:
+        if back and not regex.findall(r'%s' % back, title):
+            return title, "", False
+        if front and not regex.findall(r'%s' % front, title):
+            return title, "", False
+        offset_word_info_re = regex.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
+        episode_nums_str = regex.findall(offset_word_info_re, title)
+        if not episode_nums_str:
+            return title, "", False
+        episode_nums_offset_str = []
+        offset_order_flag = False
+        for episode_num_str in episode_nums_str:
+            episode_num_int = int(cn2an.cn2an(episode_num_str, "smart"))
+            offset_caculate = offset.replace("EP", str(episode_num_int))
+            episode_num_offset_int = int(eval(offset_caculate))
+            # 向前偏移
+            if episode_num_int > episode_num_offset_int:
+                offset_order_flag = True
+            # 向后偏移
+            elif episode_num_int < episode_num_offset_int:
+                offset_order_flag = False
+            # 原值是中文数字，转换回中文数字，阿拉伯数字则还原0的填充
+            if not episode_num_str.isdigit():
+                episode_num_offset_str = cn2an.an2cn(episode_num_offset_int, "low")
+            else:
+                count_0 = regex.findall(r"^0+", episode_num_str)
+                if count_0:
+                    episode_num_offset_str = f"{count_0[0]}{episode_num_offset_int}"
+                else:
+                    episode_num_offset_str = str(episode_num_offset_int)
+            episode_nums_offset_str.append(episode_num_offset_str)
+        episode_nums_dict = dict(zip(episode_nums_str, episode_nums_offset_str))
+        # 集数向前偏移，集数按升序处理
+        if offset_order_flag:
+            episode_nums_list = sorted(episode_nums_dict.items(), key=lambda x: x[1])
+        # 集数向后偏移，集数按降序处理
+        else:
+            episode_nums_list = sorted(episode_nums_dict.items(), key=lambda x: x[1], reverse=True)
+        for episode_num in episode_nums_list:
+            episode_offset_re = regex.compile(
+                r'(?<=%s.*?)%s(?=.*?%s)' % (front, episode_num[0], back))
+            title = regex.sub(episode_offset_re, r'%s' % episode_num[1], title)
+        return title, "", True
+    except Exception as err:
+        ExceptionUtils.exception_traceback(err)
+        return title, str(err), False
+
+
+def legacy_process(words_info, title):
+    """
+    原WordsHelper.process：逐个识别词实时编译处理，作为对照
+    """
+    msg = []
+    used_ignored_words = []
+    used_replaced_words = []
+    used_offset_words = []
+    for word_info in words_info:
+        if word_info.TYPE == 1:
+            title, ignore_msg, ignore_flag = legacy_replace_regex(title, word_info.REPLACED, "") \
+                if word_info.REGEX else legacy_replace_noregex(title, word_info.REPLACED, "")
+            if ignore_flag:
+                used_ignored_words.append(word_info.REPLACED)
+            elif ignore_msg:
+                msg.append(ignore_msg)
+        elif word_info.TYPE == 2:
+            title, replace_msg, replace_flag = \
+                legacy_replace_regex(title, word_info.REPLACED, word_info.REPLACE) \
+                if word_info.REGEX else legacy_replace_noregex(title, word_info.REPLACED, word_info.REPLACE)
+            if replace_flag:
+                used_replaced_words.append(f"{word_info.REPLACED} ⇒ {word_info.REPLACE}")
+            elif replace_msg:
+                msg.append(replace_msg)
+        elif word_info.TYPE == 3:
+            replaced_word = f"{word_info.REPLACED} ⇒ {word_info.REPLACE}"
+            offset_word = f"{word_info.FRONT} + {word_info.BACK} >> {word_info.OFFSET}"
+            title_cache = title
+            title, replace_msg, replace_flag = legacy_replace_regex(title, word_info.REPLACED, word_info.REPLACE)
+            if replace_flag:
+                title, offset_msg, offset_flag = legacy_episode_offset(title, word_info.FRONT, word_info.BACK,
+                                                                       word_info.OFFSET)
+                if offset_flag:
+                    used_replaced_words.append(replaced_word)
+                    used_offset_words.append(offset_word)
+                elif offset_msg:
+                    title = title_cache
+                    msg.append(offset_msg)
+            elif replace_msg:
+                msg.append(replace_msg)
+        elif word_info.TYPE == 4:
+            title, offset_msg, offset_flag = legacy_episode_offset(title, word_info.FRONT, word_info.BACK,
+                                                                   word_info.OFFSET)
+            if offset_flag:
+                used_offset_words.append(f"{word_info.FRONT} + {word_info.BACK} >> {word_info.OFFSET}")
+            elif offset_msg:
+                msg.append(offset_msg)
+    return title, used_ignored_words, used_replaced_words, used_offset_words
+
+
+def build_words(count):
+    """
+    生成识别词列表：大部分为非正则屏蔽词，少量替换词、正则、替换+集偏移和集偏移
+    """
+    random.seed(count)
+    tokens = set()
+    for info in meta_cases:
+        tokens.update(t for t in info.get("title").replace("-", ".").replace(" ", ".").split(".") if len(t) > 2)
+    tokens = sorted(tokens)
+    words = []
+    for i in range(count):
+        word = SimpleNamespace(TYPE=1, REGEX=0, REPLACED=None, REPLACE=None, FRONT=None, BACK=None, OFFSET=None)
+        if i % 50 == 0:
+            word.TYPE, word.REGEX, word.REPLACED, word.REPLACE = 2, 1, r"(?i)\b%s\b" % re.escape(random.choice(tokens)), "X"
+        elif i % 50 == 1:
+            word.TYPE, word.FRONT, word.BACK, word.OFFSET = 4, "第", "集", "EP+1"
+        elif i % 50 == 2:
+            # 替换为中文集数后偏移，部分偏移格式错误时还原标题
+            word.TYPE, word.REPLACED, word.REPLACE = 3, r"(?<=S\d{2})E(\d{2,3})", r"第\1集"
+            word.FRONT, word.BACK, word.OFFSET = "第", "集", "EP-" if i % 100 == 2 else "EP*2"
+        elif i % 10 == 0:
+            word.TYPE, word.REPLACED, word.REPLACE = 2, random.choice(tokens), "Y"
+        elif i % 5 == 0:
+            word.REPLACED = random.choice(tokens)
+        else:
+            word.REPLACED = f"NoSuchWord{i}"
+        words.append(word)
+    return words
+
+
+class WordsHelperTest(TestCase):
+    def setUp(self) -> None:
+        self.titles = [info.get("title") for info in meta_cases if info.get("title")]
+        self.words = build_words(500)
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_pipeline(self):
+        pipeline = CustomWordsPipeline(self.words)
+        for title in self.titles:
+            title_new, _, used_info = pipeline.process(title)
+            self.assertEqual((title_new, used_info.get("ignored"), used_info.get("replaced"), used_info.get("offset")),
+                             legacy_process(self.words, title))
+
+    @skipUnless(os.environ.get("NASTOOL_BENCHMARK"), "设置环境变量NASTOOL_BENCHMARK后运行性能测试")
+    def test_benchmark(self):
+        pipeline = CustomWordsPipeline(self.words)
+        start_time = time.perf_counter()
+        for title in self.titles:
+            legacy_process(self.words, title)
+        legacy_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for title in self.titles:
+            pipeline.process(title)
+        pipeline_time = time.perf_counter() - start_time
+        print(f"{len(self.titles)} titles x {len(self.words)} words: "
+              f"legacy {legacy_time * 1000:.1f}ms, pipeline {pipeline_time * 1000:.1f}ms")
@@ -226,6 +226,7 @@ class WebAction:
             "check_downloader": self.__check_downloader,
             "get_downloaders": self.__get_downloaders,
             "test_downloader": self.__test_downloader,
+            "get_downloader_transfer_stats": self.__get_downloader_transfer_stats,
             "get_indexer_statistics": self.__get_indexer_statistics,
             "media_path_scrap": self.__media_path_scrap,
             "get_default_rss_setting": self.get_default_rss_setting,
@@ -2579,7 +2580,8 @@ class WebAction:
         """
         try:
             MetaHelper().clear_meta_data()
-            os.remove(MetaHelper().get_meta_data_path())
+            if Media().tmdb:
+                Media().tmdb.cache_clear()
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
             return {"code": 0, "msg": str(e)}
@@ -5092,6 +5094,13 @@ class WebAction:
         else:
             return {"code": 1}
 
+    @staticmethod
+    def __get_downloader_transfer_stats():
+        """
+        获取下载文件转移队列统计
+        """
+        return {"code": 0, "data": Downloader().get_transfer_stats()}
+
     @staticmethod
     def __get_indexer_statistics():
         """
@@ -33,7 +33,8 @@ from app.downloader import Downloader
 from app.filter import Filter
 from app.helper import SecurityHelper, MetaHelper, ChromeHelper, ThreadHelper
 from app.indexer import Indexer
-from app.media.meta import MetaInfo
+from app.media import Media
+from app.media.meta import MetaInfo, get_meta_cache_stats
 from app.mediaserver import MediaServer
 from app.message import Message
 from app.plugins import EventManager
@@ -851,6 +852,8 @@ def tmdbcache():
     return render_template("rename/tmdbcache.html",
                            TotalCount=total_count,
                            Count=len(tmdb_caches),
+                           CacheStats=MetaHelper().get_cache_stats(),
+                           LookupStats=Media.get_lookup_stats(),
                            TmdbCaches=tmdb_caches,
                            Search=search_str,
                            CurrentPage=current_page,
@@ -920,7 +923,8 @@ def basic():
                            CurrentUser=current_user,
                            ScraperNfo=ScraperConf.get("scraper_nfo") or {},
                            ScraperPic=ScraperConf.get("scraper_pic") or {},
-                           TmdbDomains=TMDB_API_DOMAINS)
+                           TmdbDomains=TMDB_API_DOMAINS,
+                           MetaCacheStats=get_meta_cache_stats())
 
 
 # 自定义识别词设置页面